@@ -0,0 +1,248 @@
+# agent_core/backtest/array_backtest.py
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+from agent_core.data.price_panel import PricePanel
+from agent_core.strategy.strategy_builder import SparseWeights
+
+TRADING_DAYS = 252
+
+
+def to_close(price_df: pd.DataFrame) -> pd.DataFrame:
+    """PricePanel 或 get_res_price_data 的 (field, ticker) 面板取 close；否则视为 date × ticker 的收盘价矩阵"""
+    if isinstance(price_df, PricePanel) or isinstance(price_df.columns, pd.MultiIndex):
+        return price_df["close"]
+    return price_df
+
+
+def rebalance_mask(dates: pd.DatetimeIndex, rebalance: Union[str, List[str]] = "daily") -> np.ndarray:
+    """
+    调仓日历：
+      - "daily"：每天调仓
+      - "weekly" / "monthly"：每周 / 每月最后一个交易日调仓
+      - 日期列表：在给定日期调仓
+    第一天总是建仓。
+    """
+    if isinstance(rebalance, str):
+        if rebalance == "daily":
+            mask = np.ones(len(dates), dtype=bool)
+        elif rebalance in ("weekly", "monthly"):
+            periods = dates.to_period("W" if rebalance == "weekly" else "M").asi8
+            mask = np.append(periods[1:] != periods[:-1], True)
+        else:
+            raise ValueError(f"Unknown rebalance frequency: {rebalance!r}. Use 'daily', 'weekly', 'monthly' or a list of dates.")
+    else:
+        mask = dates.isin(pd.DatetimeIndex(rebalance))
+    if len(mask):
+        mask[0] = True
+    return mask
+
+
+def fast_backtest(
+    price_df: pd.DataFrame,
+    weight_df: pd.DataFrame,
+    rebalance: Union[str, List[str]] = "daily",
+    cost_bps: float = 0.0,
+    fixed_cost: float = 0.0,
+    initial_capital: float = 1_000_000.0,
+) -> dict:
+    """
+    基于 NumPy 数组（date × ticker）的回测引擎，全程无逐日 Python 循环。
+
+    参数：
+      - price_df: 收盘价矩阵，或 get_res_price_data 返回的 (field, ticker) 面板
+      - weight_df: 目标权重（index=date，columns=ticker），只在调仓日生效；
+        也可以是 SparseWeights（如 equal_weight(select_top_n(...))），只在持仓上计算，不展开成稠密矩阵
+      - rebalance: 调仓日历，见 rebalance_mask
+      - cost_bps: 比例交易成本（基点），按双边换手 sum|Δw| 收取
+      - fixed_cost: 每笔交易（每只权重发生变化的股票）的固定成本，单位同 initial_capital
+      - initial_capital: 初始资金
+
+    约定：t 日收盘按目标权重调仓，赚取 t → t+1 的收益；两次调仓之间权重随价格漂移，未投资部分为现金。
+
+    返回 dict：
+      - equity: 净值曲线（t 日收盘、扣除成本后，初始为 1）
+      - returns / turnover / holdings / costs: 每日收益、双边换手、持仓数、成本（占初始资金比例）
+      - stats: 汇总指标
+    """
+    close = to_close(price_df)
+    dates = close.index.intersection(weight_df.index)
+    tickers = close.columns
+    p = np.ascontiguousarray(close.reindex(dates).to_numpy(dtype="float64"))
+    n_dates = len(dates)
+
+    # 日收益与累计增长因子；缺失价格视为当日不涨不跌
+    r = np.zeros_like(p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r[1:] = p[1:] / p[:-1] - 1
+    r[~np.isfinite(r)] = 0.0
+    growth = np.cumprod(1 + r, axis=0)
+
+    reb = rebalance_mask(dates, rebalance)
+    reb_idx = np.flatnonzero(reb)
+    seg = np.cumsum(reb) - 1          # 每一天所属的调仓区间
+
+    if isinstance(weight_df, SparseWeights):
+        value, pre_value, trade_sum, trade_n, reb_holdings, reb_exposure = _sparse_path(
+            weight_df, dates, tickers, growth, reb_idx, seg)
+    else:
+        w = np.ascontiguousarray(weight_df.reindex(index=dates, columns=tickers).fillna(0.0).to_numpy(dtype="float64"))
+        value, pre_value, trade_sum, trade_n, reb_holdings, reb_exposure = _dense_path(w, growth, reb_idx, seg)
+
+    turnover = np.zeros(n_dates)
+    turnover[reb_idx] = trade_sum
+    n_trades = np.zeros(n_dates)
+    n_trades[reb_idx] = trade_n
+
+    # 组合毛收益：gross(t) = 调仓前价值(t) / 价值(t-1)
+    gross = np.ones(n_dates)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gross[1:] = pre_value[1:] / value[:-1]
+    gross[~np.isfinite(gross)] = 0.0
+
+    # 资金：N_t = N_{t-1} * gross_t * (1 - c * TO_t) - F * n_t，线性递推用 cumprod 闭式求解
+    prop = cost_bps / 1e4
+    m = np.cumprod(gross * (1 - prop * turnover))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fixed = np.cumsum(np.where(m > 0, fixed_cost * n_trades / m, 0.0))
+    capital = m * (initial_capital - fixed)
+
+    before_cost = np.append(initial_capital, capital[:-1]) * gross
+    costs = (before_cost * prop * turnover + fixed_cost * n_trades) / initial_capital
+
+    equity = capital / initial_capital
+    daily_ret = np.append(equity[0] - 1, equity[1:] / equity[:-1] - 1) if n_dates else equity
+    holdings = reb_holdings[seg]
+
+    index = pd.Index(dates, name=close.index.name)
+    result = {
+        "equity": pd.Series(equity, index=index, name="equity"),
+        "returns": pd.Series(daily_ret, index=index, name="returns"),
+        "turnover": pd.Series(turnover, index=index, name="turnover"),
+        "holdings": pd.Series(holdings, index=index, name="holdings"),
+        "costs": pd.Series(costs, index=index, name="costs"),
+    }
+    result["stats"] = summary_stats(equity, daily_ret, turnover, holdings, reb_exposure[seg], costs, len(reb_idx))
+    return result
+
+
+def _dense_path(w: np.ndarray, growth: np.ndarray, reb_idx: np.ndarray, seg: np.ndarray):
+    """
+    稠密权重矩阵的组合推进。返回 (每日价值, 每日调仓前价值, 各调仓日的双边换手 / 交易笔数 / 持仓数 / 总仓位)，
+    价值以调仓时 1 元组合为基准。
+    """
+    w_reb = w[reb_idx]
+    g_reb = growth[reb_idx]
+    w_seg = w_reb[seg]
+    cash_seg = 1 - w_seg.sum(axis=1)
+
+    # 区间内每只股票的持仓价值（以调仓时 1 元组合为基准）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hold = w_seg * (growth / g_reb[seg])
+    hold[~np.isfinite(hold)] = 0.0
+    value = hold.sum(axis=1) + cash_seg
+
+    # 调仓日：按上一区间持仓计算调仓前价值与漂移后的权重
+    pre_value = value.copy()
+    drift = np.zeros_like(w_reb)
+    prev = reb_idx[1:] - 1
+    if len(prev):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drifted = w_seg[prev] * (growth[reb_idx[1:]] / g_reb[seg[prev]])
+        drifted[~np.isfinite(drifted)] = 0.0
+        pre_value[reb_idx[1:]] = drifted.sum(axis=1) + cash_seg[prev]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drift[1:] = drifted / pre_value[reb_idx[1:], None]
+
+    trade = np.abs(w_reb - drift)
+    return (value, pre_value, trade.sum(axis=1), (trade > 1e-12).sum(axis=1),
+            (w_reb != 0).sum(axis=1), np.abs(w_reb).sum(axis=1))
+
+
+def _sparse_path(weights: SparseWeights, dates: pd.DatetimeIndex, tickers: pd.Index, growth: np.ndarray,
+                 reb_idx: np.ndarray, seg: np.ndarray):
+    """
+    与 _dense_path 相同的计算，但只在持仓上进行：工作量与 日期数 × 持仓数 成正比，与股票池大小无关。
+    weights 中不在价格面板里的股票被忽略。
+    """
+    n_dates, n_reb, n_cols = len(dates), len(reb_idx), len(tickers)
+
+    # 取出调仓日的持仓，列号换成价格面板中的位置
+    rows = weights.index.get_indexer(dates[reb_idx])
+    counts = weights.counts()[rows]
+    starts = weights.indptr[rows]
+    entry = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    owner = np.repeat(np.arange(n_reb), counts)                  # 每个持仓属于第几个调仓日
+    col = tickers.get_indexer(weights.columns)[weights.indices[entry]]
+    w = weights.weights[entry]
+    keep = (col >= 0) & (w != 0)
+    owner, col, w = owner[keep], col[keep], w[keep]
+    ptr = np.zeros(n_reb + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=n_reb), out=ptr[1:])
+    g_base = growth[reb_idx[owner], col]
+    cash = 1 - np.bincount(owner, weights=w, minlength=n_reb)
+
+    # 每一天 × 当日所属区间的持仓，展开成一维
+    per_day = np.diff(ptr)[seg]
+    day = np.repeat(np.arange(n_dates), per_day)
+    e = np.repeat(ptr[seg] - np.cumsum(per_day) + per_day, per_day) + np.arange(per_day.sum())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hold = w[e] * (growth[day, col[e]] / g_base[e])
+    hold[~np.isfinite(hold)] = 0.0
+    value = np.bincount(day, weights=hold, minlength=n_dates) + cash[seg]
+
+    # 调仓日：上一区间的持仓漂移到当天
+    pre_value = value.copy()
+    drift = np.zeros(0)
+    old = np.flatnonzero(owner < n_reb - 1)
+    if n_reb > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drifted = w[old] * (growth[reb_idx[owner[old] + 1], col[old]] / g_base[old])
+        drifted[~np.isfinite(drifted)] = 0.0
+        pre_value[reb_idx[1:]] = np.bincount(owner[old], weights=drifted, minlength=n_reb - 1)[:n_reb - 1] + cash[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drift = drifted / pre_value[reb_idx[owner[old] + 1]]
+
+    # 换手：新目标权重与漂移后权重按 (调仓日, 股票) 合并相减
+    key = np.concatenate([owner * n_cols + col, (owner[old] + 1) * n_cols + col[old]])
+    delta = np.concatenate([w, -drift])
+    uniq, inverse = np.unique(key, return_inverse=True)
+    trade = np.abs(np.bincount(inverse, weights=delta, minlength=len(uniq)))
+    trade_owner = uniq // n_cols if n_cols else uniq
+    return (value, pre_value,
+            np.bincount(trade_owner, weights=trade, minlength=n_reb),
+            np.bincount(trade_owner, weights=trade > 1e-12, minlength=n_reb),
+            np.diff(ptr), np.bincount(owner, weights=np.abs(w), minlength=n_reb))
+
+
+def summary_stats(equity, daily_ret, turnover, holdings, exposure, costs, n_rebalances) -> dict:
+    """
+    由逐日序列汇总回测指标（fast_backtest 与分块回测共用）
+    equity: 净值；daily_ret: 日收益；turnover: 双边换手；holdings: 持仓数；exposure: 每日目标总仓位 sum|w|；costs: 每日成本
+    """
+    n = len(equity)
+    if n == 0:
+        return {}
+    years = n / TRADING_DAYS
+    std = daily_ret.std()
+    sharpe = daily_ret.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else np.nan
+    max_dd = (equity / np.maximum.accumulate(equity) - 1).min()
+    exposure = np.mean(exposure)
+    one_way = turnover.mean() / 2
+    stats = {
+        "total_return": equity[-1] - 1,
+        "annual_return": equity[-1] ** (1 / years) - 1 if equity[-1] > 0 else -1.0,
+        "volatility": std * np.sqrt(TRADING_DAYS),
+        "sharpe_ratio": sharpe,
+        "max_drawdown": max_dd,
+        "annual_turnover": turnover.sum() / years,
+        "avg_holdings": holdings.mean(),
+        # 平均持有期（交易日）≈ 平均总仓位 / 日均单边换手
+        "avg_holding_days": exposure / one_way if one_way > 0 else np.nan,
+        "n_rebalances": n_rebalances,
+        "total_cost": costs.sum(),
+    }
+    stats = {k: round(float(v), 4) for k, v in stats.items()}
+    stats["n_rebalances"] = int(n_rebalances)
+    return stats
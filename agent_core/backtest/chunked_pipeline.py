@@ -0,0 +1,240 @@
+# agent_core/backtest/chunked_pipeline.py
+import shutil
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from agent_core.backtest.array_backtest import rebalance_mask, summary_stats, to_close
+from agent_core.data.panel_store import PanelStore
+from agent_core.data.price_panel import PricePanel
+from agent_core.factors.factor_engine import normalize_request, signal_factor
+from agent_core.factors.factor_registry import resolve_factor_name
+from agent_core.strategy.strategy_builder import top_k_mask
+
+# loader(tickers) -> 这些 ticker 的收盘价（index=date，columns=ticker）
+CloseLoader = Callable[[List[str]], pd.DataFrame]
+
+# 粗略的内存系数：阶段一每个 ticker 块约占多少份 date × chunk 的 float64（收盘价、因子与中间结果），
+# 阶段二每个日期块约占多少份 block × ticker 的 float64（因子、收盘价、排名、信号、权重）
+_CHUNK_COPIES = 12
+_BLOCK_COPIES = 8
+
+
+def _make_loader(source, tickers, start, end):
+    """PanelStore / PricePanel / 价格 DataFrame / loader 函数 → (tickers, loader)"""
+    if isinstance(source, PanelStore):
+        return list(tickers or source.tickers), lambda names: source.frame("close", names, start, end)
+    if isinstance(source, (PricePanel, pd.DataFrame)):
+        close = to_close(source).loc[start:end]
+        return list(tickers or close.columns), lambda names: close[names]
+    if callable(source):
+        if tickers is None:
+            raise ValueError("tickers is required when source is a loader function")
+        return list(tickers), source
+    raise TypeError(f"Unsupported price source: {type(source).__name__}")
+
+
+def plan_chunks(n_dates: int, n_tickers: int, memory_budget_mb: float):
+    """按内存预算决定 ticker 块大小与日期块大小"""
+    budget = memory_budget_mb * 1024 ** 2
+    chunk_size = int(budget // (max(n_dates, 1) * 8 * _CHUNK_COPIES))
+    date_block = int(budget // (max(n_tickers, 1) * 8 * _BLOCK_COPIES))
+    return max(1, min(chunk_size, n_tickers)), max(1, min(date_block, n_dates))
+
+
+class _StreamingPortfolio:
+    """
+    逐日推进的组合状态，与 fast_backtest 的约定一致（t 日收盘调仓，赚 t → t+1 收益，区间内权重漂移），
+    只保存当前持仓权重，适合分日期块喂入。
+    """
+
+    def __init__(self, n_tickers: int, cost_bps: float, fixed_cost: float, initial_capital: float):
+        self.drift = np.zeros(n_tickers)      # 以当前组合价值为 1 的各股持仓
+        self.cash = 1.0
+        self.target = np.zeros(n_tickers)     # 最近一次调仓的目标权重
+        self.prev_close = None
+        self.capital = initial_capital
+        self.prop = cost_bps / 1e4
+        self.fixed_cost = fixed_cost
+        self.initial_capital = initial_capital
+
+    def run(self, close: np.ndarray, weights: np.ndarray, reb: np.ndarray) -> Dict[str, np.ndarray]:
+        n = len(close)
+        out = {k: np.zeros(n) for k in ("capital", "turnover", "holdings", "exposure", "costs")}
+        for i in range(n):
+            p = close[i]
+            if self.prev_close is None:
+                r = np.zeros_like(p)
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    r = p / self.prev_close - 1
+                r[~np.isfinite(r)] = 0.0
+            self.prev_close = p
+
+            grown = self.drift * (1 + r)
+            gross = grown.sum() + self.cash
+            if not np.isfinite(gross):
+                gross = 0.0
+            if gross > 0:
+                self.drift, self.cash = grown / gross, self.cash / gross
+            else:
+                self.drift, self.cash = np.zeros_like(grown), 0.0
+
+            turnover, n_trades = 0.0, 0
+            if reb[i]:
+                trade = np.abs(weights[i] - self.drift)
+                turnover, n_trades = trade.sum(), int((trade > 1e-12).sum())
+                self.target = weights[i]
+                self.drift, self.cash = weights[i].copy(), 1 - weights[i].sum()
+
+            before_cost = self.capital * gross
+            self.capital = before_cost * (1 - self.prop * turnover) - self.fixed_cost * n_trades
+            out["capital"][i] = self.capital
+            out["turnover"][i] = turnover
+            out["holdings"][i] = (self.target != 0).sum()
+            out["exposure"][i] = np.abs(self.target).sum()
+            out["costs"][i] = (before_cost * self.prop * turnover + self.fixed_cost * n_trades) / self.initial_capital
+        return out
+
+
+def _top_n_weights(factor: np.ndarray, top_n: int) -> np.ndarray:
+    """与 generate_top_n_signal + equal_weight 相同：每行因子值最大的 top_n 只等权"""
+    signal = top_k_mask(factor, top_n).astype("float64")
+    count = signal.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, signal / count, 0.0)
+
+
+def run_chunked_backtest(
+    source: Union[PanelStore, PricePanel, pd.DataFrame, CloseLoader],
+    factor: Union[str, dict],
+    tickers: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    top_n: int = 10,
+    rebalance: Union[str, List[str]] = "daily",
+    cost_bps: float = 0.0,
+    fixed_cost: float = 0.0,
+    initial_capital: float = 1_000_000.0,
+    memory_budget_mb: float = 512,
+    chunk_size: Optional[int] = None,
+    date_block: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+) -> dict:
+    """
+    分块（out-of-core）的 因子 → top_n 等权 → 回测 流程，结果与
+    get_factor → generate_top_n_signal → equal_weight → fast_backtest 一致，但不会同时持有整个股票池的面板：
+
+      1. 按 ticker 分块读取收盘价，计算时间序列因子（momentum / volatility / rsi / macd），
+         每块的收盘价与因子写到磁盘（.npy）
+      2. 按日期块从各分块文件中拼出截面，排名、生成权重，并推进组合状态
+
+    参数：
+      - source: PanelStore、PricePanel、价格 DataFrame，或 loader(tickers) -> 收盘价 的函数（需给出 tickers）
+      - factor: 因子名（支持别名）或 {"name": "rsi", "period": 6}
+      - memory_budget_mb: 内存预算，用于自动决定 chunk_size / date_block（也可直接指定）；
+        不含输入数据本身和与日期数成正比的少量结果数组
+      - spill_dir: 分块文件目录，默认临时目录，结束后删除
+    返回：与 fast_backtest 相同的 dict，另含 memory（预算、tracemalloc 峰值、分块信息）
+    """
+    if isinstance(factor, str):
+        factor = {"name": factor}
+    req = normalize_request({**factor, "name": resolve_factor_name(factor["name"])})
+    tickers, loader = _make_loader(source, tickers, start, end)
+
+    if isinstance(source, PanelStore):
+        n_dates_hint = len(source.dates[source.dates.slice_indexer(start, end)])
+    elif isinstance(source, (PricePanel, pd.DataFrame)):
+        n_dates_hint = len(to_close(source).loc[start:end])
+    else:
+        n_dates_hint = len(pd.bdate_range(start, end)) if start and end else 252 * 25
+    chunk_size = chunk_size or plan_chunks(n_dates_hint, len(tickers), memory_budget_mb)[0]
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    own_spill = spill_dir is None
+    spill = Path(spill_dir or tempfile.mkdtemp(prefix="quant_agent_chunks_"))
+    spill.mkdir(parents=True, exist_ok=True)
+    try:
+        # ---------- 阶段一：按 ticker 分块计算因子并落盘 ----------
+        chunks = []
+        for k, i in enumerate(range(0, len(tickers), chunk_size)):
+            names = tickers[i:i + chunk_size]
+            close = loader(names).reindex(columns=names).astype("float64")
+            factor_df = signal_factor(close, req)
+            np.save(spill / f"close_{k}.npy", close.to_numpy())
+            np.save(spill / f"factor_{k}.npy", factor_df.to_numpy(dtype="float64"))
+            # 各块日期通常相同：共用同一个索引对象，避免按块数成倍占用内存
+            same = chunks and chunks[-1]["dates"].equals(close.index)
+            chunks.append({"cols": slice(i, i + len(names)), "dates": chunks[-1]["dates"] if same else close.index})
+            del close, factor_df
+
+        dates = pd.DatetimeIndex([], name="Date")
+        for index in {id(c["dates"]): c["dates"] for c in chunks}.values():
+            dates = dates.union(index)
+        dates = dates.rename("Date")
+        positions = {}
+        for k, c in enumerate(chunks):
+            if id(c["dates"]) not in positions:
+                positions[id(c["dates"])] = dates.get_indexer(c["dates"])
+            c["pos"] = positions[id(c["dates"])]
+            c["close"] = np.load(spill / f"close_{k}.npy", mmap_mode="r")
+            c["factor"] = np.load(spill / f"factor_{k}.npy", mmap_mode="r")
+
+        # ---------- 阶段二：按日期块拼截面、排名、推进组合 ----------
+        date_block = date_block or plan_chunks(len(dates), len(tickers), memory_budget_mb)[1]
+        reb = rebalance_mask(dates, rebalance)
+        book = _StreamingPortfolio(len(tickers), cost_bps, fixed_cost, initial_capital)
+        parts = []
+        for a in range(0, len(dates), date_block):
+            b = min(a + date_block, len(dates))
+            close_blk = np.full((b - a, len(tickers)), np.nan)
+            factor_blk = np.full((b - a, len(tickers)), np.nan)
+            for c in chunks:
+                lo, hi = np.searchsorted(c["pos"], [a, b])
+                rows = c["pos"][lo:hi] - a
+                close_blk[rows, c["cols"]] = c["close"][lo:hi]
+                factor_blk[rows, c["cols"]] = c["factor"][lo:hi]
+            weights = _top_n_weights(factor_blk, top_n)
+            del factor_blk
+            parts.append(book.run(close_blk, weights, reb[a:b]))
+            del close_blk, weights
+        for c in chunks:
+            c.pop("close"), c.pop("factor")
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        if started:
+            tracemalloc.stop()
+        if own_spill:
+            shutil.rmtree(spill, ignore_errors=True)
+
+    series = {k: np.concatenate([p[k] for p in parts]) if parts else np.zeros(0) for k in
+              ("capital", "turnover", "holdings", "exposure", "costs")}
+    equity = series["capital"] / initial_capital
+    daily_ret = np.append(equity[0] - 1, equity[1:] / equity[:-1] - 1) if len(equity) else equity
+
+    result = {
+        "equity": pd.Series(equity, index=dates, name="equity"),
+        "returns": pd.Series(daily_ret, index=dates, name="returns"),
+        "turnover": pd.Series(series["turnover"], index=dates, name="turnover"),
+        "holdings": pd.Series(series["holdings"].astype(int), index=dates, name="holdings"),
+        "costs": pd.Series(series["costs"], index=dates, name="costs"),
+    }
+    result["stats"] = summary_stats(equity, daily_ret, series["turnover"], series["holdings"],
+                                     series["exposure"], series["costs"], int(reb.sum()))
+    result["memory"] = {
+        "budget_mb": memory_budget_mb,
+        "peak_mb": round(peak / 1024 ** 2, 2),
+        "chunk_size": chunk_size,
+        "n_chunks": len(chunks),
+        "date_block": date_block,
+        "n_date_blocks": len(parts),
+    }
+    return result
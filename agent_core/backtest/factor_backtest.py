@@ -4,15 +4,19 @@ import numpy as np
 
 import pandas as pd
 
+from agent_core.data.price_panel import PricePanel
+
 def backtest(price_df: pd.DataFrame, weight_df: pd.DataFrame) -> pd.Series:
     """
     简单回测：根据每日权重和次日收益率，计算组合净值
     参数：
-        - price_df: 股票每日收盘价（index 为日期，columns 为股票代码）
+        - price_df: 股票每日收盘价（index 为日期，columns 为股票代码），也可以是 PricePanel
         - weight_df: 每日持仓权重（index 和 columns 同上）
     返回：
         - equity_curve: 组合净值曲线
     """
+    if isinstance(price_df, PricePanel):
+        price_df = price_df["close"]
     returns = price_df.pct_change().shift(-1)  # shift(-1)：表示用今天的权重去赚明天的钱
     portfolio_returns = (weight_df * returns).sum(axis=1)
     equity = (1 + portfolio_returns).cumprod()
@@ -39,33 +43,164 @@ def group_backtest(factor: pd.Series, future_ret: pd.Series, n_groups: int = 5)
     return aligned.groupby("group").mean().iloc[:, 1]
 
 
+# ============================ #
+#   面板级 IC / 分组收益（全部为数组运算，无逐日循环）
+# ============================ #
+def _aligned_values(factor_df: pd.DataFrame, ret_df: pd.DataFrame):
+    """对齐日期与股票，只保留因子与收益同时有效的位置（其余置 NaN）"""
+    ret_df = ret_df.reindex(index=factor_df.index, columns=factor_df.columns)
+    x = factor_df.to_numpy(dtype="float64", copy=True)
+    y = ret_df.to_numpy(dtype="float64", copy=True)
+    mask = ~(np.isnan(x) | np.isnan(y))
+    x[~mask] = np.nan
+    y[~mask] = np.nan
+    return x, y, mask
+
+
+def _rowwise_pearson(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    n = mask.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dx = np.where(mask, x - (np.where(mask, x, 0).sum(axis=1) / n)[:, None], 0)
+        dy = np.where(mask, y - (np.where(mask, y, 0).sum(axis=1) / n)[:, None], 0)
+        corr = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+    corr[n < 2] = np.nan
+    return corr
+
+
+def calc_ic_series(factor_df: pd.DataFrame, ret_df: pd.DataFrame, method: str = "spearman") -> pd.Series:
+    """
+    每个日期的横截面 IC（一次算完所有日期）
+    输入：factor_df / ret_df 均为 index=date，columns=ticker；ret_df 通常是未来收益（见 forward_returns）
+    method："pearson" 或 "spearman"（秩相关，并列取平均秩，与 calc_ic 一致）
+    """
+    x, y, mask = _aligned_values(factor_df, ret_df)
+    if method == "spearman":
+        # 在共同有效的样本上按行排名（NaN 不参与）
+        x = pd.DataFrame(x).rank(axis=1).to_numpy()
+        y = pd.DataFrame(y).rank(axis=1).to_numpy()
+    elif method != "pearson":
+        raise ValueError(f"Unknown IC method: {method!r}. Use 'pearson' or 'spearman'.")
+    return pd.Series(_rowwise_pearson(x, y, mask), index=factor_df.index, name=f"ic_{method}")
+
+
+def forward_returns(close: pd.DataFrame, horizon: int = 1) -> pd.DataFrame:
+    """未来 horizon 期收益：close[t + h] / close[t] - 1"""
+    return close.shift(-horizon) / close - 1
+
+
+def quantile_returns(factor_df: pd.DataFrame, ret_df: pd.DataFrame, n_groups: int = 5) -> pd.DataFrame:
+    """
+    每个日期按因子值等分 n_groups 组，计算各组收益均值（group_backtest 的全日期版本，分组规则与 pd.qcut 相同）
+    返回：index=date，columns=组号 0..n_groups-1（0 为因子值最小的一组）
+    """
+    x, y, mask = _aligned_values(factor_df, ret_df)
+    n = mask.sum(axis=1)
+
+    # 每行的分位点（线性插值，同 qcut），NaN 排在每行末尾不影响前 n 个有效值
+    s = np.sort(x, axis=1)
+    pos = np.linspace(0, 1, n_groups + 1)[None, :] * np.maximum(n - 1, 0)[:, None]
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0)[:, None])
+    s_lo = np.take_along_axis(s, lo, axis=1)
+    s_hi = np.take_along_axis(s, hi, axis=1)
+    edges = s_lo + (s_hi - s_lo) * (pos - lo)
+
+    # 右闭区间：组号 = 严格小于该值的内部分位点个数
+    group = np.zeros(x.shape, dtype=np.int64)
+    for k in range(1, n_groups):
+        group += x > edges[:, k:k + 1]
+
+    out = np.full((len(x), n_groups), np.nan)
+    for g in range(n_groups):
+        in_group = mask & (group == g)
+        count = in_group.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:, g] = np.where(in_group, y, 0).sum(axis=1) / count
+    return pd.DataFrame(out, index=factor_df.index, columns=pd.RangeIndex(n_groups, name="group"))
+
+
+def ic_summary(ic: pd.Series) -> dict:
+    """IC 序列汇总：均值、标准差、ICIR、t 值、IC>0 占比"""
+    ic = ic.dropna()
+    n = len(ic)
+    mean, std = ic.mean(), ic.std()
+    icir = mean / std if std > 0 else np.nan
+    return {
+        "ic_mean": mean,
+        "ic_std": std,
+        "icir": icir,
+        "t_stat": icir * np.sqrt(n) if n else np.nan,
+        "positive_ratio": (ic > 0).mean() if n else np.nan,
+        "n_periods": n,
+    }
+
+
+def ic_decay(factor_df: pd.DataFrame, close: pd.DataFrame, horizons=(1, 5, 10, 20), method: str = "spearman") -> pd.DataFrame:
+    """
+    IC 衰减：因子与不同持有期未来收益的 IC 汇总
+    返回：index=horizon，columns=ic_summary 中的指标
+    """
+    rows = {h: ic_summary(calc_ic_series(factor_df, forward_returns(close, h), method)) for h in horizons}
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("horizon")
+
+
+def _close_panel(price_panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    从价格面板中取出收盘价（index=date，columns=ticker），兼容三种结构：
+      - index = MultiIndex[field, date]，columns = ticker
+      - index = date，columns = MultiIndex[field, ticker]（get_res_price_data 的输出）
+      - PricePanel（返回 close 的零拷贝视图）
+    """
+    if isinstance(price_panel, PricePanel) or isinstance(price_panel.columns, pd.MultiIndex):
+        return price_panel["close"]
+    return price_panel.loc["close"]
+
+
 def backtest_equal_weight(factor_panel: pd.Series, price_panel: pd.DataFrame, top_pct: float = 0.2) -> pd.Series:
     """
     简单回测：每期买入因子得分 top_pct 的股票，等权持有一周期
     输入：
       factor_panel: MultiIndex[date, ticker] 的因子值
-      price_panel: MultiIndex[field, ticker] 的收盘价（需要 ['close', ...]）
+      price_panel: 含 'close' 字段的价格面板（MultiIndex[field, date] 行索引，或 MultiIndex[field, ticker] 列索引）
     返回：净值序列（Series，index=date）
+
+    向量化实现：因子面板一次 unstack 成 date × ticker 矩阵，所有日期的选股用一次排序完成，
+    净值用一次 cumprod 得到。结果与原逐日循环一致（tests/test_factor_backtest.py），
+    耗时见 benchmarks 的 backtest.equal_weight 用例。
+
+    约定：
+      - 每期选 int(有效因子个数 × top_pct) 只，得分相同时按 ticker 顺序取前者（与 nlargest 一致）
+      - 持仓期收益 = 下一个因子日期收盘价 / 当期收盘价 - 1，缺失价格的股票不计入平均
+      - 价格面板中缺少起止日期的持仓期被跳过
     """
     factor_panel = factor_panel.dropna()
-    nav = []
-    dates = sorted(factor_panel.index.get_level_values(0).unique())
+    scores = factor_panel.unstack().sort_index()
+    dates = scores.index
+    if len(dates) < 2:
+        return pd.Series(dtype="float64")
 
-    for i in range(len(dates) - 1):
-        date = dates[i]
-        next_date = dates[i + 1]
+    values = scores.to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
 
-        daily_scores = factor_panel.loc[date]
-        top = daily_scores.nlargest(int(len(daily_scores) * top_pct))
-        tickers = top.index.tolist()
-
-        try:
-            p0 = price_panel.loc["close", tickers].loc[date]
-            p1 = price_panel.loc["close", tickers].loc[next_date]
-        except KeyError:
-            continue
+    # 每行排序：有效值在前、按得分降序，得分相同保持列顺序（stable）
+    order = np.lexsort((-np.where(valid, values, 0.0), ~valid), axis=1)
+    rank = np.empty_like(order)
+    rank[np.arange(len(dates))[:, None], order] = np.arange(values.shape[1])
+    n_pick = (valid.sum(axis=1) * top_pct).astype(int)
+    holdings = rank < n_pick[:, None]
 
+    close = _close_panel(price_panel)
+    in_prices = dates.isin(close.index)
+    p = close.reindex(index=dates, columns=scores.columns).to_numpy(dtype="float64")
+    p0, p1 = p[:-1], p[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
         ret = (p1 - p0) / p0
-        nav.append((1 + ret.mean()) if nav == [] else nav[-1] * (1 + ret.mean()))
 
-    return pd.Series(nav, index=dates[1:])
+    held = holdings[:-1] & ~np.isnan(ret)
+    n_held = held.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        period_ret = np.where(held, ret, 0.0).sum(axis=1) / n_held
+
+    keep = in_prices[:-1] & in_prices[1:]
+    nav = np.cumprod(1 + period_ret[keep])
+    return pd.Series(nav, index=dates[1:][keep])
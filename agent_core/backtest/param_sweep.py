@@ -0,0 +1,134 @@
+# agent_core/backtest/param_sweep.py
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agent_core.backtest.array_backtest import fast_backtest, to_close
+from agent_core.factors.factor_engine import normalize_request, signal_factor
+from agent_core.factors.factor_registry import resolve_factor_name
+from agent_core.strategy.strategy_builder import equal_weight, select_top_n
+
+TASK_COLUMNS = ["factor", "params", "top_n", "universe"]
+RESULT_COLUMNS = ["sharpe_ratio", "max_drawdown", "annual_turnover", "total_return", "annual_return", "volatility"]
+
+# worker 进程内挂载的共享价格面板
+_PANEL: Dict[str, object] = {}
+
+
+def _attach(shm_name: str, shape: tuple, dates: np.ndarray, tickers: List[str]) -> None:
+    """worker 初始化：按名字挂载共享内存中的收盘价矩阵，不拷贝、不 pickle 面板"""
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Python < 3.13 没有 track 参数：挂载方不应登记到 resource_tracker，由创建方负责释放
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=shm_name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+    _PANEL["shm"] = shm
+    _PANEL["close"] = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+    _PANEL["dates"] = pd.DatetimeIndex(dates)
+    _PANEL["tickers"] = pd.Index(tickers)
+
+
+def _run_task(task: dict) -> dict:
+    cols = task["columns"]
+    values = _PANEL["close"] if cols is None else _PANEL["close"][:, cols]
+    tickers = _PANEL["tickers"] if cols is None else _PANEL["tickers"][cols]
+    close = pd.DataFrame(values, index=_PANEL["dates"], columns=tickers, copy=False)
+
+    req = normalize_request({"name": task["factor"], **task["params"]})
+    factor_df = signal_factor(close, req)
+
+    weight_df = equal_weight(select_top_n(factor_df, top_n=task["top_n"]))
+    stats = fast_backtest(close, weight_df, rebalance=task["rebalance"], cost_bps=task["cost_bps"])["stats"]
+    return {
+        "factor": req["name"],
+        "params": ", ".join(f"{k}={v}" for k, v in req["params"].items()),
+        "top_n": task["top_n"],
+        "universe": task["universe"],
+        **{k: stats.get(k, np.nan) for k in RESULT_COLUMNS},
+    }
+
+
+def _expand_grid(factor_grid: Dict[str, Dict[str, list]]) -> List[tuple]:
+    """{"动量": {"window": [10, 20]}} → [("momentum", {"window": 10}), ("momentum", {"window": 20})]；因子名支持别名"""
+    combos = []
+    for name, grid in factor_grid.items():
+        name = resolve_factor_name(name)
+        grid = grid or {}
+        keys = list(grid)
+        values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+        for combo in itertools.product(*values):
+            combos.append((name, dict(zip(keys, combo))))
+    return combos
+
+
+def run_param_sweep(
+    price_df: pd.DataFrame,
+    factor_grid: Dict[str, Dict[str, list]],
+    top_n: List[int] = (10,),
+    universes: Optional[Dict[str, List[str]]] = None,
+    rebalance: str = "daily",
+    cost_bps: float = 0.0,
+    max_workers: Optional[int] = None,
+    rank_by: str = "sharpe_ratio",
+) -> pd.DataFrame:
+    """
+    参数网格扫描：因子参数 × top_n × 股票池，每个组合跑一次 因子 → 信号 → 回测。
+
+    收盘价面板只放进共享内存一次，进程池中的 worker 直接挂载读取，任务本身只传参数。
+    参数：
+      - price_df: get_res_price_data 的 (field, ticker) 面板或收盘价矩阵（需覆盖所有股票池）
+      - factor_grid: 如 {"momentum": {"window": [10, 20, 60]}, "rsi": {"period": [6, 14]}}
+      - universes: {名称: ticker 列表}，默认用整个面板
+      - max_workers: 进程数，1 表示在当前进程内顺序执行
+    返回：按 rank_by 降序排列的结果表（含 sharpe / 回撤 / 换手等）；网格为空（或某个参数没有取值）时返回空表
+    """
+    close = to_close(price_df).astype("float64")
+    tickers = list(close.columns)
+    position = {t: i for i, t in enumerate(tickers)}
+    universes = universes or {"all": None}
+
+    tasks = []
+    for (name, params), n, (uni_name, uni) in itertools.product(_expand_grid(factor_grid), top_n, universes.items()):
+        cols = None if uni is None else [position[t] for t in uni if t in position]
+        tasks.append({
+            "factor": name, "params": params, "top_n": int(n), "universe": uni_name,
+            "columns": cols, "rebalance": rebalance, "cost_bps": cost_bps,
+        })
+
+    if not tasks:
+        return _ranked(pd.DataFrame(columns=TASK_COLUMNS + RESULT_COLUMNS), rank_by)
+
+    values = np.ascontiguousarray(close.to_numpy())
+    workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        _PANEL.update(close=values, dates=close.index, tickers=close.columns)
+        try:
+            rows = [_run_task(t) for t in tasks]
+        finally:
+            _PANEL.clear()
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype="float64", buffer=shm.buf)[:] = values
+            initargs = (shm.name, values.shape, close.index.to_numpy(), tickers)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=initargs) as pool:
+                rows = list(pool.map(_run_task, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return _ranked(pd.DataFrame(rows), rank_by)
+
+
+def _ranked(table: pd.DataFrame, rank_by: str) -> pd.DataFrame:
+    table = table.sort_values(rank_by, ascending=False, na_position="last").reset_index(drop=True)
+    table.index = table.index + 1
+    table.index.name = "rank"
+    return table
@@ -0,0 +1,28 @@
+# agent_core/config.py
+import os
+from pathlib import Path
+
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    """
+    加载 .env（FRED_API_KEY / OPENAI_API_KEY / QUANT_AGENT_* 等），只加载一次、不覆盖已有的环境变量。
+    不在 import 时执行：由入口（server / chat）和第一次创建 FRED 客户端时调用。
+    """
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def cache_dir(*parts: str) -> Path:
+    """
+    本地缓存根目录（默认 ~/.cache/quant_agent），可用环境变量 QUANT_AGENT_CACHE_DIR 覆盖。
+    每次调用时读取环境变量，保证 .env 在 import 之后加载也能生效。
+    """
+    root = os.getenv("QUANT_AGENT_CACHE_DIR") or str(Path.home() / ".cache" / "quant_agent")
+    path = Path(root).expanduser().joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
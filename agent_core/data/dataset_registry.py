@@ -0,0 +1,155 @@
+# agent_core/data/dataset_registry.py
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import pandas as pd
+
+from agent_core.data.price_panel import PricePanel
+
+# describe() 中最多列出多少个 ticker / 列名
+MAX_LISTED = 20
+
+
+def _nbytes(obj) -> int:
+    if isinstance(obj, PricePanel):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    return 0
+
+
+def _short_list(values) -> list:
+    values = [str(v) for v in values]
+    return values if len(values) <= MAX_LISTED else values[:MAX_LISTED] + [f"... (+{len(values) - MAX_LISTED})"]
+
+
+def summarize(obj) -> Dict[str, Any]:
+    """数据集的简要信息：形状、字段 / ticker、日期范围、内存占用，外加最近一期的截面统计"""
+    info: Dict[str, Any] = {"type": type(obj).__name__, "nbytes": _nbytes(obj)}
+    if isinstance(obj, PricePanel):
+        info["fields"] = list(obj.fields)
+        obj = obj["close"] if "close" in obj else obj.frame(obj.fields[0])
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        info["shape"] = list(obj.shape)
+        if isinstance(obj.index, pd.DatetimeIndex) and len(obj.index):
+            info["start"] = str(obj.index[0].date())
+            info["end"] = str(obj.index[-1].date())
+    if isinstance(obj, pd.DataFrame):
+        if isinstance(obj.columns, pd.MultiIndex):
+            info["levels"] = {name or f"level_{i}": _short_list(level)
+                              for i, (name, level) in enumerate(zip(obj.columns.names, obj.columns.levels))}
+        else:
+            info["columns"] = _short_list(obj.columns)
+        if len(obj):
+            last = obj.iloc[-1]
+            if isinstance(obj.columns, pd.MultiIndex) and "close" in obj.columns.get_level_values(0):
+                last = obj["close"].iloc[-1]
+            last = pd.to_numeric(last, errors="coerce")
+            info["last"] = {
+                "date": str(obj.index[-1].date()) if isinstance(obj.index, pd.DatetimeIndex) else str(obj.index[-1]),
+                "count": int(last.notna().sum()),
+                "mean": None if last.isna().all() else round(float(last.mean()), 6),
+                "min": None if last.isna().all() else round(float(last.min()), 6),
+                "max": None if last.isna().all() else round(float(last.max()), 6),
+            }
+    return {k: v for k, v in info.items() if v is not None}
+
+
+class DatasetRegistry:
+    """
+    会话内的数据集登记表：工具把价格 / 因子 / 权重等大对象存在服务端，只把短 handle 和摘要返回给模型，
+    后续工具用 handle 取回对象，不再重复下载或在消息里传整张表。
+
+      - 按字节数限制的 LRU（max_bytes），最久未用的数据集先被淘汰
+      - key 可选：相同请求（如同一组 ticker + 日期区间）在数据集仍存活时直接复用已有 handle
+    """
+
+    def __init__(self, max_bytes: int = 1024 ** 3):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+        self._keys: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {"puts": 0, "hits": 0, "reuses": 0, "evictions": 0, "bytes": 0}
+
+    def put(self, obj, kind: str = "data", key: Optional[Hashable] = None, meta: Optional[dict] = None) -> str:
+        """登记一个数据集，返回 handle（如 prices_1a2b3c4d）"""
+        handle = f"{kind}_{uuid.uuid4().hex[:8]}"
+        size = _nbytes(obj)
+        with self._lock:
+            self._items[handle] = {"obj": obj, "kind": kind, "key": key, "meta": meta or {}, "nbytes": size}
+            if key is not None:
+                self._keys[key] = handle
+            self.stats["puts"] += 1
+            self.stats["bytes"] += size
+            # 至少保留刚放进来的这一个
+            while self.stats["bytes"] > self.max_bytes and len(self._items) > 1:
+                old, item = self._items.popitem(last=False)
+                self._forget(old, item)
+                self.stats["evictions"] += 1
+        return handle
+
+    def _forget(self, handle: str, item: dict) -> None:
+        self.stats["bytes"] -= item["nbytes"]
+        if item["key"] is not None and self._keys.get(item["key"]) == handle:
+            del self._keys[item["key"]]
+
+    def lookup(self, key: Hashable) -> Optional[str]:
+        """按请求 key 查找仍存活的 handle"""
+        with self._lock:
+            handle = self._keys.get(key)
+            if handle is not None:
+                self._items.move_to_end(handle)
+                self.stats["reuses"] += 1
+            return handle
+
+    def get(self, handle: str):
+        with self._lock:
+            if handle not in self._items:
+                raise KeyError(f"Unknown or evicted dataset handle: {handle!r}. Re-run the data tool to get a new one.")
+            self._items.move_to_end(handle)
+            self.stats["hits"] += 1
+            return self._items[handle]["obj"]
+
+    def describe(self, handle: str) -> Dict[str, Any]:
+        obj = self.get(handle)
+        with self._lock:
+            item = self._items[handle]
+            return {"handle": handle, "kind": item["kind"], **item["meta"], **summarize(obj)}
+
+    def list(self) -> list:
+        with self._lock:
+            return [{"handle": h, "kind": it["kind"], "nbytes": it["nbytes"], **it["meta"]}
+                    for h, it in self._items.items()]
+
+    def drop(self, handle: str) -> None:
+        with self._lock:
+            item = self._items.pop(handle, None)
+            if item is not None:
+                self._forget(handle, item)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._keys.clear()
+            self.stats["bytes"] = 0
+
+    def __contains__(self, handle: str) -> bool:
+        return handle in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# 默认登记表（MCP server 与 chat 共用），可用 set_dataset_registry 替换
+_DATASET_REGISTRY = DatasetRegistry()
+
+def get_dataset_registry() -> DatasetRegistry:
+    return _DATASET_REGISTRY
+
+def set_dataset_registry(registry: DatasetRegistry) -> None:
+    global _DATASET_REGISTRY
+    _DATASET_REGISTRY = registry
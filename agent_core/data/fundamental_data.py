@@ -1,4 +1,4 @@
-import pandas as pd, yfinance as yf
+import pandas as pd
 from typing import List
 
 # def get_fundamental_data(tickers: List[str]) -> pd.DataFrame:
@@ -53,9 +53,25 @@ from typing import List
 #     return fundamentals
 
 import pandas as pd
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Literal, Optional
 
+from agent_core.data.fundamental_store import FundamentalStore
+from agent_core.data.singleflight import SingleFlight
+from agent_core.data.rate_limit import get_limiter, is_empty_result
+from agent_core.lazy import lazy_import
+
+yf = lazy_import("yfinance")
+
+# 报表类型 → yf.Ticker 上对应的属性
+STATEMENT_ATTRS = {
+    "income": "financials",
+    "balance": "balance_sheet",
+    "cashflow": "cashflow",
+}
+
+VALUATION_FIELDS = ["trailingPE", "forwardPE", "priceToBook", "dividendYield", "marketCap", "beta"]
+
 # ============================ #
 #   基础工具函数
 # ============================ #
@@ -71,58 +87,90 @@ def _get_report_by_period(df: pd.DataFrame, period: str) -> pd.Series:
         raise ValueError(f"Period '{period}' not available. Available: {list(df.columns)}")
 
 
-# ============================ #
-#   获取不同类型的财务报表
-# ============================ #
-def get_income_statement(ticker: str, period: str = "latest") -> pd.DataFrame:
-    tkr = yf.Ticker(ticker)
-    is_data = _get_report_by_period(tkr.financials, period)
-    df = is_data.to_frame().T
-    df.index.name = "report_date"
-    df.columns = pd.MultiIndex.from_product(
-        [[ticker], df.columns, ["income"]],
-        names=["ticker", "field", "report_type"]
-    )
-    return df
+# 默认快照库（延迟创建），可用 set_fundamental_store 替换；store 为 None 时总是实时抓取
+_STORE: Optional[FundamentalStore] = None
+_USE_STORE = True
 
-def get_balance_sheet(ticker: str, period: str = "latest") -> pd.DataFrame:
-    tkr = yf.Ticker(ticker)
-    bs_data = _get_report_by_period(tkr.balance_sheet, period)
-    df = bs_data.to_frame().T
-    df.index.name = "report_date"
-    df.columns = pd.MultiIndex.from_product(
-        [[ticker], df.columns, ["balance"]],
-        names=["ticker", "field", "report_type"]
-    )
-    return df
+# 同一 ticker 同一类报表的并发请求只抓取一次
+_FUNDAMENTAL_FLIGHT = SingleFlight("fundamentals")
+
+def get_fundamental_store() -> Optional[FundamentalStore]:
+    global _STORE
+    if _STORE is None and _USE_STORE:
+        _STORE = FundamentalStore()
+    return _STORE
+
+def set_fundamental_store(store: Optional[FundamentalStore]) -> None:
+    global _STORE, _USE_STORE
+    _STORE = store
+    _USE_STORE = store is not None
 
-def get_cashflow_statement(ticker: str, period: str = "latest") -> pd.DataFrame:
-    tkr = yf.Ticker(ticker)
-    cf_data = _get_report_by_period(tkr.cashflow, period)
-    df = cf_data.to_frame().T
+
+def _load(ticker: str, kind: str, fetch, as_of: Optional[str] = None):
+    """
+    统一的数据入口：
+      - as_of 不为空：只查本地快照（point-in-time），不联网
+      - 否则 TTL 内读快照，过期再抓取并存档
+    """
+    store = get_fundamental_store()
+    if as_of is not None:
+        if store is None:
+            raise ValueError("as_of 查询需要启用 FundamentalStore")
+        return store.as_of(ticker, kind, as_of)
+    if store is None:
+        return _FUNDAMENTAL_FLIGHT.do((ticker, kind, None), fetch)
+    return _FUNDAMENTAL_FLIGHT.do((ticker, kind, id(store)), lambda: store.get(ticker, kind, fetch))
+
+
+def _load_statement(ticker: str, kind: str, tkr: Optional["yf.Ticker"], as_of: Optional[str]) -> pd.DataFrame:
+    # ETF 等没有财报的 ticker 本来就返回空表，不做空结果重试
+    fetch = lambda: get_limiter("yahoo").call(getattr, tkr or yf.Ticker(ticker), STATEMENT_ATTRS[kind])
+    return _load(ticker, kind, fetch, as_of)
+
+
+def _to_statement_frame(ticker: str, data: pd.Series, report_type: str) -> pd.DataFrame:
+    df = data.to_frame().T
     df.index.name = "report_date"
     df.columns = pd.MultiIndex.from_product(
-        [[ticker], df.columns, ["cashflow"]],
+        [[ticker], df.columns, [report_type]],
         names=["ticker", "field", "report_type"]
     )
     return df
 
 
+# ============================ #
+#   获取不同类型的财务报表
+# ============================ #
+def get_income_statement(
+    ticker: str, period: str = "latest", tkr: Optional["yf.Ticker"] = None, as_of: Optional[str] = None
+) -> pd.DataFrame:
+    is_data = _get_report_by_period(_load_statement(ticker, "income", tkr, as_of), period)
+    return _to_statement_frame(ticker, is_data, "income")
+
+def get_balance_sheet(
+    ticker: str, period: str = "latest", tkr: Optional["yf.Ticker"] = None, as_of: Optional[str] = None
+) -> pd.DataFrame:
+    bs_data = _get_report_by_period(_load_statement(ticker, "balance", tkr, as_of), period)
+    return _to_statement_frame(ticker, bs_data, "balance")
+
+def get_cashflow_statement(
+    ticker: str, period: str = "latest", tkr: Optional["yf.Ticker"] = None, as_of: Optional[str] = None
+) -> pd.DataFrame:
+    cf_data = _get_report_by_period(_load_statement(ticker, "cashflow", tkr, as_of), period)
+    return _to_statement_frame(ticker, cf_data, "cashflow")
+
+
 # ============================ #
 #   获取估值指标（TTM）
 # ============================ #
-def get_valuation_metrics(ticker: str) -> pd.DataFrame:
-    tkr = yf.Ticker(ticker)
-    info = tkr.info
+def get_valuation_metrics(ticker: str, tkr: Optional["yf.Ticker"] = None, as_of: Optional[str] = None) -> pd.DataFrame:
+    def fetch():
+        info = get_limiter("yahoo").call(getattr, tkr or yf.Ticker(ticker), "info", is_empty=is_empty_result)
+        return {field: info.get(field) for field in VALUATION_FIELDS}
+
+    info = _load(ticker, "valuation", fetch, as_of)
     df = pd.Series(
-        {
-            "trailingPE":    info.get("trailingPE"),
-            "forwardPE":     info.get("forwardPE"),
-            "priceToBook":   info.get("priceToBook"),
-            "dividendYield": info.get("dividendYield"),
-            "marketCap":     info.get("marketCap"),
-            "beta":          info.get("beta"),
-        },
+        {field: info.get(field) for field in VALUATION_FIELDS},
         name="ttm",
     ).to_frame().T
     df.columns = pd.MultiIndex.from_product(
@@ -136,29 +184,46 @@ def get_valuation_metrics(ticker: str) -> pd.DataFrame:
 # ============================ #
 #   主函数：按需组合信息
 # ============================ #
+def _fetch_ticker_fundamentals(
+    ticker: str, period: str, include: List[str], as_of: Optional[str] = None
+) -> List[pd.DataFrame]:
+    """
+    依次取单个 ticker 所需的报表。不预先创建 yf.Ticker：只有快照缺失 / 过期、真正要抓取时才创建，
+    as_of 查询和 TTL 内的快照命中完全不碰 yfinance
+    """
+    frames = []
+    if "income" in include:
+        frames.append(get_income_statement(ticker, period, as_of=as_of))
+    if "balance" in include:
+        frames.append(get_balance_sheet(ticker, period, as_of=as_of))
+    if "cashflow" in include:
+        frames.append(get_cashflow_statement(ticker, period, as_of=as_of))
+    if "valuation" in include:
+        frames.append(get_valuation_metrics(ticker, as_of=as_of))
+    return frames
+
+
 def get_fundamental_data(
     tickers: List[str],
     period: str = "latest",
     include: Optional[List[Literal["income", "balance", "cashflow", "valuation"]]] = None,
+    max_workers: int = 8,
+    as_of: Optional[str] = None,
 ) -> pd.DataFrame:
+    """
+    多只股票的财报 + 估值数据。
+    ticker 去重后在线程池中并发抓取（最多 max_workers 个并发），最后只做一次 concat。
+    as_of 不为空时只查本地快照，返回当时已知的数据。
+    返回 columns = MultiIndex[ticker, field, report_type]
+    """
     if include is None:
         include = ["income", "balance", "cashflow", "valuation"]
+    tickers = list(dict.fromkeys(tickers))
 
-    all_frames = []
-
-    for ticker in tickers:
-        frames = []
-        if "income" in include:
-            frames.append(get_income_statement(ticker, period))
-        if "balance" in include:
-            frames.append(get_balance_sheet(ticker, period))
-        if "cashflow" in include:
-            frames.append(get_cashflow_statement(ticker, period))
-        if "valuation" in include:
-            frames.append(get_valuation_metrics(ticker))
-
-        all_frames.append(pd.concat(frames, axis=1))
+    workers = max(1, min(max_workers, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_ticker = list(pool.map(lambda tk: _fetch_ticker_fundamentals(tk, period, include, as_of), tickers))
 
-    result = pd.concat(all_frames, axis=1)
+    result = pd.concat([f for frames in per_ticker for f in frames], axis=1)
     result.index.name = "report_date"
     return result
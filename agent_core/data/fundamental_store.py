@@ -0,0 +1,90 @@
+# agent_core/data/fundamental_store.py
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Union
+from urllib.parse import quote
+
+import pandas as pd
+
+from agent_core.config import cache_dir
+
+_TS_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+class FundamentalStore:
+    """
+    基本面快照库：每次抓取财报 / 估值时，把原始结果连同抓取时间（as-of）存一份快照。
+    目录结构：root/{ticker}/{kind}/{as_of}.pkl，kind ∈ income / balance / cashflow / valuation
+
+    - get: TTL 内有快照就直接读盘，否则调用 fetch 抓取并存档
+    - as_of: 回答“在 X 日我们知道什么”，只读本地快照，不联网
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, ttl: pd.Timedelta = pd.Timedelta(hours=24)):
+        self.root = Path(root) if root is not None else cache_dir("fundamentals")
+        self.ttl = pd.Timedelta(ttl)
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str, kind: str) -> Path:
+        return self.root / quote(ticker, safe="") / kind
+
+    def snapshots(self, ticker: str, kind: str) -> List[pd.Timestamp]:
+        """已有快照的抓取时间（升序）"""
+        d = self._dir(ticker, kind)
+        if not d.exists():
+            return []
+        return sorted(pd.Timestamp(datetime.strptime(p.stem, _TS_FORMAT)) for p in d.glob("*.pkl"))
+
+    def _read(self, ticker: str, kind: str, ts: pd.Timestamp) -> Any:
+        return pd.read_pickle(self._dir(ticker, kind) / f"{ts.strftime(_TS_FORMAT)}.pkl")
+
+    def save(self, ticker: str, kind: str, data: Any, as_of: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+        ts = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now()
+        d = self._dir(ticker, kind)
+        with self._lock:
+            d.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再改名：中断时不会留下半个 .pkl 让 snapshots / _read 读到
+            path = d / f"{ts.strftime(_TS_FORMAT)}.pkl"
+            tmp = path.with_suffix(".pkl.tmp")
+            try:
+                pd.to_pickle(data, tmp)
+                tmp.replace(path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        return ts
+
+    def latest(self, ticker: str, kind: str, ttl: Optional[pd.Timedelta] = None) -> Optional[Any]:
+        """TTL 内最新的一份快照，没有则返回 None"""
+        snaps = self.snapshots(ticker, kind)
+        if not snaps:
+            return None
+        ttl = self.ttl if ttl is None else pd.Timedelta(ttl)
+        if pd.Timestamp.now() - snaps[-1] > ttl:
+            return None
+        return self._read(ticker, kind, snaps[-1])
+
+    def as_of(self, ticker: str, kind: str, date: Union[str, pd.Timestamp]) -> Any:
+        """
+        截至 date 时最新的快照（point-in-time）。
+        只给日期（如 '2024-03-31'）时包含当天全部快照。
+        """
+        ts = pd.Timestamp(date)
+        if isinstance(date, str) and len(date.strip()) <= 10:
+            ts = ts + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        snaps = [s for s in self.snapshots(ticker, kind) if s <= ts]
+        if not snaps:
+            raise KeyError(f"No {kind} snapshot for {ticker} on or before {date}")
+        return self._read(ticker, kind, snaps[-1])
+
+    def get(self, ticker: str, kind: str, fetch: Callable[[], Any], ttl: Optional[pd.Timedelta] = None) -> Any:
+        cached = self.latest(ticker, kind, ttl)
+        if cached is not None:
+            return cached
+        data = fetch()
+        # 空结果多半是网络 / 限流问题，不存档
+        empty = data is None or (hasattr(data, "empty") and data.empty) or (isinstance(data, dict) and not data)
+        if not empty:
+            self.save(ticker, kind, data)
+        return data
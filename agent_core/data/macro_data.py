@@ -1,17 +1,73 @@
-from fredapi import Fred
 import pandas as pd
 import os
-from dotenv import load_dotenv
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
+from agent_core.config import load_env
+from agent_core.data.macro_store import MacroStore
+from agent_core.data.singleflight import SingleFlight
+from agent_core.data.rate_limit import get_limiter
+
+
+# FRED 客户端在第一次请求时才创建（建议把 FRED_API_KEY 存到 .env 文件），可用 set_fred 替换
+_FRED = None
+
+def get_fred():
+    global _FRED
+    if _FRED is None:
+        from fredapi import Fred
+        load_env()
+        _FRED = Fred(api_key=os.getenv("FRED_API_KEY"))
+    return _FRED
+
+def set_fred(client) -> None:
+    global _FRED
+    _FRED = client
+
+
+# 默认序列库（延迟创建），可用 set_macro_store 替换；store 为 None 时总是实时抓取
+_STORE: Optional[MacroStore] = None
+_USE_STORE = True
+
+def get_macro_store() -> Optional[MacroStore]:
+    global _STORE
+    if _STORE is None and _USE_STORE:
+        _STORE = MacroStore()
+    return _STORE
+
+def set_macro_store(store: Optional[MacroStore]) -> None:
+    global _STORE, _USE_STORE
+    _STORE = store
+    _USE_STORE = store is not None
+
+
+# 同一序列的并发请求合并；日期区间被进行中的请求包含时直接截取它的结果
+def _covers_series(inflight: dict, req: dict) -> bool:
+    return (inflight["series_id"] == req["series_id"] and inflight["start"] <= req["start"]
+            and (inflight["end"] is None or (req["end"] is not None and req["end"] <= inflight["end"])))
+
+def _extract_series(s: pd.Series, req: dict) -> pd.Series:
+    return s.loc[req["start"]:req["end"]]
+
+_MACRO_FLIGHT = SingleFlight("macro", covers=_covers_series, extract=_extract_series)
+
+
+def _fetch_series(series_id: str, start: str, end: Optional[str]) -> pd.Series:
+    # FRED 被限流时返回 HTTP 429（抛异常）；空序列是正常结果（如增量更新时没有新数据）
+    return get_limiter("fred").call(get_fred().get_series, series_id, observation_start=start, observation_end=end)
+
+
+def _load_series(series_id: str, start: str, end: Optional[str]) -> pd.Series:
+    store = get_macro_store()
+    if store is None:
+        return _fetch_series(series_id, start, end)
+    return store.get(series_id, start, end, lambda s, e: _fetch_series(series_id, s, e))
 
-# 初始化 FRED 客户端
-FRED_API_KEY = os.getenv("FRED_API_KEY")  # 建议存到 .env 文件
-fred = Fred(api_key=FRED_API_KEY)
 
 # 获取单个宏观指标数据
 def get_macro_data(series_id: str, start: str = "2000-01-01", end: str = None) -> pd.DataFrame:
-    df = fred.get_series(series_id, observation_start=start, observation_end=end)
+    request = {"series_id": series_id, "start": pd.Timestamp(start), "end": pd.Timestamp(end) if end else None}
+    df = _MACRO_FLIGHT.do((series_id, start, end), lambda: _load_series(series_id, start, end), request)
     df = df.to_frame(name=series_id)
     df.index.name = "date"
     return df
@@ -25,6 +81,26 @@ MACRO_SERIES = {
 }
 
 # 获取多个指标
-def get_macro_dataset(indicators: list[str], start: str = "2000-01-01", end: str = None) -> pd.DataFrame:
-    frames = [get_macro_data(MACRO_SERIES[ind], start, end) for ind in indicators]
-    return pd.concat(frames, axis=1)
+def get_macro_dataset(indicators: list[str], start: str = "2000-01-01", end: str = None,
+                      fill: Optional[str] = "ffill", freq: Optional[str] = None, max_workers: int = 8) -> pd.DataFrame:
+    """
+    多个指标并发抓取，一次对齐到同一索引：
+      - 默认索引为各序列观测日的并集，fill="ffill" 时每个日期取当时最新的已公布值（None 保留 NaN）
+      - freq（如 "D" / "B" / "ME"）不为空时对齐到该频率的日期网格
+    indicators 可以是 MACRO_SERIES 里的名称，也可以直接是 FRED 序列 ID。
+    """
+    series_ids = [MACRO_SERIES.get(ind, ind) for ind in dict.fromkeys(indicators)]
+    workers = max(1, min(max_workers, len(series_ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(lambda sid: get_macro_data(sid, start, end), series_ids))
+
+    df = pd.concat(frames, axis=1).sort_index()
+    if freq is not None and not df.empty:
+        grid = pd.date_range(df.index[0], pd.Timestamp(end) if end else df.index[-1], freq=freq, name="date")
+        df = df.reindex(df.index.union(grid))
+        if fill == "ffill":
+            df = df.ffill()
+        return df.reindex(grid)
+    if fill == "ffill":
+        df = df.ffill()
+    return df
@@ -0,0 +1,129 @@
+# agent_core/data/macro_store.py
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+from urllib.parse import quote
+
+import pandas as pd
+
+from agent_core.config import cache_dir
+
+# fetch(observation_start, observation_end) -> pd.Series，observation_end 为 None 表示到最新
+SeriesFetcher = Callable[[str, Optional[str]], pd.Series]
+
+
+class MacroStore:
+    """
+    宏观序列本地库：每个序列一个 parquet（root/{series_id}.parquet），
+    _meta.json 记录已覆盖的起始日期与上次检查更新的时间。
+
+    - 缓存总是覆盖到“最新”：第一次从请求的 start 抓到最新，之后只请求最后一个观测日之后的新数据
+    - 距上次检查不足 refresh（默认 12 小时）时不联网；请求的 end 早于最后观测日时也不联网
+    - 请求的 start 早于已覆盖的起点时，只补前面缺的一段
+    FRED 对历史值的修订不会被增量更新捕获，需要时用 clear() 重新抓取。
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, refresh: pd.Timedelta = pd.Timedelta(hours=12)):
+        self.root = Path(root) if root is not None else cache_dir("macro")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.refresh = pd.Timedelta(refresh)
+        self._lock = threading.RLock()
+        self._meta = self._load_meta()
+        self.stats = {"requests": 0, "hits": 0, "upstream_calls": 0}
+
+    # ---------- 元数据 ----------
+    @property
+    def _meta_path(self) -> Path:
+        return self.root / "_meta.json"
+
+    def _load_meta(self) -> Dict[str, dict]:
+        if not self._meta_path.exists():
+            return {}
+        return json.loads(self._meta_path.read_text())
+
+    def _save_meta(self) -> None:
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._meta, indent=1, sort_keys=True))
+        tmp.replace(self._meta_path)
+
+    def _path(self, series_id: str) -> Path:
+        return self.root / f"{quote(series_id, safe='')}.parquet"
+
+    # ---------- 读写 ----------
+    def read(self, series_id: str) -> pd.Series:
+        path = self._path(series_id)
+        if not path.exists():
+            return pd.Series(dtype="float64", name=series_id)
+        s = pd.read_parquet(path)["value"]
+        s.name = series_id
+        return s
+
+    def _write(self, series_id: str, new: pd.Series, start: Optional[pd.Timestamp], checked: bool) -> pd.Series:
+        with self._lock:
+            merged = self.read(series_id)
+            if not new.empty:
+                new = pd.Series(new, dtype="float64")
+                new.index = pd.DatetimeIndex(new.index)
+                merged = pd.concat([merged, new]) if not merged.empty else new
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+                merged.index.name = "date"
+                merged.rename("value").to_frame().to_parquet(self._path(series_id))
+            meta = self._meta.setdefault(series_id, {})
+            if start is not None:
+                old = meta.get("start")
+                meta["start"] = min(start, pd.Timestamp(old)).strftime("%Y-%m-%d") if old else start.strftime("%Y-%m-%d")
+            if checked:
+                meta["checked"] = pd.Timestamp.now().isoformat()
+            self._save_meta()
+        merged.name = series_id
+        return merged
+
+    def _fetch(self, fetch: SeriesFetcher, start: pd.Timestamp, end: Optional[pd.Timestamp]) -> pd.Series:
+        with self._lock:
+            self.stats["upstream_calls"] += 1
+        s = fetch(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d") if end is not None else None)
+        return s.dropna() if s is not None else pd.Series(dtype="float64")
+
+    def get(self, series_id: str, start: str, end: Optional[str], fetch: SeriesFetcher) -> pd.Series:
+        """返回 [start, end] 区间的序列，缺失 / 过期的部分调用 fetch 补齐"""
+        with self._lock:
+            self.stats["requests"] += 1
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end) if end else None
+        with self._lock:
+            meta = dict(self._meta.get(series_id, {}))
+        data = self.read(series_id)
+        fetched = False
+
+        if data.empty or "start" not in meta:
+            # 第一次：一次抓到最新；空结果不记录覆盖范围
+            new = self._fetch(fetch, start, None)
+            data = self._write(series_id, new, start if not new.empty else None, checked=not new.empty)
+            fetched = True
+        else:
+            covered = pd.Timestamp(meta["start"])
+            if start < covered:
+                new = self._fetch(fetch, start, covered - pd.Timedelta(days=1))
+                data = self._write(series_id, new, start, checked=False)
+                fetched = True
+            last = data.index[-1]
+            checked = pd.Timestamp(meta["checked"]) if meta.get("checked") else None
+            stale = checked is None or pd.Timestamp.now() - checked > self.refresh
+            if (end is None or end > last) and stale:
+                new = self._fetch(fetch, last + pd.Timedelta(days=1), None)
+                data = self._write(series_id, new, None, checked=True)
+                fetched = True
+
+        if not fetched:
+            with self._lock:
+                self.stats["hits"] += 1
+        return data.loc[start:end] if end is not None else data.loc[start:]
+
+    def clear(self, series_id: Optional[str] = None) -> None:
+        with self._lock:
+            ids = [series_id] if series_id is not None else list(self._meta)
+            for sid in ids:
+                self._path(sid).unlink(missing_ok=True)
+                self._meta.pop(sid, None)
+            self._save_meta()
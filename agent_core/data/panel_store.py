@@ -0,0 +1,225 @@
+# agent_core/data/panel_store.py
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from agent_core.config import cache_dir
+from agent_core.data.price_cache import FIELDS
+from agent_core.data.price_panel import PricePanel
+
+META_FILE = "meta.json"
+
+
+class PanelStore:
+    """
+    超出内存的价格面板：每个字段一个内存映射文件（date × ticker，行优先），外加一个小的 meta.json 索引。
+
+    目录结构：
+        root/meta.json      fields / dtype / dates / tickers / 容量
+        root/{field}.dat    shape = (date_capacity, ticker_capacity) 的原始数组，未写入的格子为 NaN
+
+    - 打开只读 meta.json，数据文件在第一次访问某个字段时才映射，与文件大小无关
+    - append 支持追加新日期和新 ticker（ticker 超出预留容量时按块重写文件）
+    - select(...) 只读取所需切片并返回 PricePanel，tech_factors / factor_backtest 可直接使用；
+      store["close"] 返回整列的内存映射 DataFrame（不读入内存）
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, fields: Optional[List[str]] = None,
+                 dtype: str = "float32", ticker_capacity: int = 256):
+        self.root = Path(root) if root is not None else cache_dir("panels", "default")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._maps: Dict[str, np.memmap] = {}
+
+        meta_path = self.root / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            self.fields = meta["fields"]
+            self.dtype = np.dtype(meta["dtype"])
+            self._dates = pd.to_datetime(np.asarray(meta["dates"], dtype="int64"), unit="D")
+            self._tickers = pd.Index(meta["tickers"])
+            self.date_capacity = meta["date_capacity"]
+            self.ticker_capacity = meta["ticker_capacity"]
+        else:
+            self.fields = list(fields or FIELDS)
+            self.dtype = np.dtype(dtype)
+            self._dates = pd.DatetimeIndex([])
+            self._tickers = pd.Index([])
+            self.date_capacity = 0
+            self.ticker_capacity = ticker_capacity
+            self._write_meta()
+
+    # ---------- 元数据 ----------
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self._dates, name="Date")
+
+    @property
+    def tickers(self) -> pd.Index:
+        return pd.Index(self._tickers, name="ticker")
+
+    @property
+    def shape(self):
+        return len(self.fields), len(self._dates), len(self._tickers)
+
+    def __repr__(self) -> str:
+        _, n_dates, n_tickers = self.shape
+        span = f"{self._dates[0].date()}~{self._dates[-1].date()}" if n_dates else "empty"
+        return f"PanelStore({self.root}, dates={n_dates} [{span}], tickers={n_tickers}, dtype={self.dtype})"
+
+    def _write_meta(self) -> None:
+        meta = {
+            "fields": self.fields,
+            "dtype": self.dtype.name,
+            "dates": (self._dates.values.astype("datetime64[D]").astype("int64")).tolist(),
+            "tickers": list(self._tickers),
+            "date_capacity": self.date_capacity,
+            "ticker_capacity": self.ticker_capacity,
+        }
+        tmp = self.root / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.root / META_FILE)
+
+    # ---------- 内存映射 ----------
+    def _path(self, field: str) -> Path:
+        return self.root / f"{field}.dat"
+
+    def _mmap(self, field: str) -> np.memmap:
+        if field not in self.fields:
+            raise KeyError(f"Field not in store: {field!r}, available: {self.fields}")
+        if self.date_capacity == 0:
+            raise KeyError("PanelStore is empty, append data first")
+        if field not in self._maps:
+            self._maps[field] = np.memmap(self._path(field), dtype=self.dtype, mode="r+",
+                                          shape=(self.date_capacity, self.ticker_capacity))
+        return self._maps[field]
+
+    def _release(self) -> None:
+        for m in self._maps.values():
+            m.flush()
+        self._maps.clear()
+
+    def _grow(self, n_dates: int, n_tickers: int) -> None:
+        """保证容量 ≥ (n_dates, n_tickers)，新增区域填 NaN"""
+        if n_dates <= self.date_capacity and n_tickers <= self.ticker_capacity:
+            return
+        self._release()
+        new_dcap = self.date_capacity if n_dates <= self.date_capacity else max(n_dates, 2 * self.date_capacity, 256)
+        new_tcap = self.ticker_capacity if n_tickers <= self.ticker_capacity else max(n_tickers, 2 * self.ticker_capacity)
+        itemsize = self.dtype.itemsize
+
+        for field in self.fields:
+            path = self._path(field)
+            if new_tcap == self.ticker_capacity and path.exists():
+                # 行优先：只追加日期时直接在文件尾部扩展
+                with open(path, "r+b") as f:
+                    f.truncate(new_dcap * new_tcap * itemsize)
+                m = np.memmap(path, dtype=self.dtype, mode="r+", shape=(new_dcap, new_tcap))
+                m[self.date_capacity:] = np.nan
+                m.flush()
+                del m
+                continue
+
+            # 列容量变化（或新文件）：按行块拷贝到新文件，内存占用与块大小相关
+            tmp = path.with_suffix(".tmp")
+            new = np.memmap(tmp, dtype=self.dtype, mode="w+", shape=(new_dcap, new_tcap))
+            new[:] = np.nan
+            if path.exists() and self.date_capacity:
+                old = np.memmap(path, dtype=self.dtype, mode="r", shape=(self.date_capacity, self.ticker_capacity))
+                step = max(1, (64 * 1024 ** 2) // max(self.ticker_capacity * itemsize, 1))
+                for i in range(0, self.date_capacity, step):
+                    j = min(i + step, self.date_capacity)
+                    new[i:j, :self.ticker_capacity] = old[i:j]
+                del old
+            new.flush()
+            del new
+            os.replace(tmp, path)
+
+        self.date_capacity, self.ticker_capacity = new_dcap, new_tcap
+        self._write_meta()
+
+    # ---------- 写入 ----------
+    def append(self, data: Union[pd.DataFrame, PricePanel]) -> "PanelStore":
+        """
+        写入一段价格数据（get_res_price_data 的 (field, ticker) 面板或 PricePanel）。
+          - 已有日期：覆盖对应格子；新日期必须晚于库中最后一个日期
+          - 新 ticker 自动追加到列尾
+        """
+        panel = data if isinstance(data, PricePanel) else PricePanel.from_frame(data, dtype=self.dtype)
+        if panel.shape[1] == 0:
+            return self
+
+        new_dates = panel.dates.difference(self._dates)
+        if len(self._dates) and len(new_dates) and new_dates[0] <= self._dates[-1]:
+            raise ValueError(f"New dates must be later than {self._dates[-1].date()}, got {new_dates[0].date()}")
+        new_tickers = panel.tickers.difference(self._tickers, sort=False)
+
+        dates = self._dates.append(new_dates)
+        tickers = self._tickers.append(new_tickers)
+        self._grow(len(dates), len(tickers))
+
+        rows = dates.get_indexer(panel.dates)
+        cols = tickers.get_indexer(panel.tickers)
+        # 日期连续时按 slice 写入，避免花式索引的临时拷贝
+        row_sel = slice(rows[0], rows[-1] + 1) if (np.diff(rows) == 1).all() else rows
+        for i, field in enumerate(panel.fields):
+            if field not in self.fields:
+                continue
+            m = self._mmap(field)
+            if isinstance(row_sel, slice):
+                m[row_sel, cols] = panel.values[i]
+            else:
+                m[np.ix_(row_sel, cols)] = panel.values[i]
+
+        self._dates, self._tickers = dates, tickers
+        self.flush()
+        return self
+
+    def flush(self) -> None:
+        for m in self._maps.values():
+            m.flush()
+        self._write_meta()
+
+    # ---------- 读取 ----------
+    def _locate(self, tickers=None, start=None, end=None):
+        rows = self._dates.slice_indexer(start, end)
+        if tickers is None:
+            return rows, slice(0, len(self._tickers))
+        cols = self._tickers.get_indexer(list(tickers))
+        if (cols < 0).any():
+            missing = [t for t, c in zip(tickers, cols) if c < 0]
+            raise KeyError(f"Tickers not in store: {missing}")
+        if len(cols) and (np.diff(cols) == 1).all():
+            return rows, slice(cols[0], cols[-1] + 1)
+        return rows, cols
+
+    def array(self, field: str, tickers=None, start=None, end=None) -> np.ndarray:
+        """date × ticker 数组；连续 ticker 区间时为内存映射视图（不读盘），否则只读取所选列"""
+        rows, cols = self._locate(tickers, start, end)
+        return self._mmap(field)[:len(self._dates)][rows][:, cols]
+
+    def frame(self, field: str, tickers=None, start=None, end=None) -> pd.DataFrame:
+        rows, cols = self._locate(tickers, start, end)
+        values = self._mmap(field)[:len(self._dates)][rows][:, cols]
+        return pd.DataFrame(values, index=self.dates[rows], columns=self.tickers[cols], copy=False)
+
+    def __getitem__(self, field: str) -> pd.DataFrame:
+        return self.frame(field)
+
+    def select(self, tickers=None, start=None, end=None, fields: Optional[List[str]] = None) -> PricePanel:
+        """读取一个切片到内存，返回 PricePanel（只读取所选日期 / ticker / 字段）"""
+        fields = list(fields or self.fields)
+        rows, cols = self._locate(tickers, start, end)
+        dates, names = self.dates[rows], self.tickers[cols]
+        values = np.empty((len(fields), len(dates), len(names)), dtype=self.dtype)
+        for i, field in enumerate(fields):
+            values[i] = self._mmap(field)[:len(self._dates)][rows][:, cols]
+        return PricePanel(values, fields, dates, names)
+
+    def iter_ticker_chunks(self, chunk_size: int, start=None, end=None, fields: Optional[List[str]] = None):
+        """按 ticker 分块依次读取，逐块产出 PricePanel（用于不能一次放进内存的全市场计算）"""
+        for i in range(0, len(self._tickers), chunk_size):
+            yield self.select(list(self._tickers[i:i + chunk_size]), start, end, fields)
@@ -0,0 +1,255 @@
+# agent_core/data/price_cache.py
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import pandas as pd
+
+from agent_core.config import cache_dir
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+# 抓取后端：fetch(tickers, start, end) -> DataFrame，columns = MultiIndex[field, ticker]，
+# 日期区间为 [start, end) 左闭右开（与 yf.download 一致）
+Fetcher = Callable[[List[str], str, str], pd.DataFrame]
+
+Interval = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+# ============================ #
+#   交易日历（NYSE）
+# ============================ #
+MARKET_TZ = "America/New_York"
+# 收盘后多久认为当天的日线已经定稿
+BAR_FINAL = pd.Timedelta(hours=16, minutes=30)
+
+_CALENDAR = None
+
+def _exchange_calendar():
+    global _CALENDAR
+    if _CALENDAR is None:
+        from pandas.tseries.holiday import (
+            AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr, USMemorialDay,
+            USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday,
+        )
+
+        class NYSECalendar(AbstractHolidayCalendar):
+            rules = [
+                Holiday("NewYearsDay", month=1, day=1, observance=sunday_to_monday),
+                USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay,
+                Holiday("Juneteenth", month=6, day=19, start_date="2022-06-19", observance=nearest_workday),
+                Holiday("IndependenceDay", month=7, day=4, observance=nearest_workday),
+                USLaborDay, USThanksgivingDay,
+                Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+            ]
+        _CALENDAR = NYSECalendar()
+    return _CALENDAR
+
+
+def trading_sessions(start, end) -> pd.DatetimeIndex:
+    """[start, end) 内的交易日：工作日去掉 NYSE 节假日（不含临时休市）"""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    if end <= start:
+        return pd.DatetimeIndex([])
+    days = pd.bdate_range(start, end - pd.Timedelta(days=1))
+    return days.difference(_exchange_calendar().holidays(start, end))
+
+
+def settled_end(now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """
+    日线已经定稿的日期上界（不含）：收盘（纽约时间 16:30）之后为明天，否则为今天。
+    在这之后的 bar 还没出或不完整，不抓取也不标记为已覆盖。
+    """
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now)
+    if now.tzinfo is not None:
+        now = now.tz_convert(MARKET_TZ).tz_localize(None)
+    today = now.normalize()
+    return today + pd.Timedelta(days=1) if now - today >= BAR_FINAL else today
+
+
+# ============================ #
+#   区间工具函数
+# ============================ #
+def _merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def _missing_intervals(covered: List[Interval], start: pd.Timestamp, end: pd.Timestamp) -> List[Interval]:
+    """[start, end) 中尚未被 covered 覆盖的空缺区间"""
+    gaps = []
+    cursor = start
+    for s, e in covered:
+        if e <= cursor:
+            continue
+        if s >= end:
+            break
+        if s > cursor:
+            gaps.append((cursor, s))
+        cursor = max(cursor, e)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# ============================ #
+#   Parquet 价格缓存
+# ============================ #
+class PriceCache:
+    """
+    本地 Parquet 价格缓存：每个 ticker 一个文件（index=date，columns=open/high/low/close/volume），
+    另有 _coverage.json 记录每个 ticker 已经完整下载过的日期区间。
+
+    请求 (tickers, start, end) 时，已覆盖的部分直接读盘，只对缺失的日期空缺调用 fetcher，
+    空缺相同的 ticker 合并成一次多股票请求；新数据合并后写回磁盘。
+    没有交易日的空缺（周末、交易所节假日）直接标记为已覆盖，不请求上游；
+    尚未定稿的 bar（见 settled_end）既不抓取也不标记，等到收盘后再补。
+    now 返回当前时间，测试时可注入。
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, fetcher: Optional[Fetcher] = None,
+                 now: Optional[Callable[[], pd.Timestamp]] = None):
+        self.root = Path(root) if root is not None else cache_dir("prices")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fetcher = fetcher
+        self.now = now
+        self._lock = threading.RLock()
+        self._coverage = self._load_coverage()
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "upstream_calls": 0}
+        self.last_stats: Dict[str, int] = {}
+
+    # ---------- 元数据 ----------
+    @property
+    def _coverage_path(self) -> Path:
+        return self.root / "_coverage.json"
+
+    def _load_coverage(self) -> Dict[str, List[Interval]]:
+        if not self._coverage_path.exists():
+            return {}
+        raw = json.loads(self._coverage_path.read_text())
+        return {
+            tk: [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in spans]
+            for tk, spans in raw.items()
+        }
+
+    def _save_coverage(self) -> None:
+        raw = {
+            tk: [[s.strftime("%Y-%m-%d"), e.strftime("%Y-%m-%d")] for s, e in spans]
+            for tk, spans in self._coverage.items()
+        }
+        tmp = self._coverage_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(raw, indent=1, sort_keys=True))
+        tmp.replace(self._coverage_path)
+
+    def _ticker_path(self, ticker: str) -> Path:
+        return self.root / f"{quote(ticker, safe='')}.parquet"
+
+    def coverage(self, ticker: str) -> List[Interval]:
+        with self._lock:
+            return list(self._coverage.get(ticker, []))
+
+    # ---------- 读写 ----------
+    def _read_ticker(self, ticker: str) -> pd.DataFrame:
+        path = self._ticker_path(ticker)
+        if not path.exists():
+            return pd.DataFrame(columns=FIELDS, dtype="float64", index=pd.DatetimeIndex([], name="date"))
+        return pd.read_parquet(path)
+
+    def _write_ticker(self, ticker: str, new: pd.DataFrame, span: Optional[Interval]) -> None:
+        with self._lock:
+            if not new.empty:
+                old = self._read_ticker(ticker)
+                merged = pd.concat([old, new]) if not old.empty else new
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+                merged.index.name = "date"
+                merged.to_parquet(self._ticker_path(ticker))
+            if span is not None:
+                spans = self._coverage.get(ticker, []) + [span]
+                self._coverage[ticker] = _merge_intervals(spans)
+                self._save_coverage()
+
+    def _fetch_gap(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> bool:
+        """补齐 [start, end)（end 不晚于 settled_end）；返回是否请求了上游"""
+        empty = pd.DataFrame(columns=FIELDS, dtype="float64")
+        if len(trading_sessions(start, end)) == 0:
+            for tk in tickers:
+                self._write_ticker(tk, empty, (start, end))
+            return False
+        if self.fetcher is None:
+            raise RuntimeError("PriceCache 未配置 fetcher，无法补齐缺失数据")
+        df = self.fetcher(tickers, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+
+        for tk in tickers:
+            if df is not None and not df.empty and tk in df.columns.get_level_values("ticker"):
+                part = df.xs(tk, level="ticker", axis=1).reindex(columns=FIELDS)
+                part = part.dropna(how="all").astype("float64")
+            else:
+                part = empty
+
+            # 有交易日却返回空表：可能是限流或 ticker 有误，不标记为已覆盖，下次再试
+            self._write_ticker(tk, part, (start, end) if not part.empty else None)
+        return True
+
+    def get(self, tickers: Union[str, List[str]], start: str, end: Optional[str] = None) -> pd.DataFrame:
+        """
+        读取 [start, end) 区间的价格数据，缺失部分自动补齐。
+        返回 DataFrame，columns = MultiIndex[field, ticker]；本次的命中统计见 self.last_stats。
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        tickers = list(dict.fromkeys(tickers))
+
+        settled = settled_end(self.now() if self.now is not None else None)
+        start_ts = pd.Timestamp(start).normalize()
+        end_ts = pd.Timestamp(end).normalize() if end is not None else settled
+        # 未定稿的部分不请求
+        fetch_end = min(end_ts, settled)
+
+        stats = {"tickers": len(tickers), "hits": 0, "misses": 0, "upstream_calls": 0}
+
+        # 按缺失区间分组，相同空缺的 ticker 一次性抓取
+        groups: Dict[Tuple[Interval, ...], List[str]] = {}
+        for tk in tickers:
+            gaps = tuple(_missing_intervals(self.coverage(tk), start_ts, fetch_end)) if start_ts < fetch_end else ()
+            if gaps:
+                groups.setdefault(gaps, []).append(tk)
+                stats["misses"] += 1
+            else:
+                stats["hits"] += 1
+
+        for gaps, group in groups.items():
+            for gap_start, gap_end in gaps:
+                if self._fetch_gap(group, gap_start, gap_end):
+                    stats["upstream_calls"] += 1
+
+        frames = {}
+        for tk in tickers:
+            part = self._read_ticker(tk)
+            frames[tk] = part.loc[(part.index >= start_ts) & (part.index < end_ts)]
+
+        with self._lock:
+            self.last_stats = stats
+            self.stats["requests"] += 1
+            for key in ("hits", "misses", "upstream_calls"):
+                self.stats[key] += stats[key]
+
+        df = pd.concat(frames, axis=1, names=["ticker", "field"])
+        df = df.swaplevel(axis=1).sort_index(axis=1)
+        df.index.name = "Date"
+        return df.dropna(how="all")
+
+    def clear(self, tickers: Optional[List[str]] = None) -> None:
+        """删除指定（默认全部）ticker 的缓存"""
+        with self._lock:
+            targets = list(self._coverage) if tickers is None else tickers
+            for tk in targets:
+                self._ticker_path(tk).unlink(missing_ok=True)
+                self._coverage.pop(tk, None)
+            self._save_coverage()
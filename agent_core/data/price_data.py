@@ -1,33 +1,147 @@
-import numpy as np, yfinance as yf, pandas as pd
-from typing import Union, List
+import numpy as np, pandas as pd
+from typing import Union, List, Optional
+
+from agent_core.data.price_cache import PriceCache, FIELDS
+from agent_core.data.price_panel import PricePanel
+from agent_core.data.singleflight import SingleFlight
+from agent_core.data.rate_limit import BatchPacker, get_limiter, is_throttle_error
+from agent_core.lazy import lazy_import
+from agent_core.metrics import stage
+
+yf = lazy_import("yfinance")
 
 def get_single_res_data(ticker: str, start: str, end: str) -> pd.Series:
-    df = yf.download(ticker, start=start, end=end)
-    if df.empty:
+    try:
+        df = get_res_price_data(ticker, start, end)
+    except ValueError:
         return {"error": "找不到该股票或时间段无数据"}
     return df
 
 def get_multi_res_data(tickers, start, end):
+    # columns = (field, ticker)
+    return get_res_price_data(list(tickers), start, end)
+
+
+def _yf_download(tickers: List[str], start: str, end: str) -> pd.DataFrame:
+    """一次 yf.download，统一返回 columns = MultiIndex[field, ticker]，字段小写"""
     df = yf.download(
         tickers,
         start=start,
         end=end,
-        group_by="ticker",        # ⚠️ 关键参数！
+        group_by="ticker",
         auto_adjust=True,
         progress=False,
         threads=True
     )
+    with stage("clean"):
+        df = _normalize(df, tickers)
+    missing = _missing_tickers(df, tickers)
+    if missing:
+        _raise_if_throttled(missing[0], start, end)
+    return df
 
-    # 检查结构：如果不是 MultiIndex，raise error
-    if not isinstance(df.columns, pd.MultiIndex):
-        raise ValueError("Expected MultiIndex columns. Try upgrading yfinance or check ticker list.")
 
-    # 现在是 columns = (ticker, field)，需要变成 (field, ticker)
-    df = df.swaplevel(axis=1).sort_index(axis=1)
-    return df
+def _missing_tickers(df: pd.DataFrame, tickers: List[str]) -> List[str]:
+    """本次下载结果中没有任何收盘价的 ticker（yfinance 返回的 ticker 是大写）"""
+    if df.empty or "close" not in df.columns.get_level_values("field"):
+        return list(tickers)
+    close = df["close"]
+    have = {str(t).upper() for t in close.columns[close.notna().any().to_numpy()]}
+    return [t for t in tickers if t.upper() not in have]
+
+
+def _raise_if_throttled(ticker: str, start: str, end: str) -> None:
+    """
+    yf.download 会吞掉每只 ticker 的异常、只返回空列，无法区分“没有数据”和“被限流”。
+    用缺失的一只 ticker 单独请求一次：Ticker.history 遇到限流会直接抛出 YFRateLimitError，
+    其余情况（节假日、停牌、退市）返回空表。只看本次调用自己的结果，不读 yfinance 的全局状态。
+    """
+    try:
+        yf.Ticker(ticker).history(start=start, end=end, auto_adjust=True)
+    except Exception as exc:
+        if is_throttle_error(exc):
+            raise RuntimeError(f"yfinance rate limited: {exc}") from exc
+
+
+def _normalize(df: pd.DataFrame, tickers: List[str]) -> pd.DataFrame:
+    if df.empty:
+        return df
+
+    if isinstance(df.columns, pd.MultiIndex):
+        # 多支资产：原结构是 (ticker, field)，我们转为 (field, ticker)
+        df = df.swaplevel(axis=1).sort_index(axis=1)
+        df.columns = pd.MultiIndex.from_tuples(
+            [(f.lower().strip(), t.strip()) for f, t in df.columns],
+            names=["field", "ticker"]
+        )
+    else:
+        # 单支股票，但列是平面的
+        df.columns = [c.strip().lower() for c in df.columns]
+        if "adj close" in df.columns and "close" not in df.columns:
+            df["close"] = df["adj close"]
+        df.columns = pd.MultiIndex.from_product([df.columns, [tickers[0]]], names=["field", "ticker"])
+
+    # 只保留我们需要的字段
+    df = df.loc[:, df.columns.get_level_values("field").isin(FIELDS)]
+    return df.replace([np.inf, -np.inf], np.nan).dropna(how="all")
+
+
+def _limited_download(tickers: List[str], start: str, end: str) -> pd.DataFrame:
+    # 空表不当作限流（节假日、停牌、尚未开盘都会返回空表），只对限流错误退避重试
+    return get_limiter("yahoo").call(_yf_download, tickers, start, end)
+
 
+# 默认打包器：并发到达的同区间小请求合并成一次 yf.download，可用 set_price_batcher 替换
+_PRICE_BATCHER: Optional[BatchPacker] = None
 
-def get_res_price_data(tickers: Union[str, List[str]], start: str, end: str) -> pd.DataFrame:
+def get_price_batcher() -> BatchPacker:
+    global _PRICE_BATCHER
+    if _PRICE_BATCHER is None:
+        _PRICE_BATCHER = BatchPacker(_limited_download)
+    return _PRICE_BATCHER
+
+def set_price_batcher(batcher: Optional[BatchPacker]) -> None:
+    global _PRICE_BATCHER
+    _PRICE_BATCHER = batcher
+
+
+def download_price_data(tickers: List[str], start: str, end: str) -> pd.DataFrame:
+    """
+    直接从 yfinance 下载（不走缓存），统一返回 columns = MultiIndex[field, ticker]，字段小写。
+    经过 yahoo 限速器与批量打包，也是 PriceCache 的默认抓取后端。
+    """
+    return get_price_batcher().download(list(tickers), start, end)
+
+
+# 默认价格缓存（延迟创建），可用 set_price_cache 替换成其他目录或抓取后端
+_PRICE_CACHE: Optional[PriceCache] = None
+
+def get_price_cache() -> PriceCache:
+    global _PRICE_CACHE
+    if _PRICE_CACHE is None:
+        _PRICE_CACHE = PriceCache(fetcher=download_price_data)
+    return _PRICE_CACHE
+
+def set_price_cache(cache: Optional[PriceCache]) -> None:
+    global _PRICE_CACHE
+    _PRICE_CACHE = cache
+
+
+# 进行中的价格请求合并：相同请求，或 ticker 为子集且日期区间被包含的请求，等待已在进行的那一次
+def _covers_prices(inflight: dict, req: dict) -> bool:
+    return (inflight["use_cache"] == req["use_cache"] and req["tickers"] <= inflight["tickers"]
+            and inflight["start"] <= req["start"] and req["end"] <= inflight["end"])
+
+def _extract_prices(df: pd.DataFrame, req: dict) -> pd.DataFrame:
+    rows = (df.index >= req["start"]) & (df.index < req["end"])
+    cols = df.columns.get_level_values("ticker").isin(req["tickers"])
+    return df.loc[rows, cols].dropna(how="all")
+
+_PRICE_FLIGHT = SingleFlight("prices", covers=_covers_prices, extract=_extract_prices)
+
+
+def get_res_price_data(tickers: Union[str, List[str]], start: str, end: str, use_cache: bool = True,
+                       as_panel: bool = False, dtype: str = "float64") -> Union[pd.DataFrame, PricePanel]:
     """
     获取一支或多支资产的价格数据（open/high/low/close/volume）
 
@@ -35,58 +149,37 @@ def get_res_price_data(tickers: Union[str, List[str]], start: str, end: str) ->
         tickers: str 或 list[str]，可以是单个或多个资产代码
         start: 起始日期
         end: 结束日期
+        use_cache: 是否使用本地 Parquet 缓存（只下载缺失的日期区间），命中统计见 get_price_cache().last_stats
+        as_panel: 返回 PricePanel（连续 field × date × ticker 数组）而不是 DataFrame
+        dtype: as_panel 时的存储精度，"float32" 内存减半
 
     返回:
         - 如果是单支股票: DataFrame，columns = [open, high, low, close, volume]
         - 如果是多支股票: DataFrame，columns = MultiIndex[level 0: field, level 1: ticker]
+        - as_panel=True: PricePanel（单支股票时只有一个 ticker）
     """
     single = False
     if isinstance(tickers, str):
         tickers = [tickers]
         single = True
 
-    df = yf.download(
-        tickers,
-        start=start,
-        end=end,
-        group_by="ticker",
-        auto_adjust=True,
-        progress=False,
-        threads=True
-    )
+    def fetch():
+        if use_cache:
+            return get_price_cache().get(tickers, start, end)
+        return download_price_data(tickers, start, end)
+
+    request = {"tickers": frozenset(tickers), "start": pd.Timestamp(start), "end": pd.Timestamp(end), "use_cache": use_cache}
+    df = _PRICE_FLIGHT.do((tuple(tickers), start, end, use_cache), fetch, request)
 
     if df.empty:
         raise ValueError("下载失败：数据为空")
 
-    # 判断是否是多只股票结构
-    if isinstance(df.columns, pd.MultiIndex):
-        # 多支资产：原结构是 (ticker, field)，我们转为 (field, ticker)
-        df = df.swaplevel(axis=1).sort_index(axis=1)
-
-        # 清洗列名：全部小写
-        df.columns = pd.MultiIndex.from_tuples(
-            [(f.lower().strip(), t.strip()) for f, t in df.columns],
-            names=["field", "ticker"]
-        )
-
-        # 只保留我们需要的字段
-        fields = ["open", "high", "low", "close", "volume"]
-        df = df.loc[:, df.columns.get_level_values("field").isin(fields)]
-        df = df.replace([np.inf, -np.inf], np.nan).dropna(how="all")
-
-        if single:
-            # 如果用户只给了一个 ticker，也返回普通结构（扁平）
-            df = df.xs(tickers[0], level="ticker", axis=1)
-
-    else:
-        # 单支股票，但列是平面的
-        df.columns = [c.strip().lower() for c in df.columns]
-        if "adj close" in df.columns and "close" not in df.columns:
-            df["close"] = df["adj close"]
+    if as_panel:
+        return PricePanel.from_frame(df, dtype=dtype)
 
-        needed = ["open", "high", "low", "close", "volume"]
-        df = df[needed]
-        df = df.replace([np.inf, -np.inf], np.nan).dropna(how="all")
+    if single:
+        # 如果用户只给了一个 ticker，也返回普通结构（扁平）
+        df = df.xs(tickers[0], level="ticker", axis=1)[FIELDS]
 
     if len(df) == 0:
         raise ValueError("DataFrame为空，数据下载出现问题，可能是因为yfinance request过多导致。")
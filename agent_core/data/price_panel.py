@@ -0,0 +1,123 @@
+# agent_core/data/price_panel.py
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from agent_core.data.price_cache import FIELDS
+
+
+class PricePanel:
+    """
+    紧凑的价格面板：一块连续的 3 维数组 values[field, date, ticker]（可选 float32 存储）。
+
+    - panel["close"] / panel.frame("close") 返回 date × ticker 的 DataFrame 视图（不拷贝），
+      因此 tech_factors 等按 price_df["close"] 取数的函数可以直接使用
+    - panel.array("close") 返回底层 ndarray 视图
+    - 连续的 ticker / 日期区间（slice）选择仍是视图；任意列表选择会产生拷贝
+    """
+
+    def __init__(self, values: np.ndarray, fields: Sequence[str], dates: Sequence, tickers: Sequence[str]):
+        if values.ndim != 3:
+            raise ValueError(f"PricePanel values must be 3-D (field, date, ticker), got shape {values.shape}")
+        self.values = values
+        self.fields = pd.Index(fields, name="field")
+        self.dates = pd.DatetimeIndex(dates, name="Date")
+        self.tickers = pd.Index(tickers, name="ticker")
+        if values.shape != (len(self.fields), len(self.dates), len(self.tickers)):
+            raise ValueError("PricePanel values shape does not match fields / dates / tickers")
+
+    # ---------- 构造 ----------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype: Union[str, np.dtype] = "float64", ticker: Optional[str] = None) -> "PricePanel":
+        """
+        由 get_res_price_data 的结果构造：
+          - 多支股票：columns = MultiIndex[field, ticker]
+          - 单支股票：columns = [open, high, low, close, volume]（ticker 名由参数给出）
+        """
+        if not isinstance(df.columns, pd.MultiIndex):
+            df = pd.concat({ticker or "ticker": df}, axis=1).swaplevel(axis=1)
+        fields = [f for f in FIELDS if f in df.columns.get_level_values(0)]
+        tickers = df.columns.get_level_values(1).unique()
+        values = np.empty((len(fields), len(df), len(tickers)), dtype=dtype)
+        for i, f in enumerate(fields):
+            values[i] = df[f].reindex(columns=tickers).to_numpy(dtype=dtype)
+        return cls(values, fields, df.index, tickers)
+
+    # ---------- 基本信息 ----------
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __repr__(self) -> str:
+        return (f"PricePanel(fields={list(self.fields)}, dates={len(self.dates)}, "
+                f"tickers={len(self.tickers)}, dtype={self.dtype})")
+
+    # ---------- 整数定位 ----------
+    def field_loc(self, field: str) -> int:
+        return self.fields.get_loc(field)
+
+    def date_loc(self, date) -> int:
+        return self.dates.get_loc(pd.Timestamp(date))
+
+    def ticker_loc(self, tickers: Union[str, List[str]]):
+        if isinstance(tickers, str):
+            return self.tickers.get_loc(tickers)
+        return self.tickers.get_indexer(tickers)
+
+    def _ticker_selector(self, tickers):
+        if tickers is None:
+            return slice(None)
+        if isinstance(tickers, slice):
+            return tickers
+        idx = self.ticker_loc(list(tickers))
+        if (idx < 0).any():
+            missing = [t for t, i in zip(tickers, idx) if i < 0]
+            raise KeyError(f"Tickers not in panel: {missing}")
+        # 连续区间转成 slice，保持视图
+        if len(idx) and (np.diff(idx) == 1).all():
+            return slice(idx[0], idx[-1] + 1)
+        return idx
+
+    # ---------- 视图 ----------
+    def array(self, field: str, tickers=None) -> np.ndarray:
+        """date × ticker 的 ndarray（整列或连续 ticker 区间时为视图）"""
+        return self.values[self.field_loc(field)][:, self._ticker_selector(tickers)]
+
+    def frame(self, field: str, tickers=None) -> pd.DataFrame:
+        """date × ticker 的 DataFrame，底层数据与面板共享"""
+        sel = self._ticker_selector(tickers)
+        return pd.DataFrame(self.values[self.field_loc(field)][:, sel], index=self.dates,
+                            columns=self.tickers[sel], copy=False)
+
+    def __getitem__(self, field: str) -> pd.DataFrame:
+        return self.frame(field)
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.fields
+
+    def ticker(self, ticker: str) -> pd.DataFrame:
+        """单只股票的 date × field DataFrame（视图）"""
+        j = self.ticker_loc(ticker)
+        return pd.DataFrame(self.values[:, :, j].T, index=self.dates, columns=self.fields, copy=False)
+
+    def select(self, tickers=None, start=None, end=None) -> "PricePanel":
+        """按 ticker / 日期区间截取子面板（日期区间与连续 ticker 为视图）"""
+        sel = self._ticker_selector(tickers)
+        rows = self.dates.slice_indexer(start, end)
+        return PricePanel(self.values[:, rows][:, :, sel], self.fields, self.dates[rows], self.tickers[sel])
+
+    def astype(self, dtype) -> "PricePanel":
+        return PricePanel(self.values.astype(dtype), self.fields, self.dates, self.tickers)
+
+    def to_frame(self) -> pd.DataFrame:
+        """转回 get_res_price_data 的结构：columns = MultiIndex[field, ticker]（拷贝）"""
+        return pd.concat({f: self.frame(f) for f in self.fields}, axis=1, names=["field", "ticker"])
@@ -0,0 +1,333 @@
+# agent_core/data/rate_limit.py
+"""
+上游请求调度：所有 yf.download / yf.Ticker 属性 / fred.get_series 都经过这里。
+
+  - TokenBucket：每个数据源一个令牌桶，限制持续请求速率与突发量
+  - RateLimiter：令牌桶 + AIMD 自适应速率（被限流时速率减半，成功后线性恢复）+ 指数退避重试
+  - BatchPacker：把同一日期区间内并发到达的小请求打包成一次多 ticker 的 yf.download
+  - 时钟可注入（ManualClock），配合 SimulatedProvider 可以在本地不联网地测试限流行为
+
+速率配置：环境变量 QUANT_AGENT_RATE_<数据源大写>（每秒请求数，如 QUANT_AGENT_RATE_YAHOO=2），
+或用 set_limiter 直接替换。
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from agent_core import metrics
+
+
+# ============================ #
+#   时钟
+# ============================ #
+class SystemClock:
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class ManualClock:
+    """测试用时钟：sleep 直接推进时间，不真正等待"""
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            self.t += max(seconds, 0.0)
+
+
+# ============================ #
+#   令牌桶与自适应限速
+# ============================ #
+class TokenBucket:
+    """
+    预约式令牌桶：令牌可以被预支为负数，调用方按返回的等待时间 sleep，多线程下先到先得。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=None):
+        self.clock = clock or SystemClock()
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = self.clock.now()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock.now()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def reserve(self, n: float = 1.0) -> float:
+        """预约 n 个令牌，返回需要等待的秒数"""
+        with self._lock:
+            self._refill()
+            self.tokens -= n
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, n: float = 1.0) -> float:
+        wait = self.reserve(n)
+        self.clock.sleep(wait)
+        return wait
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """yfinance 的 YFRateLimitError、HTTP 429 等都视为被限流"""
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(s in text for s in ("ratelimit", "rate limit", "too many requests", "429"))
+
+
+class RateLimiter:
+    """
+    单个数据源的限速器：
+      - 每次请求先从令牌桶取令牌
+      - 抛出限流异常时视为被限流：速率乘以 decrease（不低于 min_rate），指数退避后重试，最多 max_retries 次
+      - is_empty(结果) 为真时（例如 yf.Ticker.info 偶尔返回空 dict）只退避重试，不降低速率：
+        空结果也可能是真的没有数据，不能据此判断被限流
+      - 成功后速率线性恢复 increase，直到 max_rate
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None,
+                 max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                 increase: Optional[float] = None, decrease: float = 0.5, jitter: float = 0.1, clock=None):
+        self.name = name
+        self.clock = clock or SystemClock()
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate if min_rate is not None else rate / 20)
+        self.increase = float(increase if increase is not None else rate / 10)
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.bucket = TokenBucket(rate, burst, self.clock)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "throttled": 0, "empty": 0, "retries": 0, "failures": 0, "waited": 0.0}
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _adjust(self, throttled: bool) -> None:
+        with self._lock:
+            if throttled:
+                rate = max(self.min_rate, self.bucket.rate * self.decrease)
+            else:
+                rate = min(self.max_rate, self.bucket.rate + self.increase)
+            if rate != self.bucket.rate:
+                self.bucket.set_rate(rate)
+
+    def call(self, fn: Callable, *args, is_empty: Optional[Callable] = None, cost: float = 1.0, **kwargs):
+        """经过限速执行 fn(*args, **kwargs)；重试用尽后，空结果原样返回（可能确实没有数据），异常继续抛出"""
+        self.stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            self.stats["waited"] += self.bucket.acquire(cost)
+            self.stats["attempts"] += 1
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                metrics.record("upstream", self.name, time.perf_counter() - t0)
+                if not is_throttle_error(e):
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["throttled"] += 1
+                self._adjust(throttled=True)
+                if attempt == self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+            else:
+                metrics.record("upstream", self.name, time.perf_counter() - t0)
+                if is_empty is None or not is_empty(result):
+                    self._adjust(throttled=False)
+                    return result
+                self.stats["empty"] += 1
+                if attempt == self.max_retries:
+                    return result
+
+            self.stats["retries"] += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            delay *= 1 + self.jitter * random.random()
+            self.stats["waited"] += delay
+            self.clock.sleep(delay)
+
+
+# 各数据源默认速率（每秒请求数, 突发量）；FRED 官方限制 120 次 / 分钟
+DEFAULT_LIMITS = {
+    "yahoo": (2.0, 5),
+    "fred": (2.0, 10),
+}
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_limiter(provider: str) -> RateLimiter:
+    with _LIMITERS_LOCK:
+        if provider not in _LIMITERS:
+            rate, burst = DEFAULT_LIMITS.get(provider, (1.0, 1))
+            raw = os.getenv(f"QUANT_AGENT_RATE_{provider.upper()}")
+            if raw:
+                rate = float(raw)
+            _LIMITERS[provider] = RateLimiter(provider, rate, burst)
+        return _LIMITERS[provider]
+
+def set_limiter(provider: str, limiter: RateLimiter) -> None:
+    with _LIMITERS_LOCK:
+        _LIMITERS[provider] = limiter
+
+def limiter_stats() -> Dict[str, dict]:
+    """各数据源限速器的统计与当前速率"""
+    with _LIMITERS_LOCK:
+        return {name: {**lim.stats, "rate": round(lim.rate, 4)} for name, lim in _LIMITERS.items()}
+
+
+def is_empty_result(result) -> bool:
+    """None、空 DataFrame / Series / dict 视为空结果"""
+    if result is None:
+        return True
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.empty
+    if isinstance(result, dict):
+        return len(result) == 0
+    return False
+
+
+# ============================ #
+#   批量打包
+# ============================ #
+class _Batch:
+    __slots__ = ("tickers", "future", "sealed")
+
+    def __init__(self):
+        self.tickers: List[str] = []
+        self.future: Future = Future()
+        self.sealed = False
+
+
+class BatchPacker:
+    """
+    把并发到达的、日期区间相同的小请求打包成一次多 ticker 下载：
+      - 第一个请求开一个批次并等待 linger 秒，期间到达的同区间请求加入该批次；凑满 max_batch 立即发出
+      - 单个请求超过 max_batch 个 ticker 时拆成多批
+    fetch(tickers, start, end) 返回 columns = MultiIndex[field, ticker] 的 DataFrame。
+    """
+
+    def __init__(self, fetch: Callable[[List[str], str, str], pd.DataFrame], max_batch: int = 100,
+                 linger: float = 0.05, clock=None):
+        self.fetch = fetch
+        self.max_batch = max_batch
+        self.linger = linger
+        self.clock = clock or SystemClock()
+        self._open: Dict[tuple, _Batch] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "tickers": 0}
+
+    def _join(self, key: tuple, tickers: List[str]):
+        """把 tickers 放进开放中的批次，返回 [(batch, 自己的 tickers, 是否由自己发出)]"""
+        joined = []
+        with self._lock:
+            todo = list(tickers)
+            while todo:
+                batch = self._open.get(key)
+                leader = False
+                if batch is None or batch.sealed:
+                    batch = _Batch()
+                    self._open[key] = batch
+                    leader = True
+                room = self.max_batch - len(batch.tickers)
+                mine, todo = todo[:room], todo[room:]
+                batch.tickers.extend(mine)
+                if len(batch.tickers) >= self.max_batch:
+                    batch.sealed = True
+                joined.append((batch, mine, leader))
+        return joined
+
+    def _run(self, key: tuple, batch: _Batch, start: str, end: str) -> None:
+        if not batch.sealed:
+            self.clock.sleep(self.linger)
+        with self._lock:
+            batch.sealed = True
+            if self._open.get(key) is batch:
+                del self._open[key]
+            tickers = list(batch.tickers)
+        self.stats["batches"] += 1
+        self.stats["tickers"] += len(tickers)
+        try:
+            batch.future.set_result(self.fetch(tickers, start, end))
+        except BaseException as e:
+            batch.future.set_exception(e)
+
+    def download(self, tickers: List[str], start: str, end: str) -> pd.DataFrame:
+        tickers = list(dict.fromkeys(tickers))
+        key = (str(start), str(end))
+        self.stats["requests"] += 1
+        joined = self._join(key, tickers)
+        for batch, _, leader in joined:
+            if leader:
+                self._run(key, batch, start, end)
+
+        parts = []
+        for batch, mine, _ in joined:
+            df = batch.future.result()
+            if df.empty:
+                continue
+            parts.append(df.loc[:, df.columns.get_level_values("ticker").isin(mine)])
+        if not parts:
+            return pd.DataFrame()
+        df = parts[0] if len(parts) == 1 else pd.concat(parts, axis=1).sort_index(axis=1)
+        return df.dropna(how="all")
+
+
+# ============================ #
+#   本地模拟数据源
+# ============================ #
+class SimulatedProvider:
+    """
+    不联网的模拟行情源，模仿 yfinance 的限流行为：滑动窗口内请求数超过 limit 时，
+    按 mode 返回空表（"empty"）或抛出 429 异常（"error"）。用于测试限速器与打包效果。
+    """
+
+    def __init__(self, limit: int = 5, window: float = 1.0, mode: str = "empty", clock=None):
+        self.limit = limit
+        self.window = window
+        self.mode = mode
+        self.clock = clock or SystemClock()
+        self.times: List[float] = []
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "tickers": 0}
+
+    def download(self, tickers: List[str], start: str, end: str) -> pd.DataFrame:
+        with self._lock:
+            now = self.clock.now()
+            self.times = [t for t in self.times if now - t < self.window]
+            self.times.append(now)
+            self.stats["requests"] += 1
+            throttled = len(self.times) > self.limit
+            if throttled:
+                self.stats["throttled"] += 1
+        if throttled:
+            if self.mode == "error":
+                raise RuntimeError("429 Too Many Requests")
+            return pd.DataFrame()
+        self.stats["tickers"] += len(tickers)
+        idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        cols = pd.MultiIndex.from_product([["close", "high", "low", "open", "volume"], sorted(tickers)],
+                                          names=["field", "ticker"])
+        return pd.DataFrame(100.0, index=idx, columns=cols)
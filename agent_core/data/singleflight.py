@@ -0,0 +1,116 @@
+# agent_core/data/singleflight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 所有 SingleFlight 实例（按名称），便于统计各数据源省下的上游请求
+FLIGHTS: Dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    __slots__ = ("future", "request")
+
+    def __init__(self, request):
+        self.future: Future = Future()
+        self.request = request
+
+
+class SingleFlight:
+    """
+    合并进行中的相同请求：同一个 key 的并发调用只执行一次上游请求，其余调用方等待第一个的结果。
+
+    可选的“覆盖”判断：covers(进行中的 request, 新 request) 为真时（如 ticker 是超集、日期区间包含），
+    新调用也直接等待进行中的那一次，再用 extract(结果, 新 request) 取出自己需要的部分。
+
+    线程调用方用 do()，asyncio 调用方用 do_async()，两者共享同一张进行中请求表。
+    结果在调用方之间共享，请不要原地修改。
+    """
+
+    def __init__(self, name: str, covers: Optional[Callable[[Any, Any], bool]] = None,
+                 extract: Optional[Callable[[Any, Any], Any]] = None):
+        self.name = name
+        self.covers = covers
+        self.extract = extract
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "subsumed": 0}
+        FLIGHTS[name] = self
+
+    @property
+    def saved(self) -> int:
+        """省下的上游请求数"""
+        return self.stats["coalesced"] + self.stats["subsumed"]
+
+    def _join(self, key: Hashable, request):
+        """返回 (call, 是否由本调用方执行, 是否为被覆盖的子请求)"""
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats["coalesced"] += 1
+                return call, False, False
+            if self.covers is not None and request is not None:
+                for other in self._calls.values():
+                    if other.request is not None and self.covers(other.request, request):
+                        self.stats["subsumed"] += 1
+                        return other, False, True
+            call = _Call(request)
+            self._calls[key] = call
+            self.stats["executions"] += 1
+            return call, True, False
+
+    def _settle(self, key: Hashable, call: _Call, result=None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        if exc is not None:
+            call.future.set_exception(exc)
+        else:
+            call.future.set_result(result)
+
+    def _deliver(self, result, request, subsumed: bool):
+        if subsumed and self.extract is not None:
+            return self.extract(result, request)
+        return result
+
+    def do(self, key: Hashable, fn: Callable[[], Any], request=None):
+        """线程调用：fn 只在没有相同 / 覆盖的请求进行中时执行"""
+        call, leader, subsumed = self._join(key, request)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._settle(key, call, exc=e)
+                raise
+            self._settle(key, call, result)
+            return result
+        return self._deliver(call.future.result(), request, subsumed)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any], request=None):
+        """
+        asyncio 调用：fn 可以是普通函数（放到线程中执行）或协程函数。
+        某个等待方被取消不会取消共享的上游请求。
+        """
+        call, leader, subsumed = self._join(key, request)
+        if leader:
+            if asyncio.iscoroutinefunction(fn):
+                task = asyncio.ensure_future(fn())
+            else:
+                task = asyncio.ensure_future(asyncio.to_thread(fn))
+
+            def _done(t: asyncio.Future):
+                if t.cancelled():
+                    self._settle(key, call, exc=asyncio.CancelledError())
+                elif t.exception() is not None:
+                    self._settle(key, call, exc=t.exception())
+                else:
+                    self._settle(key, call, t.result())
+            task.add_done_callback(_done)
+        result = await asyncio.shield(asyncio.wrap_future(call.future))
+        return result if leader else self._deliver(result, request, subsumed)
+
+
+def singleflight_stats() -> Dict[str, dict]:
+    """各数据源的合并统计：calls / executions / coalesced / subsumed / saved"""
+    return {name: {**f.stats, "saved": f.saved} for name, f in FLIGHTS.items()}
@@ -0,0 +1,223 @@
+# agent_core/encoding.py
+"""
+给 LLM 的工具结果编码：在 token 预算内返回紧凑摘要，而不是整张表的 to_json / to_dict。
+
+  - 小结果（完整内容不超过预算）原样返回（split 格式：columns / index / data）
+  - 大结果返回摘要：形状、日期范围、逐列统计、LTTB 降采样后的曲线（保留峰谷形状）、首尾几行，
+    按预算逐步减少降采样点数 / 列数 / 行数
+  - 完整数据通过 page() 分页取回（MCP 工具 page_dataset，或 chat 中同名函数）
+
+token 按 JSON 字符数 / 4 粗略估计。预算：QUANT_AGENT_TOKEN_BUDGET（默认 2000）。
+"""
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agent_core.data.price_panel import PricePanel
+from agent_core.metrics import stage
+
+CHARS_PER_TOKEN = 4
+
+
+def default_budget() -> int:
+    return int(os.getenv("QUANT_AGENT_TOKEN_BUDGET") or 2000)
+
+
+def estimate_tokens(obj) -> int:
+    return math.ceil(len(json.dumps(obj, default=str, ensure_ascii=False)) / CHARS_PER_TOKEN)
+
+
+# ============================ #
+#   LTTB 降采样
+# ============================ #
+def lttb(y, n_out: int, x=None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets：选出 n_out 个点的下标，保留首尾点和每个桶里“面积最大”的点，
+    比等间隔抽样更能保住峰谷和回撤的形状。NaN 会被跳过。
+    """
+    y = np.asarray(y, dtype="float64")
+    x = np.arange(len(y), dtype="float64") if x is None else np.asarray(x, dtype="float64")
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_out:
+        return valid
+    if n_out < 3:
+        return valid[np.linspace(0, len(valid) - 1, n_out).astype(int)]
+    xs, ys = x[valid], y[valid]
+    n = len(valid)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 下一个桶的均值作为第三个顶点
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return valid[out]
+
+
+def downsample(s: pd.Series, n_out: int) -> pd.Series:
+    """LTTB 降采样一条序列（DatetimeIndex 按时间间隔计算面积）"""
+    x = s.index.asi8 if isinstance(s.index, pd.DatetimeIndex) else None
+    return s.iloc[lttb(s.to_numpy(dtype="float64", na_value=np.nan), n_out, x)]
+
+
+# ============================ #
+#   基础转换
+# ============================ #
+def _label(value) -> str:
+    if isinstance(value, tuple):
+        return "/".join(str(v) for v in value)
+    if isinstance(value, pd.Timestamp):
+        return str(value.date()) if value == value.normalize() else value.isoformat()
+    return str(value)
+
+
+def _value(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    if isinstance(v, (np.floating, float)):
+        v = float(v)
+        return None if math.isnan(v) else float(f"{v:.6g}")
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, (pd.Timestamp, np.datetime64)):
+        return _label(pd.Timestamp(v))
+    return v
+
+
+def _to_frame(obj) -> pd.DataFrame:
+    if isinstance(obj, PricePanel):
+        return obj.to_frame()
+    if isinstance(obj, pd.Series):
+        return obj.to_frame(name=obj.name if obj.name is not None else "value")
+    return obj
+
+
+def _split(df: pd.DataFrame) -> Dict[str, list]:
+    return {
+        "columns": [_label(c) for c in df.columns],
+        "index": [_label(i) for i in df.index],
+        "data": [[_value(v) for v in row] for row in df.itertuples(index=False, name=None)],
+    }
+
+
+def _stats(df: pd.DataFrame) -> Dict[str, dict]:
+    num = df.apply(pd.to_numeric, errors="coerce")
+    desc = {
+        "count": num.count(), "mean": num.mean(), "std": num.std(),
+        "min": num.min(), "max": num.max(), "last": num.ffill().iloc[-1] if len(num) else num.min(),
+    }
+    return {_label(c): {k: _value(v[c]) for k, v in desc.items()} for c in df.columns}
+
+
+def _page_hint(handle: Optional[str]) -> Optional[dict]:
+    if handle is None:
+        return None
+    return {"tool": "page_dataset", "handle": handle, "offset": 0}
+
+
+# ============================ #
+#   编码与分页
+# ============================ #
+def encode(obj, budget: Optional[int] = None, handle: Optional[str] = None) -> Dict[str, Any]:
+    """
+    DataFrame / Series / PricePanel → 预算内的 JSON 友好字典。
+    truncated=True 表示是摘要；给了 handle 时附带分页提示（page_dataset）。
+    其它对象：预算内原样返回，否则截断为字符串预览。
+    """
+    with stage("encode"):
+        return _encode(obj, budget, handle)
+
+
+def _encode(obj, budget: Optional[int], handle: Optional[str]) -> Dict[str, Any]:
+    budget = default_budget() if budget is None else budget
+    if not isinstance(obj, (pd.DataFrame, pd.Series, PricePanel)):
+        if estimate_tokens(obj) <= budget:
+            return {"data": obj}
+        text = json.dumps(obj, default=str, ensure_ascii=False)
+        return {"truncated": True, "preview": text[:budget * CHARS_PER_TOKEN]}
+
+    df = _to_frame(obj)
+    out: Dict[str, Any] = {"shape": list(df.shape)}
+    if handle is not None:
+        out["handle"] = handle
+    # 每个单元格至少 "x," 两个字符：明显超预算时不必先序列化整张表
+    if df.size * 2 <= budget * CHARS_PER_TOKEN:
+        full = {**out, "data": _split(df)}
+        if estimate_tokens(full) <= budget:
+            return full
+
+    out["truncated"] = True
+    if isinstance(df.index, pd.DatetimeIndex) and len(df.index):
+        out["start"], out["end"] = _label(df.index[0]), _label(df.index[-1])
+    if handle is not None:
+        out["page"] = _page_hint(handle)
+
+    numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    n_cols, n_points, n_rows = min(len(df.columns), 20), 100, 3
+    while True:
+        cols = list(df.columns[:n_cols])
+        enc = dict(out)
+        if n_cols < len(df.columns):
+            enc["columns"] = [_label(c) for c in cols] + [f"... (+{len(df.columns) - n_cols})"]
+        enc["stats"] = _stats(df[cols])
+        curve_cols = [c for c in cols if c in numeric]
+        if n_points >= 8 and len(df) > n_rows * 2 and curve_cols:
+            enc["series"] = {}
+            for c in curve_cols:
+                s = downsample(df[c], n_points)
+                enc["series"][_label(c)] = {"index": [_label(i) for i in s.index], "values": [_value(v) for v in s]}
+        if n_rows:
+            enc["head"] = _split(df[cols].head(n_rows))
+            enc["tail"] = _split(df[cols].tail(n_rows))
+        if estimate_tokens(enc) <= budget:
+            return enc
+        # 依次缩减：曲线点数（到 25）→ 列数（到 4）→ 首尾行数 → 去掉曲线 → 列数
+        if n_points > 25 and curve_cols:
+            n_points //= 2
+        elif n_cols > 4:
+            n_cols //= 2
+        elif n_rows > 0:
+            n_rows -= 1
+        elif n_points >= 8 and curve_cols:
+            n_points //= 2
+        elif n_cols > 1:
+            n_cols //= 2
+        else:
+            enc.pop("stats", None)
+            return enc
+
+
+def page(obj, offset: int = 0, limit: Optional[int] = None, columns: Optional[List[str]] = None,
+         budget: Optional[int] = None, handle: Optional[str] = None) -> Dict[str, Any]:
+    """
+    按行分页取完整数据：columns 为列名（多级列用 "field/ticker" 或第一级名称）；
+    limit 为空时按预算自动决定行数。返回 next_offset（没有更多数据时为 None）。
+    """
+    budget = default_budget() if budget is None else budget
+    df = _to_frame(obj)
+    if columns:
+        wanted = set(columns)
+        keep = [c for c in df.columns if _label(c) in wanted or (isinstance(c, tuple) and str(c[0]) in wanted)]
+        df = df[keep]
+    total = len(df)
+    offset = max(0, int(offset))
+    if limit is None:
+        sample = df.iloc[offset:offset + 5]
+        per_row = max(1, estimate_tokens(_split(sample)) / max(len(sample), 1))
+        limit = max(1, int((budget - 100) / per_row))
+    part = df.iloc[offset:offset + limit]
+    end = offset + len(part)
+    out = {"offset": offset, "limit": limit, "total_rows": total, "next_offset": end if end < total else None,
+           "data": _split(part)}
+    if handle is not None:
+        out["handle"] = handle
+    return out
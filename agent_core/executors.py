@@ -0,0 +1,147 @@
+# agent_core/executors.py
+"""
+async 工具的执行池：
+  - IO 线程池：yfinance / FRED 等阻塞网络请求（QUANT_AGENT_IO_WORKERS，默认 16）
+  - CPU 进程池：因子 / 回测等 pandas 计算（QUANT_AGENT_CPU_WORKERS，默认 CPU 核数；0 表示改用 IO 线程池）
+  - 工具超时：QUANT_AGENT_TOOL_TIMEOUT（秒，默认 300），单个工具可用 QUANT_AGENT_TIMEOUT_<工具名大写> 覆盖
+
+环境变量在第一次创建线程池 / 读取超时时读取；也可以用 configure(...) 在代码里设置。
+超时或取消时，排队中的任务会被直接取消；已经在运行的任务无法中断，会在后台跑完，结果被丢弃。
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from agent_core import metrics
+
+
+_LOCK = threading.Lock()
+_POOLS: Dict[str, Executor] = {}
+_OVERRIDES: Dict[str, object] = {}
+
+STATS = {"io_inflight": 0, "cpu_inflight": 0, "completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0}
+
+
+def _count(key: str, n: int = 1) -> None:
+    # 多个事件循环 / 线程都会提交任务，计数加锁
+    with _LOCK:
+        STATS[key] += n
+
+
+def executor_stats() -> Dict[str, int]:
+    """STATS 的一致快照"""
+    with _LOCK:
+        return dict(STATS)
+
+
+def _setting(name: str, env: str, default):
+    if name in _OVERRIDES:
+        return _OVERRIDES[name]
+    raw = os.getenv(env)
+    return type(default)(raw) if raw not in (None, "") else default
+
+
+def get_config() -> dict:
+    return {
+        "io_workers": _setting("io_workers", "QUANT_AGENT_IO_WORKERS", 16),
+        "cpu_workers": _setting("cpu_workers", "QUANT_AGENT_CPU_WORKERS", os.cpu_count() or 1),
+        "timeout": _setting("timeout", "QUANT_AGENT_TOOL_TIMEOUT", 300.0),
+    }
+
+
+def configure(io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+              timeout: Optional[float] = None, timeouts: Optional[Dict[str, float]] = None) -> None:
+    """修改池大小 / 超时；已有的池会被关闭，下一次使用时按新配置重建"""
+    for key, value in (("io_workers", io_workers), ("cpu_workers", cpu_workers), ("timeout", timeout)):
+        if value is not None:
+            _OVERRIDES[key] = value
+    if timeouts:
+        _OVERRIDES.setdefault("timeouts", {}).update(timeouts)
+    shutdown(wait=False)
+
+
+def tool_timeout(tool: str) -> Optional[float]:
+    """单个工具的超时（秒），<= 0 表示不限时"""
+    per_tool = _OVERRIDES.get("timeouts", {})
+    if tool in per_tool:
+        value = per_tool[tool]
+    else:
+        raw = os.getenv(f"QUANT_AGENT_TIMEOUT_{tool.upper()}")
+        value = float(raw) if raw else get_config()["timeout"]
+    return value if value and value > 0 else None
+
+
+def _pool(kind: str) -> Executor:
+    cfg = get_config()
+    if kind == "cpu" and cfg["cpu_workers"] <= 0:
+        kind = "io"
+    with _LOCK:
+        if kind not in _POOLS:
+            if kind == "cpu":
+                _POOLS[kind] = ProcessPoolExecutor(max_workers=cfg["cpu_workers"])
+            else:
+                _POOLS[kind] = ThreadPoolExecutor(max_workers=cfg["io_workers"], thread_name_prefix="quant-io")
+        return _POOLS[kind]
+
+
+def shutdown(wait: bool = True) -> None:
+    with _LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+async def _submit(kind: str, func: Callable, args, kwargs, timeout: Optional[float]):
+    name = getattr(func, "__name__", func)
+    pool = _pool(kind)
+    if isinstance(pool, ThreadPoolExecutor):
+        # 慢调用采样：线程池中的任务记在提交它的工具调用名下
+        func = metrics.in_call(func)
+    future = pool.submit(func, *args, **kwargs)
+    _count(f"{kind}_inflight")
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        future.cancel()
+        _count("timeouts")
+        raise TimeoutError(f"{name} timed out after {timeout}s") from None
+    except asyncio.CancelledError:
+        future.cancel()
+        _count("cancelled")
+        raise
+    except Exception:
+        _count("failed")
+        raise
+    finally:
+        _count(f"{kind}_inflight", -1)
+    _count("completed")
+    return result
+
+
+async def run_io(func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+    """在 IO 线程池中执行阻塞调用（网络请求、磁盘读写）"""
+    return await _submit("io", func, args, kwargs, timeout)
+
+
+async def run_cpu(func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+    """在 CPU 进程池中执行计算；func 与参数 / 返回值需可 pickle（模块级函数、DataFrame 等）"""
+    return await _submit("cpu", func, args, kwargs, timeout)
+
+
+def with_timeout(func: Callable) -> Callable:
+    """async 工具装饰器：整个工具调用受 tool_timeout(工具名) 约束，超时抛出 TimeoutError；耗时 / payload 记入 metrics"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        timeout = tool_timeout(func.__name__)
+        with metrics.tool_call(func.__name__) as call:
+            try:
+                call["result"] = await asyncio.wait_for(func(*args, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                _count("timeouts")
+                raise TimeoutError(f"Tool {func.__name__} timed out after {timeout}s") from None
+        return call["result"]
+    return wrapper
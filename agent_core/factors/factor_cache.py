@@ -0,0 +1,148 @@
+# agent_core/factors/factor_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from agent_core.data.price_panel import PricePanel
+
+
+def panel_fingerprint(price_df) -> str:
+    """价格面板的内容指纹：index、columns 与全部数值一起哈希，内容相同的面板指纹相同"""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(price_df, PricePanel):
+        # 直接哈希底层数组，不展开成 DataFrame
+        for labels in (price_df.fields, price_df.dates, price_df.tickers):
+            h.update(repr(list(labels)).encode())
+        h.update(str(price_df.dtype).encode())
+        h.update(np.ascontiguousarray(price_df.values).data)
+        return h.hexdigest()
+    h.update(repr(list(price_df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(price_df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def factor_key(name: str, params: Dict, fingerprint: str) -> str:
+    """(标准因子名, 参数, 面板指纹) → 缓存 key"""
+    raw = json.dumps([name, params, fingerprint], sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    return 0
+
+
+class FactorCache:
+    """
+    因子结果缓存：
+      - 内存层：按字节数限制的 LRU（max_bytes）
+      - 磁盘层（可选）：disk_dir 下每个 key 一个 pickle，内存淘汰后仍可从磁盘读回；
+        先写临时文件再改名，读不出来的文件（损坏 / 截断）当作未命中并删除
+    缓存中的 DataFrame 直接返回给调用方，请不要原地修改。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2, disk_dir: Optional[Union[str, Path]] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._items: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pkl"
+
+    def _insert(self, key: str, value) -> None:
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        if key in self._items:
+            self.stats["bytes"] -= self._sizes[key]
+        self._items[key] = value
+        self._items.move_to_end(key)
+        self._sizes[key] = size
+        self.stats["bytes"] += size
+        while self.stats["bytes"] > self.max_bytes:
+            old, _ = self._items.popitem(last=False)
+            self.stats["bytes"] -= self._sizes.pop(old)
+            self.stats["evictions"] += 1
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._items[key]
+        if self.disk_dir is not None and self._disk_path(key).exists():
+            value = self._read_disk(key)
+            if value is not None:
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                    self._insert(key, value)
+                return value
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _read_disk(self, key: str):
+        path = self._disk_path(key)
+        try:
+            return pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._insert(key, value)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            # 临时文件名按进程 / 线程区分，并发写同一个 key 时互不覆盖
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                pd.to_pickle(value, tmp)
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+    def get_or_compute(self, key: str, compute: Callable[[], object]):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.stats["bytes"] = 0
+        if self.disk_dir is not None:
+            for p in self.disk_dir.glob("*.pkl"):
+                p.unlink()
+
+
+# 默认因子缓存（仅内存），可用 set_factor_cache 替换，传 None 关闭缓存
+_FACTOR_CACHE: Optional[FactorCache] = FactorCache()
+
+def get_factor_cache() -> Optional[FactorCache]:
+    return _FACTOR_CACHE
+
+def set_factor_cache(cache: Optional[FactorCache]) -> None:
+    global _FACTOR_CACHE
+    _FACTOR_CACHE = cache
@@ -0,0 +1,179 @@
+# agent_core/factors/factor_engine.py
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Union
+
+from agent_core.data.price_panel import PricePanel
+
+FactorRequest = Union[str, Dict]
+
+
+def _get_close(price_df) -> pd.DataFrame:
+    """PricePanel、(field, ticker) 面板或单只股票的扁平 OHLCV 都取 'close'；否则视为收盘价矩阵"""
+    if isinstance(price_df, pd.Series):
+        return price_df
+    if isinstance(price_df, PricePanel):
+        return price_df["close"]
+    if isinstance(price_df.columns, pd.MultiIndex) or "close" in price_df.columns:
+        return price_df["close"]
+    return price_df
+
+
+class SharedIntermediates:
+    """
+    一次请求内共享的中间结果（收益率、差分、EWM、滚动均值……），每种只在整个面板上计算一次。
+    """
+
+    def __init__(self, close: pd.DataFrame):
+        self.close = close
+        self._memo: Dict[tuple, pd.DataFrame] = {}
+        self.hits = 0
+
+    def _get(self, key: tuple, build):
+        if key in self._memo:
+            self.hits += 1
+        else:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def pct_change(self, periods: int) -> pd.DataFrame:
+        return self._get(("pct_change", periods), lambda: self.close.pct_change(periods=periods))
+
+    @property
+    def log_return(self) -> pd.DataFrame:
+        return self._get(("log_return",), lambda: np.log(self.close / self.close.shift(1)))
+
+    @property
+    def diff(self) -> pd.DataFrame:
+        return self._get(("diff",), lambda: self.close.diff())
+
+    @property
+    def gain(self) -> pd.DataFrame:
+        return self._get(("gain",), lambda: self.diff.where(self.diff > 0, 0))
+
+    @property
+    def loss(self) -> pd.DataFrame:
+        return self._get(("loss",), lambda: -self.diff.where(self.diff < 0, 0))
+
+    def rolling_mean(self, name: str, window: int) -> pd.DataFrame:
+        return self._get(("rolling_mean", name, window), lambda: getattr(self, name).rolling(window=window).mean())
+
+    def rolling_std(self, name: str, window: int) -> pd.DataFrame:
+        return self._get(("rolling_std", name, window), lambda: getattr(self, name).rolling(window=window).std())
+
+    def ewm(self, span: int) -> pd.DataFrame:
+        return self._get(("ewm", "close", span), lambda: self.close.ewm(span=span, adjust=False).mean())
+
+    def macd_lines(self, fast: int, slow: int, signal: int):
+        def build():
+            dif = self.ewm(fast) - self.ewm(slow)
+            dea = dif.ewm(span=signal, adjust=False).mean()
+            return dif, dea
+        return self._get(("macd", fast, slow, signal), build)
+
+
+# ============================ #
+#   因子定义：名称 → (计算函数, 默认参数)
+#   与 tech_factors 中的同名函数结果一致
+# ============================ #
+def _momentum(im: SharedIntermediates, window: int) -> Dict[str, pd.DataFrame]:
+    return {"": im.pct_change(window)}
+
+
+def _volatility(im: SharedIntermediates, window: int) -> Dict[str, pd.DataFrame]:
+    return {"": im.rolling_std("log_return", window)}
+
+
+def _rsi(im: SharedIntermediates, period: int) -> Dict[str, pd.DataFrame]:
+    rs = im.rolling_mean("gain", period) / im.rolling_mean("loss", period)
+    return {"": 100 - (100 / (1 + rs))}
+
+
+def _macd(im: SharedIntermediates, fast: int, slow: int, signal: int) -> Dict[str, pd.DataFrame]:
+    dif, dea = im.macd_lines(fast, slow, signal)
+    return {"DIF": dif, "DEA": dea, "MACD": dif - dea}
+
+
+FACTOR_SPECS = {
+    "momentum": (_momentum, {"window": 20}),
+    "volatility": (_volatility, {"window": 20}),
+    "rsi": (_rsi, {"period": 14}),
+    "macd": (_macd, {"fast": 12, "slow": 26, "signal": 9}),
+}
+
+# 多输出因子的各条线（输出列名为 {label}_{line}）
+FACTOR_OUTPUTS = {
+    "macd": ["DIF", "DEA", "MACD"],
+}
+
+# 多输出因子用哪条线做选股（get_factor 返回的那条）
+SIGNAL_LINE = {"macd": "MACD"}
+
+
+def normalize_request(request: FactorRequest) -> Dict:
+    """'momentum' 或 {'name': 'momentum', 'window': 60} → 带完整参数的 dict"""
+    if isinstance(request, str):
+        request = {"name": request}
+    request = dict(request)
+    name = request.pop("name").strip().lower()
+    if name not in FACTOR_SPECS:
+        raise ValueError(f"❌ 未知因子名称：{repr(name)}，可选：{list(FACTOR_SPECS)}")
+    label = request.pop("label", None)
+    _, defaults = FACTOR_SPECS[name]
+    unknown = set(request) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {name}: {sorted(unknown)}")
+    params = {**defaults, **request}
+    if label is None:
+        label = "_".join([name] + [str(v) for v in params.values()])
+    return {"name": name, "label": label, "params": params}
+
+
+def output_labels(request: Dict) -> List[str]:
+    """normalize_request 之后的请求在结果面板中对应的列名"""
+    lines = FACTOR_OUTPUTS.get(request["name"])
+    if not lines:
+        return [request["label"]]
+    return [f"{request['label']}_{line}" for line in lines]
+
+
+def signal_label(request: Dict) -> str:
+    """用于选股的那条线在结果面板中的列名"""
+    line = SIGNAL_LINE.get(request["name"])
+    return f"{request['label']}_{line}" if line else output_labels(request)[0]
+
+
+def signal_factor(close: pd.DataFrame, request: Dict) -> pd.DataFrame:
+    """按 normalize_request 之后的请求计算用于选股的那条因子线（date × ticker）"""
+    panel = compute_factors(close, [{"name": request["name"], "label": request["label"], **request["params"]}])
+    return panel[signal_label(request)]
+
+
+def compute_factors(price_df, requests: List[FactorRequest]) -> pd.DataFrame:
+    """
+    一次计算多个因子，共享收益率 / 差分 / EWM 等中间结果。
+
+    参数：
+      - price_df: get_res_price_data 的 (field, ticker) 面板、单只股票 OHLCV，或收盘价矩阵
+      - requests: 如 ["momentum", {"name": "rsi", "period": 6}, {"name": "macd", "fast": 5}]
+    返回：
+      - 多只股票：columns = MultiIndex[factor, ticker]，factor 形如 momentum_20、macd_12_26_9_DIF
+      - 单只股票：columns = factor
+    """
+    close = _get_close(price_df)
+    single = isinstance(close, pd.Series)
+    if single:
+        close = close.to_frame()
+
+    im = SharedIntermediates(close)
+    outputs = {}
+    for req in map(normalize_request, requests):
+        func, _ = FACTOR_SPECS[req["name"]]
+        for suffix, frame in func(im, **req["params"]).items():
+            label = f"{req['label']}_{suffix}" if suffix else req["label"]
+            outputs[label] = frame
+
+    panel = pd.concat(outputs, axis=1, names=["factor", "ticker"])
+    if single:
+        panel = panel.droplevel("ticker", axis=1)
+    return panel
@@ -1,10 +1,16 @@
 import pandas as pd
-from agent_core.factors.tech_factors import *
+from typing import Dict, List, Optional, Tuple
 
-# 函数字典：内部使用的标准名称 → 对应的函数
+from agent_core.factors.tech_factors import calc_momentum, calc_rsi, calc_volatility
+from agent_core.factors.factor_engine import compute_factors, normalize_request, output_labels, signal_label
+from agent_core.factors.factor_cache import get_factor_cache, factor_key, panel_fingerprint
+
+# 函数字典：内部使用的标准名称 → 对应的函数（默认参数；get_factor 走 factor_engine，结果与这里一致）
 FACTOR_FUNCTIONS = {
     "momentum": calc_momentum,
     "volatility": calc_volatility,
+    "rsi": lambda price_df: calc_rsi(price_df["close"]),
+    "macd": lambda price_df: compute_factors(price_df, ["macd"])["macd_12_26_9_MACD"],
 }
 
 # 自然语言 → 标准函数名（兼容 LLM 输入）
@@ -18,13 +24,98 @@ FACTOR_REGISTRY = {
     "volatility": "volatility",
     "volatility factor": "volatility",
     "低波动": "volatility",
+
+    "rsi": "rsi",
+    "rsi factor": "rsi",
+    "相对强弱指数": "rsi",
+    "相对强弱": "rsi",
+
+    "macd": "macd",
+    "macd factor": "macd",
+    "指数平滑异同移动平均线": "macd",
 }
 
-# 主调用函数：根据用户输入获取计算后的因子 DataFrame
-def get_factor(factor_name: str, price_df) -> 'pd.DataFrame':
+
+def resolve_factor_name(factor_name: str) -> str:
     name_clean = factor_name.strip().lower()  # ← 去除前后空格并小写
     key = FACTOR_REGISTRY.get(name_clean)
     if not key:
         raise ValueError(f"❌ 未知因子名称：{repr(factor_name)}")
-    func = FACTOR_FUNCTIONS[key]
-    return func(price_df)
+    return key
+
+# ============================ #
+#   缓存：key 只由 (标准因子名, 参数, 价格面板指纹) 决定
+#   get_factor 与 get_factors、不同别名、不同 label 共用同一条缓存；缓存中的列名是默认 label
+# ============================ #
+def resolve_requests(requests: list) -> List[Dict]:
+    """别名 / 参数 / label → normalize_request 之后的请求"""
+    resolved = []
+    for req in requests:
+        if isinstance(req, str):
+            req = {"name": req}
+        resolved.append(normalize_request({**req, "name": resolve_factor_name(req["name"])}))
+    return resolved
+
+
+def _canonical(req: Dict) -> Dict:
+    """去掉自定义 label：缓存与计算都用默认 label"""
+    return normalize_request({"name": req["name"], **req["params"]})
+
+
+def _relabel(part: pd.DataFrame, src: Dict, dst: Dict) -> pd.DataFrame:
+    if src["label"] == dst["label"]:
+        return part
+    return part.rename(columns=dict(zip(output_labels(src), output_labels(dst))), level=0)
+
+
+def lookup_factors(resolved: List[Dict], price_df, use_cache: bool = True
+                   ) -> Tuple[Dict[str, pd.DataFrame], List[Dict], Optional[str]]:
+    """查缓存：返回 ({默认 label: 结果}, 未命中的请求（默认 label、已去重）, 面板指纹)"""
+    cache = get_factor_cache() if use_cache else None
+    fingerprint = panel_fingerprint(price_df) if cache is not None else None
+    found, missing = {}, []
+    for req in {c["label"]: c for c in map(_canonical, resolved)}.values():
+        part = cache.get(factor_key(req["name"], req["params"], fingerprint)) if cache is not None else None
+        if part is None:
+            missing.append(req)
+        else:
+            found[req["label"]] = part
+    return found, missing, fingerprint
+
+
+def store_factors(missing: List[Dict], panel: pd.DataFrame, fingerprint: Optional[str]) -> Dict[str, pd.DataFrame]:
+    """把 compute_factors(missing) 的结果按请求拆开写入缓存，返回 {默认 label: 结果}；fingerprint 为 None 时不写入"""
+    cache = get_factor_cache()
+    parts = {}
+    for req in missing:
+        parts[req["label"]] = panel[output_labels(req)]
+        if cache is not None and fingerprint is not None:
+            cache.put(factor_key(req["name"], req["params"], fingerprint), parts[req["label"]])
+    return parts
+
+
+def assemble_factors(resolved: List[Dict], parts: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """按请求顺序拼接结果，换回请求中的 label"""
+    return pd.concat([_relabel(parts[_canonical(req)["label"]], _canonical(req), req) for req in resolved], axis=1)
+
+
+def compute_missing(missing: List[Dict], price_df) -> pd.DataFrame:
+    return compute_factors(price_df, [{"name": r["name"], "label": r["label"], **r["params"]} for r in missing])
+
+
+# 主调用函数：根据用户输入获取计算后的因子 DataFrame（date × ticker；多输出因子取选股用的那条线）
+def get_factor(factor_name: str, price_df, use_cache: bool = True) -> 'pd.DataFrame':
+    req = resolve_requests([factor_name])[0]
+    return get_factors([factor_name], price_df, use_cache)[signal_label(req)]
+
+# 批量调用：一次计算多个因子（共享中间结果），返回 columns = MultiIndex[factor, ticker]
+def get_factors(requests: list, price_df, use_cache: bool = True) -> 'pd.DataFrame':
+    """
+    requests 中的名称可以是自然语言别名，如 ["动量", {"name": "rsi factor", "period": 6}]
+    已缓存的因子直接复用，其余的在一次 compute_factors 中算完；use_cache=False 时不读写缓存
+    """
+    resolved = resolve_requests(requests)
+    found, missing, fingerprint = lookup_factors(resolved, price_df, use_cache)
+    if missing:
+        found.update(store_factors(missing, compute_missing(missing, price_df), fingerprint))
+    return assemble_factors(resolved, found)
@@ -0,0 +1,268 @@
+# agent_core/factors/streaming_factors.py
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class StreamingFactor(ABC):
+    """
+    增量因子基类：按 ticker 保存滚动 / EWM 状态，每来一根新 bar（整个股票池一行收盘价）O(1) 更新。
+    结果与 tech_factors 中的批量函数在浮点误差内一致。
+
+    子类实现：
+      - _init_state(n): n 个新 ticker 的初始状态（等价于此前全是 NaN 的历史），ticker 维在最后
+      - _step(x): 用一行收盘价（np.ndarray）更新状态并返回因子值
+    """
+
+    kind = ""
+    outputs: List[str] = [""]
+
+    def __init__(self, tickers: List[str], **params):
+        self.params = params
+        self.tickers: List[str] = []
+        self.n_bars = 0
+        self.state: Dict[str, np.ndarray] = {}
+        self.add_tickers(tickers)
+
+    # ---------- 状态 ----------
+    @abstractmethod
+    def _init_state(self, n: int) -> Dict[str, np.ndarray]:
+        ...
+
+    def add_tickers(self, tickers: List[str]) -> None:
+        new = [t for t in dict.fromkeys(tickers) if t not in set(self.tickers)]
+        if not new:
+            return
+        fresh = self._init_state(len(new))
+        for key, arr in fresh.items():
+            self.state[key] = np.concatenate([self.state[key], arr], axis=-1) if key in self.state else arr
+        self.tickers += new
+
+    @abstractmethod
+    def _step(self, x: np.ndarray):
+        ...
+
+    # ---------- 更新 ----------
+    def update(self, close: pd.Series):
+        """
+        新增一根 bar：close 为 index=ticker 的收盘价，缺失 ticker 视为 NaN，新 ticker 自动加入。
+        返回 index=ticker 的因子值（MACD 返回 columns=DIF/DEA/MACD 的 DataFrame）
+        """
+        self.add_tickers(list(close.index))
+        x = close.reindex(self.tickers).to_numpy(dtype="float64")
+        out = self._step(x)
+        self.n_bars += 1
+        if len(self.outputs) == 1:
+            return pd.Series(out, index=self.tickers)
+        return pd.DataFrame(dict(zip(self.outputs, out)), index=self.tickers)
+
+    def update_batch(self, close_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        依次喂入多根 bar（index=date，columns=ticker），每根 bar 仍是 O(1) 更新。
+        返回 date × ticker 的因子值；多输出因子 columns = MultiIndex[line, ticker]
+        """
+        self.add_tickers(list(close_df.columns))
+        values = close_df.reindex(columns=self.tickers).to_numpy(dtype="float64")
+        results = [np.empty_like(values) for _ in self.outputs]
+        for i, x in enumerate(values):
+            out = self._step(x)
+            self.n_bars += 1
+            if len(self.outputs) == 1:
+                out = (out,)
+            for res, o in zip(results, out):
+                res[i] = o
+        frames = {name: pd.DataFrame(res, index=close_df.index, columns=self.tickers)
+                  for name, res in zip(self.outputs, results)}
+        if len(self.outputs) == 1:
+            return frames[""]
+        return pd.concat(frames, axis=1, names=["line", "ticker"])
+
+    # ---------- 序列化 ----------
+    def save(self, path: str) -> None:
+        meta = {"kind": self.kind, "params": self.params, "tickers": self.tickers, "n_bars": self.n_bars}
+        with open(path, "wb") as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **self.state)
+
+    @staticmethod
+    def load(path: str) -> "StreamingFactor":
+        with np.load(path) as data:
+            meta = json.loads(str(data["__meta__"]))
+            factor = STREAMING_FACTORS[meta["kind"]](meta["tickers"], **meta["params"])
+            factor.state = {k: data[k].copy() for k in data.files if k != "__meta__"}
+        factor.n_bars = meta["n_bars"]
+        return factor
+
+
+# ============================ #
+#   各因子的增量实现
+# ============================ #
+class StreamingMomentum(StreamingFactor):
+    """对应 calc_momentum：close.pct_change(window)，缺失价格沿用上一个有效价"""
+
+    kind = "momentum"
+
+    def __init__(self, tickers: List[str], window: int = 20):
+        super().__init__(tickers, window=window)
+
+    def _init_state(self, n):
+        w = self.params["window"]
+        return {"ring": np.full((w, n), np.nan), "last": np.full(n, np.nan)}
+
+    def _step(self, x):
+        st = self.state
+        filled = np.where(np.isnan(x), st["last"], x)
+        st["last"] = filled
+        pos = self.n_bars % self.params["window"]
+        old = st["ring"][pos].copy()
+        st["ring"][pos] = filled
+        return filled / old - 1
+
+
+class StreamingVolatility(StreamingFactor):
+    """对应 calc_volatility：对数收益的 window 日滚动标准差（Welford 增删，窗口内有 NaN 则为 NaN）"""
+
+    kind = "volatility"
+
+    def __init__(self, tickers: List[str], window: int = 20):
+        super().__init__(tickers, window=window)
+
+    def _init_state(self, n):
+        w = self.params["window"]
+        return {
+            "prev": np.full(n, np.nan),
+            "ring": np.full((w, n), np.nan),
+            "nobs": np.zeros(n),
+            "mean": np.zeros(n),
+            "ssqdm": np.zeros(n),
+        }
+
+    def _step(self, x):
+        st = self.state
+        w = self.params["window"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lr = np.log(x / st["prev"])
+        st["prev"] = x
+
+        # 移出窗口最老的值
+        pos = self.n_bars % w
+        old = st["ring"][pos]
+        rm = ~np.isnan(old)
+        if rm.any():
+            nobs = st["nobs"][rm] - 1
+            delta = old[rm] - st["mean"][rm]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(nobs > 0, st["mean"][rm] - delta / nobs, 0.0)
+                ssqdm = np.where(nobs > 0, st["ssqdm"][rm] - (nobs + 1) * delta ** 2 / nobs, 0.0)
+            st["nobs"][rm], st["mean"][rm], st["ssqdm"][rm] = nobs, mean, ssqdm
+
+        # 加入新值
+        add = ~np.isnan(lr)
+        if add.any():
+            nobs = st["nobs"][add] + 1
+            delta = lr[add] - st["mean"][add]
+            st["mean"][add] += delta / nobs
+            st["ssqdm"][add] += (nobs - 1) * delta ** 2 / nobs
+            st["nobs"][add] = nobs
+        st["ring"][pos] = lr
+
+        nobs = st["nobs"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = np.maximum(st["ssqdm"] / (nobs - 1), 0.0)
+        return np.where(nobs >= w, np.sqrt(var), np.nan)
+
+
+class StreamingRSI(StreamingFactor):
+    """对应 calc_rsi：涨跌幅的 period 日简单平均之比"""
+
+    kind = "rsi"
+
+    def __init__(self, tickers: List[str], period: int = 14):
+        super().__init__(tickers, period=period)
+
+    def _init_state(self, n):
+        p = self.params["period"]
+        return {
+            "prev": np.full(n, np.nan),
+            "gain_ring": np.zeros((p, n)),
+            "loss_ring": np.zeros((p, n)),
+            "gain_sum": np.zeros(n),
+            "loss_sum": np.zeros(n),
+            # 窗口内非零值个数：全为 0 时均值严格为 0，避免增删累积的舍入误差
+            "gain_nz": np.zeros(n),
+            "loss_nz": np.zeros(n),
+        }
+
+    def _step(self, x):
+        st = self.state
+        p = self.params["period"]
+        delta = x - st["prev"]
+        st["prev"] = x
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        pos = self.n_bars % p
+        for name, new in (("gain", gain), ("loss", loss)):
+            ring = st[f"{name}_ring"]
+            old = ring[pos]
+            st[f"{name}_sum"] += new - old
+            st[f"{name}_nz"] += (new != 0).astype(float) - (old != 0)
+            ring[pos] = new
+
+        if self.n_bars + 1 < p:
+            return np.full(len(x), np.nan)
+        avg_gain = np.where(st["gain_nz"] > 0, st["gain_sum"] / p, 0.0)
+        avg_loss = np.where(st["loss_nz"] > 0, st["loss_sum"] / p, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def _ewm_step(st: Dict[str, np.ndarray], prefix: str, x: np.ndarray, span: int) -> np.ndarray:
+    """与 pandas ewm(span, adjust=False).mean() 相同的递推（含 NaN 处理，ignore_na=False）"""
+    alpha = 2.0 / (span + 1)
+    weighted, old_wt = st[f"{prefix}_w"], st[f"{prefix}_wt"]
+    obs = ~np.isnan(x)
+    started = ~np.isnan(weighted)
+
+    old_wt[started] *= 1 - alpha
+    upd = started & obs & (weighted != x)
+    weighted[upd] = (old_wt[upd] * weighted[upd] + alpha * x[upd]) / (old_wt[upd] + alpha)
+    old_wt[started & obs] = 1.0
+
+    first = ~started & obs
+    weighted[first] = x[first]
+    return weighted.copy()
+
+
+class StreamingMACD(StreamingFactor):
+    """对应 calc_macd：DIF = EMA(fast) - EMA(slow)，DEA = EMA(DIF, signal)，MACD = DIF - DEA"""
+
+    kind = "macd"
+    outputs = ["DIF", "DEA", "MACD"]
+
+    def __init__(self, tickers: List[str], fast: int = 12, slow: int = 26, signal: int = 9):
+        super().__init__(tickers, fast=fast, slow=slow, signal=signal)
+
+    def _init_state(self, n):
+        state = {}
+        for prefix in ("fast", "slow", "signal"):
+            state[f"{prefix}_w"] = np.full(n, np.nan)
+            state[f"{prefix}_wt"] = np.ones(n)
+        return state
+
+    def _step(self, x):
+        st = self.state
+        dif = _ewm_step(st, "fast", x, self.params["fast"]) - _ewm_step(st, "slow", x, self.params["slow"])
+        dea = _ewm_step(st, "signal", dif, self.params["signal"])
+        return dif, dea, dif - dea
+
+
+STREAMING_FACTORS = {
+    "momentum": StreamingMomentum,
+    "volatility": StreamingVolatility,
+    "rsi": StreamingRSI,
+    "macd": StreamingMACD,
+}
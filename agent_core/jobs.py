@@ -0,0 +1,64 @@
+# agent_core/jobs.py
+"""
+CPU 密集的组合任务，供 MCP 工具通过 executors.run_cpu 放进进程池执行。
+都是模块级函数，参数与返回值只用可 pickle 的对象（DataFrame / Series / dict）。
+组合任务在返回的 dict 里带上 "timings"（各阶段秒数），由主进程 metrics.merge 汇总。
+因子缓存只在主进程查询和写入（server._factor_panel），这里的计算都不读写缓存：
+worker 进程各自的内存缓存既不共享、也不在 server_stats 中可见。
+"""
+from typing import List, Optional
+
+import pandas as pd
+
+from agent_core.backtest.array_backtest import fast_backtest
+from agent_core.backtest.factor_backtest import forward_returns, ic_decay, quantile_returns
+from agent_core.factors.factor_registry import compute_missing, get_factor
+from agent_core.metrics import StageTimer
+from agent_core.strategy.strategy_builder import equal_weight, generate_last_n_signal, generate_top_n_signal, select_top_n
+
+
+def factors_job(missing: list, close: pd.DataFrame) -> pd.DataFrame:
+    """lookup_factors 未命中的请求（默认 label）→ 因子面板；只需要收盘价"""
+    return compute_missing(missing, close)
+
+
+def weights_job(factor_df: pd.DataFrame, top_n: int = 10, ascending: bool = False) -> pd.DataFrame:
+    if ascending:
+        return equal_weight(generate_last_n_signal(factor_df, last_n=top_n))
+    return equal_weight(generate_top_n_signal(factor_df, top_n=top_n))
+
+
+def backtest_job(price_df, weight_df: pd.DataFrame, rebalance: str = "daily", cost_bps: float = 0.0) -> dict:
+    return fast_backtest(price_df, weight_df, rebalance=rebalance, cost_bps=cost_bps)
+
+
+def factor_backtest_job(factor_name: str, price_df, top_n: int = 10, rebalance: str = "daily",
+                        cost_bps: float = 0.0, factor_df: Optional[pd.DataFrame] = None) -> dict:
+    """因子 → top_n 等权（稀疏持仓）→ fast_backtest；factor_df 给出时跳过因子计算"""
+    timer = StageTimer()
+    if factor_df is None:
+        with timer.stage("factor"):
+            factor_df = get_factor(factor_name, price_df, use_cache=False)
+    with timer.stage("signal"):
+        weight_df = equal_weight(select_top_n(factor_df, top_n))
+    with timer.stage("backtest"):
+        result = fast_backtest(price_df, weight_df, rebalance=rebalance, cost_bps=cost_bps)
+    return {**result, "timings": timer.timings}
+
+
+def factor_ic_job(factor_name: str, price_df, horizons: List[int], n_groups: int = 5,
+                  factor_df: Optional[pd.DataFrame] = None) -> dict:
+    """IC 衰减 + 分组平均次日收益"""
+    timer = StageTimer()
+    close = price_df["close"]
+    if factor_df is None:
+        with timer.stage("factor"):
+            factor_df = get_factor(factor_name, price_df, use_cache=False)
+    with timer.stage("ic"):
+        decay = ic_decay(factor_df, close, horizons)
+        groups = quantile_returns(factor_df, forward_returns(close, 1), n_groups).mean()
+    return {
+        "ic_decay": decay.round(4).to_dict(orient="index"),
+        "quantile_mean_return": groups.round(6).to_dict(),
+        "timings": timer.timings,
+    }
@@ -0,0 +1,32 @@
+# agent_core/lazy.py
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """第一次访问属性时才真正 import 的模块代理"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    yf = lazy_import("yfinance")：调用处写法不变（yf.download），
+    yfinance / matplotlib 等重量级依赖推迟到第一次使用时加载，缩短 server / chat 的冷启动。
+    """
+    return _LazyModule(name)
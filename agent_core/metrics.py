@@ -0,0 +1,368 @@
+# agent_core/metrics.py
+"""
+服务端埋点：
+
+  - 工具：每个 MCP 工具的调用次数、错误数、耗时（总计 / 最大 / p50 / p95）、返回 payload 字节数
+  - 阶段：fetch / clean / factor / signal / backtest / encode 等阶段耗时（stage(...) 上下文）
+  - 上游：yfinance / FRED 每次请求的耗时（rate_limit 中记录）
+  - 导出：snapshot() 给 server_stats 工具；to_prometheus() / write_prometheus() 生成 Prometheus 文本格式，
+    QUANT_AGENT_METRICS_FILE 设置后每次工具调用结束都会刷新该文件（最多每 5 秒一次）
+  - 慢调用采样：QUANT_AGENT_PROFILE_SLOW=秒数 时，进程内唯一的采样线程每 QUANT_AGENT_PROFILE_INTERVAL 秒
+    （默认 0.005）采样调用栈，超过阈值的调用把折叠栈（flamegraph 格式）写到 cache_dir("profiles")。
+    每次调用只统计为它干活的线程：run_io / run_cpu 提交到线程池的任务记在提交它的调用名下；
+    事件循环线程只在仅有一个调用进行中时计入（并发调用时无法区分，不计入任何一次调用）。
+    进程池中的计算不在采样范围内，可设置 QUANT_AGENT_CPU_WORKERS=0 让它们在线程中执行。
+"""
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from agent_core.config import cache_dir
+
+_LOCK = threading.Lock()
+
+
+class Timing:
+    """一个计时项：次数、总耗时、最大值，最近 512 次用于分位数"""
+    __slots__ = ("count", "total", "max", "errors", "bytes", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.bytes = 0
+        self.recent = deque(maxlen=512)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        recent = sorted(self.recent)
+        q = lambda p: round(recent[min(len(recent) - 1, int(p * len(recent)))], 6) if recent else 0.0
+        out = {"count": self.count, "total_s": round(self.total, 6), "max_s": round(self.max, 6),
+               "p50_s": q(0.5), "p95_s": q(0.95)}
+        if self.errors:
+            out["errors"] = self.errors
+        if self.bytes:
+            out["payload_bytes"] = self.bytes
+        return out
+
+
+# kind（tool / stage / upstream）→ 名称 → Timing
+_TIMINGS: Dict[str, Dict[str, Timing]] = {}
+
+
+def _timing(kind: str, name: str) -> Timing:
+    with _LOCK:
+        return _TIMINGS.setdefault(kind, {}).setdefault(name, Timing())
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    t = _timing(kind, name)
+    with _LOCK:
+        t.add(seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """with stage("fetch"): ...  记录一个阶段的耗时（async 代码里也可以用）"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record("stage", name, time.perf_counter() - t0)
+
+
+class StageTimer:
+    """只在本地收集阶段耗时、不写全局表：给进程池中的任务用，结果随返回值带回主进程再 merge"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - t0
+
+
+def merge(timings: Optional[Dict[str, float]]) -> None:
+    for name, seconds in (timings or {}).items():
+        record("stage", name, seconds)
+
+
+def reset() -> None:
+    with _LOCK:
+        _TIMINGS.clear()
+
+
+def payload_size(result) -> int:
+    try:
+        return len(json.dumps(result, default=str, ensure_ascii=False).encode())
+    except (TypeError, ValueError):
+        return 0
+
+
+# ============================ #
+#   慢调用采样
+# ============================ #
+def profile_threshold() -> Optional[float]:
+    raw = os.getenv("QUANT_AGENT_PROFILE_SLOW")
+    return float(raw) if raw else None
+
+
+class Profile:
+    """一次工具调用的采样结果：折叠栈计数"""
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def dump(self, path: Union[str, Path]) -> str:
+        lines = [f"{stack} {n}" for stack, n in self.stacks.most_common()]
+        Path(path).write_text("\n".join(lines) + "\n")
+        return str(path)
+
+
+# 当前上下文所属的调用（run_io / run_cpu 据此把线程池任务记到对应的调用名下）
+_PROFILE: ContextVar[Optional[Profile]] = ContextVar("quant_profile", default=None)
+
+# 空闲等待的线程池 worker / 事件循环，不计入
+_IDLE = ("threading:wait", "queue:get", "selectors:select", "thread:_worker")
+
+
+def _folded(frame) -> Optional[str]:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+        frame = frame.f_back
+    if not names or names[0].startswith(_IDLE):
+        return None
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """
+    进程内唯一的采样线程：有调用在采样时运行，最后一个调用结束时退出。
+    线程 → 调用的归属：bind() 期间的线程属于对应调用；调用开始时所在的线程（事件循环）只在它上面仅有这一个调用时计入。
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._hosts: Dict[int, List[Profile]] = {}
+        self._bound: Dict[int, Profile] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self) -> Profile:
+        profile = Profile()
+        with self._lock:
+            self._hosts.setdefault(threading.get_ident(), []).append(profile)
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name="quant-sampler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: Profile) -> None:
+        thread = None
+        with self._lock:
+            for ident, profiles in list(self._hosts.items()):
+                if profile in profiles:
+                    profiles.remove(profile)
+                    if not profiles:
+                        del self._hosts[ident]
+            if not self._hosts:
+                thread, self._thread = self._thread, None
+                self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @contextmanager
+    def bind(self, profile: Profile) -> Iterator[None]:
+        """当前线程在 with 期间为 profile 对应的调用干活"""
+        ident = threading.get_ident()
+        with self._lock:
+            previous = self._bound.get(ident)
+            self._bound[ident] = profile
+        try:
+            yield
+        finally:
+            with self._lock:
+                if previous is None:
+                    self._bound.pop(ident, None)
+                else:
+                    self._bound[ident] = previous
+
+    def _owners(self) -> "tuple[Dict[int, Profile], List[Profile]]":
+        with self._lock:
+            owners = {ident: profiles[0] for ident, profiles in self._hosts.items() if len(profiles) == 1}
+            owners.update(self._bound)
+            active = {id(p): p for profiles in self._hosts.values() for p in profiles}
+        return owners, list(active.values())
+
+    def _run(self, stop: threading.Event) -> None:
+        interval = self.interval or float(os.getenv("QUANT_AGENT_PROFILE_INTERVAL") or 0.005)
+        while not stop.wait(interval):
+            owners, active = self._owners()
+            frames = sys._current_frames()
+            for ident, profile in owners.items():
+                frame = frames.get(ident)
+                stack = _folded(frame) if frame is not None else None
+                if stack is not None:
+                    profile.stacks[stack] += 1
+            for profile in active:
+                profile.samples += 1
+
+
+_SAMPLER = Sampler()
+
+
+def get_sampler() -> Sampler:
+    return _SAMPLER
+
+
+def in_call(func: Callable) -> Callable:
+    """把 func 包装成在当前调用名下执行（提交到线程池之前调用）；当前没有采样中的调用时原样返回"""
+    profile = _PROFILE.get()
+    if profile is None:
+        return func
+    return functools.partial(_run_in_call, profile, func)
+
+
+def _run_in_call(profile: Profile, func: Callable, *args, **kwargs):
+    token = _PROFILE.set(profile)
+    try:
+        with _SAMPLER.bind(profile):
+            return func(*args, **kwargs)
+    finally:
+        _PROFILE.reset(token)
+
+
+def _dump_profile(tool: str, profile: Profile, seconds: float) -> str:
+    path = cache_dir("profiles") / f"{tool}_{time.strftime('%Y%m%dT%H%M%S')}_{seconds:.1f}s.folded"
+    return profile.dump(path)
+
+
+@contextmanager
+def tool_call(name: str) -> Iterator[dict]:
+    """
+    包住一次工具调用：记录耗时 / 错误 / payload；调用方把返回值放进 call["result"] 以统计 payload 大小。
+    开启慢调用采样时，超过阈值的调用 call["profile"] 为导出的文件路径。
+    """
+    threshold = profile_threshold()
+    profile = _SAMPLER.begin() if threshold is not None else None
+    token = _PROFILE.set(profile) if profile is not None else None
+    call: dict = {}
+    t0 = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        t = _timing("tool", name)
+        with _LOCK:
+            t.errors += 1
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        record("tool", name, seconds)
+        if "result" in call:
+            size = payload_size(call["result"])
+            t = _timing("tool", name)
+            with _LOCK:
+                t.bytes += size
+        if profile is not None:
+            _PROFILE.reset(token)
+            _SAMPLER.end(profile)
+            if seconds >= threshold and profile.stacks:
+                call["profile"] = _dump_profile(name, profile, seconds)
+        _maybe_write_file()
+
+
+# ============================ #
+#   快照与导出
+# ============================ #
+def snapshot() -> Dict[str, Dict[str, dict]]:
+    with _LOCK:
+        return {kind: {name: t.summary() for name, t in items.items()} for kind, items in _TIMINGS.items()}
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(p for p in parts if p)).lower()
+
+
+def _flatten(prefix: str, obj, labels: Dict[str, str], out: list) -> None:
+    if isinstance(obj, bool):
+        obj = int(obj)
+    if isinstance(obj, (int, float)):
+        label = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        out.append(f"{prefix}{{{label}}} {obj}" if label else f"{prefix} {obj}")
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            _flatten(_metric_name(prefix, str(key)), value, labels, out)
+
+
+def to_prometheus(stats: Optional[dict] = None) -> str:
+    """
+    Prometheus 文本格式。stats 为 server_stats 的结构：{分组: {名称: {指标: 数值}}}；
+    timings 分组（tool / stage / upstream）按 name 标签展开，其余分组直接展开成指标名。
+    """
+    stats = {"timings": snapshot()} if stats is None else stats
+    lines = []
+    for group, content in stats.items():
+        if group == "timings":
+            for kind, items in content.items():
+                for name, summary in items.items():
+                    _flatten(_metric_name("quant_agent", kind), summary, {"name": name}, lines)
+        else:
+            _flatten(_metric_name("quant_agent", group), content, {}, lines)
+    return "\n".join(lines) + "\n"
+
+
+# server 注册的完整统计函数（包含缓存 / 限速等），write_prometheus 默认用它
+_STATS_PROVIDER = None
+_LAST_WRITE = [0.0]
+
+def set_stats_provider(provider) -> None:
+    global _STATS_PROVIDER
+    _STATS_PROVIDER = provider
+
+
+def write_prometheus(path: Optional[Union[str, Path]] = None, stats: Optional[dict] = None) -> str:
+    """写 Prometheus 文本文件（node_exporter textfile collector 可直接读取），先写临时文件再改名"""
+    path = Path(path or os.getenv("QUANT_AGENT_METRICS_FILE") or cache_dir("metrics") / "quant_agent.prom")
+    if stats is None:
+        stats = _STATS_PROVIDER() if _STATS_PROVIDER is not None else None
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(to_prometheus(stats))
+    tmp.replace(path)
+    return str(path)
+
+
+def _maybe_write_file() -> None:
+    if not os.getenv("QUANT_AGENT_METRICS_FILE"):
+        return
+    now = time.monotonic()
+    if now - _LAST_WRITE[0] < 5.0:
+        return
+    _LAST_WRITE[0] = now
+    try:
+        write_prometheus()
+    except OSError:
+        pass
@@ -0,0 +1,38 @@
+from typing import Optional
+
+import pandas as pd
+
+from agent_core.plot.render import chart
+
+
+def _equity_of(result) -> pd.Series:
+    # 接受 fast_backtest / run_chunked_backtest 的结果 dict，或直接给净值曲线
+    equity = result["equity"] if isinstance(result, dict) else result
+    if isinstance(equity, pd.DataFrame):
+        equity = equity.iloc[:, 0]
+    return equity.dropna()
+
+
+def plot_equity_curve(result, benchmark: Optional[pd.Series] = None, title: str = "Equity Curve",
+                      wait: bool = True) -> dict:
+    """净值曲线（可叠加基准，按起点归一）+ 下方回撤面积图"""
+    equity = _equity_of(result)
+    series = [("strategy", equity.index, equity.to_numpy())]
+    if benchmark is not None:
+        bench = benchmark.reindex(equity.index).ffill().dropna()
+        if len(bench):
+            bench = bench / bench.iloc[0] * equity.loc[bench.index[0]]
+            series.append(("benchmark", bench.index, bench.to_numpy()))
+    drawdown = equity / equity.cummax() - 1
+    panels = [
+        {"series": series, "ylabel": "Equity", "height": 3},
+        {"series": [("drawdown", drawdown.index, drawdown.to_numpy())], "ylabel": "Drawdown", "kind": "area", "height": 1},
+    ]
+    return chart(panels, prefix="equity", wait=wait, title=title, x_label="Date", width=10, height=6)
+
+
+def plot_turnover(result, title: str = "Daily Turnover", wait: bool = True) -> dict:
+    """每日双边换手"""
+    turnover = result["turnover"].dropna()
+    return chart([{"series": [("turnover", turnover.index, turnover.to_numpy())], "ylabel": "Turnover"}],
+                 prefix="turnover", wait=wait, title=title, x_label="Date")
@@ -1,28 +1,40 @@
-import matplotlib.pyplot as plt
-from agent_core.data.price_data import *
-from agent_core.data.fundamental_data import *
-from agent_core.data.macro_data import *
-import uuid
+import pandas as pd
 
-def plot_res_line_chart(ticker: str, start: str, end: str, df: pd.DataFrame) -> dict:
-    plt.figure(figsize=(10,4))
-    plt.plot(df.index, df["close"], label=f"{ticker} Close Price")
-    plt.title(f"{ticker} Price from {start} to {end}")
-    plt.xlabel("Date")
-    plt.ylabel("Price")
-    plt.grid(True)
-    plt.tight_layout()
-    path = f"line_{uuid.uuid4().hex[:8]}.png"
-    plt.savefig(path, dpi=150)
-    plt.close()
-    return {"image": path}
+from agent_core.data.price_data import get_res_price_data
+from agent_core.plot.render import chart
 
-def plot_2d_line_chart(title: str, x_label: str, y_label:str, x_data, y_data, width:10, height:4):
-    plt.figure(figsize=(width,height))
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.grid(True)
+# 所有图表都走 render.chart：Agg 面向对象接口 + LTTB 降采样 + 后台线程池 + 按内容哈希缓存
+# wait=False 时立即返回 {"image": 路径, "ready": False}，图在后台画完后出现在该路径
 
-def plot_2d_scatter_chart():
-    ...
\ No newline at end of file
+def plot_res_line_chart(ticker: str, start: str, end: str, df: pd.DataFrame = None, wait: bool = True) -> dict:
+    """
+    收盘价折线图；df 为空时按 ticker / 日期区间取价格（多只 ticker 画在同一张图上）
+    df 也可以是 [{"date": ..., "close": ...}, ...]（chat 工具调用传入的 JSON 行）
+    """
+    if df is None:
+        df = get_res_price_data(ticker, start, end)
+    elif isinstance(df, list):
+        df = pd.DataFrame(df).set_index("date")
+    close = df["close"]
+    if isinstance(close, pd.Series):
+        series = [(f"{ticker} Close Price", close.index, close.to_numpy())]
+    else:
+        series = [(str(c), close.index, close[c].to_numpy()) for c in close.columns]
+    return chart([{"series": series, "ylabel": "Price"}], prefix="line", wait=wait,
+                 title=f"{ticker} Price from {start} to {end}", x_label="Date")
+
+def _series_list(x_data, y_data) -> list:
+    # y_data 可以是一组数，也可以是 {名称: 一组数}
+    if isinstance(y_data, dict):
+        return [(str(name), x_data, y) for name, y in y_data.items()]
+    return [("", x_data, y_data)]
+
+def plot_2d_line_chart(title: str, x_label: str, y_label: str, x_data, y_data, width: float = 10, height: float = 4,
+                       wait: bool = True) -> dict:
+    return chart([{"series": _series_list(x_data, y_data), "ylabel": y_label}], prefix="line2d", wait=wait,
+                 title=title, x_label=x_label, width=width, height=height)
+
+def plot_2d_scatter_chart(title: str, x_label: str, y_label: str, x_data, y_data, width: float = 6, height: float = 6,
+                          wait: bool = True) -> dict:
+    return chart([{"series": _series_list(x_data, y_data), "ylabel": y_label, "kind": "scatter"}], prefix="scatter",
+                 wait=wait, title=title, x_label=x_label, width=width, height=height)
@@ -0,0 +1,212 @@
+# agent_core/plot/render.py
+"""
+图表渲染服务：
+
+  - 只用 matplotlib 的面向对象 Agg 接口（Figure + FigureCanvasAgg），不碰 pyplot 全局状态，可以多线程并发画图
+  - 折线先用 LTTB 降采样到像素宽度（宽 × dpi 个点），散点按像素格去重，点数再多耗时也基本不变
+  - 在后台线程池中渲染；submit 立即返回 (路径, Future)，chat 循环不必等图画完
+  - 输出文件名是 (数据指纹, 图表参数) 的内容哈希：相同请求直接复用已有 PNG，进行中的相同请求只画一次
+
+目录：cache_dir("charts")，可用 set_render_service 替换默认实例。
+"""
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agent_core.config import cache_dir
+from agent_core.encoding import lttb
+
+logger = logging.getLogger(__name__)
+
+def _as_index(x) -> pd.Index:
+    """x 轴统一成 Index；日期字符串解析为 DatetimeIndex"""
+    x = x if isinstance(x, pd.Index) else pd.Index(x)
+    if x.dtype == object:
+        try:
+            x = pd.DatetimeIndex(pd.to_datetime(x))
+        except (ValueError, TypeError):
+            pass
+    return x
+
+
+def _as_numeric(x) -> np.ndarray:
+    """LTTB / 像素去重用的数值 x；类别型 x 按位置"""
+    x = _as_index(x)
+    if isinstance(x, pd.DatetimeIndex):
+        return x.asi8.astype("float64")
+    if pd.api.types.is_numeric_dtype(x):
+        return np.asarray(x, dtype="float64")
+    return np.arange(len(x), dtype="float64")
+
+
+def data_fingerprint(panels: List[dict]) -> str:
+    """所有序列的标签、x、y 一起哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    for panel in panels:
+        for label, x, y in panel["series"]:
+            h.update(str(label).encode())
+            h.update(pd.util.hash_pandas_object(_as_index(x), index=False).to_numpy().tobytes())
+            h.update(np.ascontiguousarray(np.asarray(y, dtype="float64")).tobytes())
+    return h.hexdigest()
+
+
+def _reduce_line(x, y, n_pixels: int):
+    x = _as_index(x)
+    y = np.asarray(y, dtype="float64")
+    idx = lttb(y, n_pixels, _as_numeric(x))
+    return x[idx], y[idx]
+
+
+def _reduce_scatter(x, y, width_px: int, height_px: int):
+    """同一个像素格里只留一个点"""
+    x = _as_index(x)
+    xn, yn = _as_numeric(x), np.asarray(y, dtype="float64")
+    ok = ~(np.isnan(xn) | np.isnan(yn))
+    xn, yn = xn[ok], yn[ok]
+    if len(xn) <= width_px:
+        return x[ok], yn
+    span = lambda v: (v - v.min()) / ((v.max() - v.min()) or 1.0)
+    cells = (span(xn) * (width_px - 1)).astype(np.int64) * height_px + (span(yn) * (height_px - 1)).astype(np.int64)
+    _, keep = np.unique(cells, return_index=True)
+    keep.sort()
+    return x[ok][keep], yn[keep]
+
+
+def draw(path: Union[str, Path], panels: List[dict], title: str = "", x_label: str = "", width: float = 10,
+         height: float = 4, dpi: int = 100, grid: bool = True) -> str:
+    """
+    用 Agg 画一张图并保存为 PNG。panels 从上到下排列，每个为
+    {"series": [(label, x, y), ...], "kind": "line" | "scatter" | "area", "ylabel": str, "height": 相对高度}
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ratios = [p.get("height", 1) for p in panels]
+    axes = fig.subplots(len(panels), 1, sharex=len(panels) > 1, squeeze=False,
+                        gridspec_kw={"height_ratios": ratios})[:, 0]
+    width_px, height_px = int(width * dpi), int(height * dpi)
+
+    for ax, panel in zip(axes, panels):
+        kind = panel.get("kind", "line")
+        for label, x, y in panel["series"]:
+            if kind == "scatter":
+                xs, ys = _reduce_scatter(x, y, width_px, height_px)
+                ax.scatter(xs, ys, s=6, label=label)
+            else:
+                xs, ys = _reduce_line(x, y, width_px)
+                if kind == "area":
+                    ax.fill_between(xs, ys, 0, alpha=0.4, label=label)
+                else:
+                    ax.plot(xs, ys, linewidth=1, label=label)
+        ax.set_ylabel(panel.get("ylabel", ""))
+        ax.grid(grid)
+        if len(panel["series"]) > 1 or (panel["series"] and panel["series"][0][0]):
+            ax.legend(loc="best", fontsize="small")
+    axes[0].set_title(title)
+    axes[-1].set_xlabel(x_label)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    return str(path)
+
+
+class RenderService:
+    def __init__(self, root: Optional[Union[str, Path]] = None, max_workers: int = 2, dpi: int = 100):
+        self.root = Path(root) if root is not None else cache_dir("charts")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dpi = dpi
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quant-render")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "renders": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        self.errors: Dict[str, str] = {}
+
+    def key(self, panels: List[dict], params: dict) -> str:
+        raw = json.dumps([data_fingerprint(panels), params, self.dpi], sort_keys=True, default=str)
+        return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+    def submit(self, panels: List[dict], prefix: str = "chart", **params) -> Tuple[str, Future]:
+        """后台渲染；返回 (PNG 路径, Future)。路径由内容哈希决定，图画完之前就可以返回给调用方"""
+        path = self.root / f"{prefix}_{self.key(panels, params)}.png"
+        with self._lock:
+            self.stats["requests"] += 1
+            if path.exists():
+                self.stats["cache_hits"] += 1
+                done: Future = Future()
+                done.set_result(str(path))
+                return str(path), done
+            if str(path) in self._inflight:
+                self.stats["coalesced"] += 1
+                return str(path), self._inflight[str(path)]
+            future = self._pool.submit(self._render, path, panels, params)
+            self._inflight[str(path)] = future
+        # wait=False 时没有人取 future.result()，失败在这里记录下来，否则异常会被静默丢弃
+        future.add_done_callback(lambda f: self._report(str(path), f))
+        return str(path), future
+
+    def _report(self, path: str, future: Future) -> None:
+        if future.cancelled() or future.exception() is None:
+            return
+        with self._lock:
+            self.stats["errors"] += 1
+            self.errors[path] = repr(future.exception())
+        logger.error("chart render failed: %s", path, exc_info=future.exception())
+
+    def _render(self, path: Path, panels: List[dict], params: dict) -> str:
+        # 先写临时文件再改名，避免读到半张图
+        tmp = path.with_name(path.stem + ".tmp.png")
+        try:
+            draw(tmp, panels, dpi=self.dpi, **params)
+            tmp.replace(path)
+            with self._lock:
+                self.stats["renders"] += 1
+                self.errors.pop(str(path), None)
+            return str(path)
+        finally:
+            with self._lock:
+                self._inflight.pop(str(path), None)
+
+    def render(self, panels: List[dict], prefix: str = "chart", **params) -> str:
+        path, future = self.submit(panels, prefix, **params)
+        future.result()
+        return path
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_SERVICE: Optional[RenderService] = None
+_SERVICE_LOCK = threading.Lock()
+
+def get_render_service() -> RenderService:
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = RenderService()
+        return _SERVICE
+
+def set_render_service(service: Optional[RenderService]) -> None:
+    global _SERVICE
+    with _SERVICE_LOCK:
+        _SERVICE = service
+
+
+def chart(panels: List[dict], prefix: str = "chart", wait: bool = True, **params) -> dict:
+    """
+    data_plot / backtest_plot 的统一出口：wait=False 时立即返回路径，ready 表示是否已画完；
+    渲染失败时 wait=True 直接抛出，wait=False 记入日志和 RenderService.errors（已失败的返回 error）
+    """
+    path, future = get_render_service().submit(panels, prefix, **params)
+    if wait:
+        future.result()
+    if future.done() and not future.cancelled() and future.exception() is not None:
+        return {"image": path, "ready": False, "error": repr(future.exception())}
+    return {"image": path, "ready": future.done()}
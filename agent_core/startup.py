@@ -0,0 +1,102 @@
+# agent_core/startup.py
+"""
+冷启动报告：在全新的 Python 进程里测量
+
+  - 各模块的 import 耗时（python -X importtime）
+  - 启动时被加载的重量级依赖（应当为空：yfinance / fredapi / matplotlib / openai 都在第一次使用时才加载）
+  - time-to-first-response：从启动进程到第一个工具调用（list_datasets）返回的总耗时
+
+目标值：QUANT_AGENT_COLD_START_TARGET（秒，默认 3.0）。
+
+用法：python -m agent_core.startup [--module server] [--top 20]，超过目标时退出码为 1。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+HEAVY_MODULES = ["yfinance", "fredapi", "matplotlib", "openai", "scipy"]
+
+# 在子进程里执行：import server，然后通过内存 Client 调用一个最轻的工具
+_FIRST_RESPONSE = """
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+from fastmcp import Client
+
+async def main():
+    async with Client({module}.mcp) as client:
+        await client.call_tool("list_datasets", {{}})
+
+asyncio.run(main())
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "call_s": t2 - t1,
+                  "loaded_heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def default_target() -> float:
+    return float(os.getenv("QUANT_AGENT_COLD_START_TARGET") or 3.0)
+
+
+def import_costs(module: str = "server", top: int = 20, cwd: Optional[str] = None) -> List[dict]:
+    """全新进程中 import module 的逐模块耗时，按累计耗时降序（毫秒）"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=cwd)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({"module": name.strip(), "depth": depth,
+                     "self_ms": int(self_us.split(":")[1]) / 1000, "cumulative_ms": int(cum_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def cold_start(module: str = "server", target: Optional[float] = None, cwd: Optional[str] = None) -> dict:
+    """测量 time-to-first-response（含解释器启动），与目标值比较"""
+    target = default_target() if target is None else target
+    code = _FIRST_RESPONSE.format(module=module, heavy=HEAVY_MODULES)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=cwd)
+    total = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"cold start of {module} failed:\n{proc.stderr[-2000:]}")
+    inner = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "first_response_s": round(total, 3),
+        "import_s": round(inner["import_s"], 3),
+        "first_call_s": round(inner["call_s"], 3),
+        "interpreter_s": round(total - inner["import_s"] - inner["call_s"], 3),
+        "loaded_heavy": inner["loaded_heavy"],
+        "target_s": target,
+        "ok": total <= target and not inner["loaded_heavy"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="冷启动与 import 耗时报告")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--target", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in import_costs(args.module, args.top):
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {'  ' * row['depth']}{row['module']}")
+    report = cold_start(args.module, args.target)
+    print(json.dumps(report, indent=1))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
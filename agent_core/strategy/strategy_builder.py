@@ -1,24 +1,145 @@
+import numpy as np
 import pandas as pd
+from typing import Optional, Tuple, Union
+
+# top_k_mask 按行分块处理，每块最多这么多个元素，临时数组大小与股票池无关地有上限
+_BLOCK_CELLS = 1 << 20
+
+
+def top_k_mask(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    每行选出值最大（largest=False 时最小）的 k 个位置，返回同形状的 bool 矩阵。
+    用 np.partition 找到每行第 k 名的值（O(n)，不做整行排序）；NaN 不参与选择。
+    并列规则是确定的：与第 k 名的值相等的位置按列顺序（靠前的优先）补足 k 个，因此每行恰好选出 min(k, 有效个数) 个。
+    """
+    values = np.asarray(values, dtype="float64")
+    n_rows, n_cols = values.shape
+    mask = np.zeros((n_rows, n_cols), dtype=bool)
+    k = min(int(k), n_cols)
+    if k <= 0 or n_rows == 0:
+        return mask
+    step = max(1, _BLOCK_CELLS // max(n_cols, 1))
+    for a in range(0, n_rows, step):
+        block = values[a:a + step]
+        valid = ~np.isnan(block)
+        # 统一成“越小越靠前”，NaN 排到最后
+        key = np.where(valid, -block if largest else block, np.inf)
+        kth = np.partition(key, k - 1, axis=1)[:, k - 1:k]
+        better = (key < kth) & valid
+        tie = (key == kth) & valid
+        need = k - better.sum(axis=1, keepdims=True)
+        mask[a:a + step] = better | (tie & (np.cumsum(tie, axis=1) <= need))
+    return mask
+
+
+class SparseWeights:
+    """
+    稀疏持仓：每个日期只存所选股票的列号与权重（CSR 结构），不物化 date × ticker 的稠密矩阵。
+
+      - indptr[i]:indptr[i+1] 是第 i 个日期在 indices / weights 中的区间
+      - indices: 股票在 columns 中的位置；weights: 对应权重
+    fast_backtest 可以直接使用；需要 DataFrame 时调用 to_dense()。
+    """
+
+    def __init__(self, index, columns, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.index = pd.Index(index)
+        self.columns = pd.Index(columns)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype="float64")
+        if len(self.indptr) != len(self.index) + 1 or len(self.indices) != len(self.weights):
+            raise ValueError("SparseWeights indptr / indices / weights do not match the index")
+
+    # ---------- 构造 ----------
+    @classmethod
+    def from_mask(cls, mask: np.ndarray, index, columns, weights: Optional[np.ndarray] = None) -> "SparseWeights":
+        """由 bool 选股矩阵构造；weights 为同形状的权重矩阵，缺省为 1（即信号）"""
+        rows, cols = np.nonzero(mask)
+        indptr = np.zeros(mask.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=mask.shape[0]), out=indptr[1:])
+        values = np.ones(len(cols)) if weights is None else np.asarray(weights, dtype="float64")[rows, cols]
+        return cls(index, columns, indptr, cols, values)
+
+    @classmethod
+    def from_dense(cls, weight_df: pd.DataFrame) -> "SparseWeights":
+        values = weight_df.fillna(0.0).to_numpy(dtype="float64")
+        return cls.from_mask(values != 0, weight_df.index, weight_df.columns, values)
+
+    def to_dense(self) -> pd.DataFrame:
+        out = np.zeros(self.shape)
+        out[self.rows(), self.indices] = self.weights
+        return pd.DataFrame(out, index=self.index, columns=self.columns)
+
+    # ---------- 基本信息 ----------
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.index), len(self.columns)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __repr__(self) -> str:
+        return f"SparseWeights(dates={len(self.index)}, tickers={len(self.columns)}, nnz={self.nnz})"
+
+    def counts(self) -> np.ndarray:
+        """每个日期的持仓数"""
+        return np.diff(self.indptr)
+
+    def rows(self) -> np.ndarray:
+        """每个非零元素所在的行号"""
+        return np.repeat(np.arange(len(self.index)), self.counts())
+
+    def row(self, i: int) -> pd.Series:
+        """第 i 个日期的持仓：index 为股票代码，值为权重"""
+        a, b = self.indptr[i], self.indptr[i + 1]
+        return pd.Series(self.weights[a:b], index=self.columns[self.indices[a:b]], name=self.index[i])
+
+
+def select_top_n(factor_df: pd.DataFrame, top_n: int = 10, ascending: bool = False) -> SparseWeights:
+    """
+    每个日期选因子值最大（ascending=True 时最小）的 top_n 只，返回权重为 1 的 SparseWeights（即信号）；
+    并列时列顺序靠前的股票优先。配合 equal_weight 得到稀疏的等权组合。
+    """
+    mask = top_k_mask(factor_df.to_numpy(dtype="float64"), top_n, largest=not ascending)
+    return SparseWeights.from_mask(mask, factor_df.index, factor_df.columns)
+
 
 def generate_top_n_signal(factor_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     根据因子值，选出每个日期中前 top_n 的股票，返回 signal DataFrame，1表示持仓，0表示空仓。
     输入：index 为日期，columns 为股票代码的因子值 DataFrame
+    并列时列顺序靠前的股票优先，每个日期恰好选出 min(top_n, 有效因子个数) 只。
     """
-    signal = factor_df.rank(axis=1, ascending=False) <= top_n
-    return signal.astype(int)
+    mask = top_k_mask(factor_df.to_numpy(dtype="float64"), top_n, largest=True)
+    return pd.DataFrame(mask.astype(int), index=factor_df.index, columns=factor_df.columns)
 
 def generate_last_n_signal(factor_df: pd.DataFrame, last_n: int = 10) -> pd.DataFrame:
     """
     根据因子值，选出每个日期中后 last_n 的股票，返回 signal DataFrame，1表示持仓，0表示空仓。
     输入：index 为日期，columns 为股票代码的因子值 DataFrame
+    并列规则同 generate_top_n_signal。
     """
-    signal = factor_df.rank(axis=1, ascending=True) <= last_n
-    return signal.astype(int)
+    mask = top_k_mask(factor_df.to_numpy(dtype="float64"), last_n, largest=False)
+    return pd.DataFrame(mask.astype(int), index=factor_df.index, columns=factor_df.columns)
 
-def equal_weight(signal_df: pd.DataFrame) -> pd.DataFrame:
+def equal_weight(signal_df: Union[pd.DataFrame, SparseWeights]) -> Union[pd.DataFrame, SparseWeights]:
     """
     根据 signal 生成等权重组合，未选中股票权重为0，选中股票均分权重
+    signal 为 SparseWeights 时返回 SparseWeights（只对已选股票计算）
     """
+    if isinstance(signal_df, SparseWeights):
+        rows = signal_df.rows()
+        total = np.bincount(rows, weights=signal_df.weights, minlength=len(signal_df))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.nan_to_num(signal_df.weights / total[rows])
+        return SparseWeights(signal_df.index, signal_df.columns, signal_df.indptr, signal_df.indices, weights)
     weight_df = signal_df.div(signal_df.sum(axis=1), axis=0).fillna(0)
     return weight_df
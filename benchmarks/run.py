@@ -0,0 +1,250 @@
+# benchmarks/run.py
+"""
+基准测试：在合成数据上测因子计算、选股、回测、clean_df 以及 server.py 的 MCP 工具，
+按 (股票数, 年数) 网格记录每个用例的耗时（多次取中位数 / 最小值）和峰值内存（tracemalloc），
+结果写成 JSON，并可与保存的基线比较、标出变慢的用例。
+
+    python -m benchmarks.run                                   # 默认网格 10,500 只 × 1,10 年
+    python -m benchmarks.run --tickers 10,500,5000 --years 1,10,25
+    python -m benchmarks.run --only backtest.equal_weight        # 向量化 vs 逐日循环（股票数 ≤ LOOP_CAP 时）
+    python -m benchmarks.run --tickers 3000 --years 20 --only backtest.equal_weight   # 大面板
+    python -m benchmarks.run --save-baseline                    # 把本次结果存为基线
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.25
+
+基线与机器相关，不入库：在同一台机器上先存基线，改动后再比较。有用例变慢超过 tolerance 时退出码为 1。
+"""
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticMarket, install, tickers as make_tickers
+
+END = "2025-01-01"
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+# 基本面用例的股票数上限（每只股票要取 4 份报表，5000 只时太慢且不代表常见用法）
+FUNDAMENTAL_CAP = 50
+# 逐日循环版 backtest_equal_weight（参考实现在 tests/ 中）的股票数上限：更大的股票池只跑向量化版本
+LOOP_CAP = 500
+# 宏观用例使用的序列
+MACRO_SERIES = ["GDP", "CPIAUCSL", "UNRATE", "FEDFUNDS"]
+
+
+# ============================ #
+#   用例
+# ============================ #
+def _tool(name: str):
+    """MCP 工具（FunctionTool）对应的原始 async 函数"""
+    import server
+    tool = getattr(server, name)
+    return getattr(tool, "fn", tool)
+
+
+def _fresh_registry() -> None:
+    # 每次调用工具前换一个空的数据集登记表，否则相同请求会直接复用上一次登记的结果
+    from agent_core.data.dataset_registry import DatasetRegistry, set_dataset_registry
+    set_dataset_registry(DatasetRegistry())
+
+
+def _run_tool(name: str, **kwargs):
+    _fresh_registry()
+    return asyncio.run(_tool(name)(**kwargs))
+
+
+def build_cases(ctx: dict) -> Dict[str, Callable[[], object]]:
+    """ctx 中是准备好的输入（不计入耗时）：prices / close / factor / weights / tickers / start / end"""
+    from agent_core.backtest.array_backtest import fast_backtest
+    from agent_core.backtest.factor_backtest import (
+        backtest, backtest_equal_weight, forward_returns, ic_decay, quantile_returns,
+    )
+    from agent_core.data.price_data import clean_df
+    from agent_core.factors.factor_registry import get_factor, get_factors
+    from agent_core.factors.tech_factors import calc_momentum, calc_rsi, calc_volatility
+    from agent_core.strategy.strategy_builder import equal_weight, generate_top_n_signal, select_top_n
+
+    prices, close, factor, weights = ctx["prices"], ctx["close"], ctx["factor"], ctx["weights"]
+    tickers, start, end = ctx["tickers"], ctx["start"], ctx["end"]
+    fwd = forward_returns(close, 1)
+    top_n = max(1, min(10, len(tickers) // 5))
+    sparse = equal_weight(select_top_n(factor, top_n=top_n))
+    factor_series = factor.stack(future_stack=True)
+
+    def clean_all():
+        for tk in tickers:
+            clean_df(prices.xs(tk, level="ticker", axis=1))
+
+    cases = {
+        # tech_factors
+        "factors.momentum": lambda: calc_momentum(prices),
+        "factors.volatility": lambda: calc_volatility(prices),
+        "factors.rsi": lambda: calc_rsi(close),
+        "factors.macd": lambda: get_factor("macd", prices),
+        "factors.batch": lambda: get_factors(["momentum", "volatility", "rsi", "macd"], prices),
+        # strategy_builder
+        "strategy.top_n_equal_weight": lambda: equal_weight(generate_top_n_signal(factor, top_n=top_n)),
+        "strategy.select_top_n_sparse": lambda: equal_weight(select_top_n(factor, top_n=top_n)),
+        # factor_backtest / array_backtest
+        "backtest.backtest": lambda: backtest(close, weights),
+        "backtest.fast_backtest": lambda: fast_backtest(prices, weights, rebalance="weekly", cost_bps=5),
+        "backtest.fast_backtest_sparse": lambda: fast_backtest(prices, sparse, rebalance="weekly", cost_bps=5),
+        "backtest.ic_decay": lambda: ic_decay(factor, close),
+        "backtest.quantile_returns": lambda: quantile_returns(factor, fwd),
+        "backtest.equal_weight": lambda: backtest_equal_weight(factor_series, prices),
+        # price_data
+        "data.clean_df": clean_all,
+        # server.py 工具（数据来自合成行情，价格 / 宏观走本地缓存）
+        "server.download_prices": lambda: _run_tool("download_prices", tickers=tickers, start=start, end=end),
+        "server.compute_factor": lambda: _run_tool("compute_factor", factor_name="momentum", stock_universe=tickers,
+                                                   start_date=start, end_date=end),
+        "server.analyze_factor_ic": lambda: _run_tool("analyze_factor_ic", factor_name="momentum",
+                                                      stock_universe=tickers, start_date=start, end_date=end),
+        "server.run_backtest_with_factor": lambda: _run_tool("run_backtest_with_factor", factor_name="momentum",
+                                                             stock_universe=tickers, start_date=start, end_date=end,
+                                                             top_n=top_n),
+        "server.fundamental_data": lambda: _run_tool("fundamental_data", tickers=tickers[:FUNDAMENTAL_CAP]),
+        "server.macro_data": lambda: _run_tool("macro_data", indicators=MACRO_SERIES, start=start, end=end),
+    }
+    if len(tickers) <= LOOP_CAP:
+        # 与向量化版本对比的逐日循环（tests/test_factor_backtest.py 中的参考实现）
+        from tests.test_factor_backtest import backtest_equal_weight_loop
+        cases["backtest.equal_weight_loop"] = lambda: backtest_equal_weight_loop(factor_series, prices)
+    return cases
+
+
+def prepare(market: SyntheticMarket, n_tickers: int, years: int) -> dict:
+    from agent_core.factors.tech_factors import calc_momentum
+    from agent_core.strategy.strategy_builder import equal_weight, generate_top_n_signal
+
+    end = pd.Timestamp(END)
+    start = (end - pd.DateOffset(years=years)).strftime("%Y-%m-%d")
+    tickers = make_tickers(n_tickers)
+    prices = market.prices(tickers, start, END)
+    factor = calc_momentum(prices)
+    weights = equal_weight(generate_top_n_signal(factor, top_n=max(1, min(10, n_tickers // 5))))
+    return {"prices": prices, "close": prices["close"], "factor": factor, "weights": weights,
+            "tickers": tickers, "start": start, "end": END}
+
+
+# ============================ #
+#   计时与内存
+# ============================ #
+def measure(fn: Callable[[], object], repeat: int = 3) -> dict:
+    """先在 tracemalloc 下跑一次得到峰值内存（同时充当预热），再跑 repeat 次计时"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"median_s": round(statistics.median(times), 6), "min_s": round(min(times), 6),
+            "peak_mb": round(peak / 2 ** 20, 3)}
+
+
+def run(tickers: List[int], years: List[int], repeat: int = 3, seed: int = 42, only: Optional[List[str]] = None,
+        log=print) -> dict:
+    from agent_core import executors
+
+    market = SyntheticMarket(seed=seed, end=END)
+    install(market)
+    # 计算放在当前进程的线程池里，tracemalloc 才能看到它的内存
+    executors.configure(cpu_workers=0)
+
+    results = {}
+    for n in tickers:
+        for y in years:
+            scale = f"{n}x{y}y"
+            ctx = prepare(market, n, y)
+            for name, fn in build_cases(ctx).items():
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                results[f"{scale}/{name}"] = entry = {"tickers": n, "years": y, "case": name, **measure(fn, repeat)}
+                log(f"{scale:>10}  {name:<34} {entry['median_s']:>10.4f}s  {entry['peak_mb']:>9.1f} MB")
+            del ctx
+            gc.collect()
+    return {"meta": environment(seed, repeat), "results": results}
+
+
+def environment(seed: int, repeat: int) -> dict:
+    return {
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "platform": platform.platform(), "machine": platform.machine(), "seed": seed, "repeat": repeat,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# ============================ #
+#   与基线比较
+# ============================ #
+def compare(current: dict, baseline: dict, tolerance: float = 0.25, min_seconds: float = 0.005) -> List[dict]:
+    """
+    返回变慢的用例：median 比基线慢超过 tolerance（比例），且差值超过 min_seconds（过滤极短用例的噪声）；
+    峰值内存按同样比例检查。只比较两边都有的用例。
+    """
+    regressions = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for metric, floor in (("median_s", min_seconds), ("peak_mb", 1.0)):
+            old, new = base[metric], cur[metric]
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({"case": key, "metric": metric, "baseline": old, "current": new,
+                                    "ratio": round(new / old, 3) if old else None})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="QuantAgent benchmarks on synthetic market data")
+    parser.add_argument("--tickers", default="10,500", help="comma-separated universe sizes, e.g. 10,500,5000")
+    parser.add_argument("--years", default="1,10", help="comma-separated history lengths in years, e.g. 1,10,25")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default=None, help="comma-separated case prefixes, e.g. factors,server.compute")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio before flagging")
+    args = parser.parse_args(argv)
+
+    parse = lambda raw: [int(v) for v in raw.split(",") if v]
+    report = run(parse(args.tickers), parse(args.years), repeat=args.repeat, seed=args.seed,
+                 only=args.only.split(",") if args.only else None)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"baseline saved to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(report, json.loads(baseline_path.read_text()), args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']} -> {r['current']} (x{r['ratio']})")
+    print(f"{len(regressions)} regression(s) against {baseline_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# benchmarks/synthetic.py
+"""
+带种子的合成行情 / 基本面 / 宏观数据，替代 yfinance 与 FRED，让基准测试不联网、可复现。
+
+每只 ticker 的随机数由 (seed, ticker) 决定：同一只股票在任何子集、任何日期区间里的数据都一致，
+和 PriceCache 的分段补齐逻辑兼容。
+"""
+import tempfile
+import zlib
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+# 全历史的起点：所有序列从这里开始生成，再按请求区间截取（覆盖 25 年的测试区间）
+EPOCH = pd.Timestamp("1995-01-01")
+
+
+def tickers(n: int) -> List[str]:
+    return [f"S{i:04d}" for i in range(n)]
+
+
+class SyntheticMarket:
+    def __init__(self, seed: int = 42, end: str = "2025-01-01"):
+        self.seed = seed
+        self.dates = pd.bdate_range(EPOCH, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+
+    def _rng(self, key: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(key.encode())])
+
+    def _path(self, ticker: str) -> np.ndarray:
+        """(日期, 5 个字段) 的完整历史；每次重新生成，5000 只股票时不必常驻内存"""
+        rng = self._rng(ticker)
+        n = len(self.dates)
+        vol = rng.uniform(0.01, 0.03)
+        drift = rng.normal(0.0002, 0.0003)
+        close = rng.uniform(20, 200) * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+        open_ = close * np.exp(rng.normal(0, vol / 3, n))
+        spread = np.abs(rng.normal(0, vol / 2, n))
+        high = np.maximum(open_, close) * (1 + spread)
+        low = np.minimum(open_, close) * (1 - spread)
+        volume = np.round(rng.lognormal(13, 0.5, n))
+        return np.column_stack([open_, high, low, close, volume])
+
+    # ---------- 行情：与 price_data.download_price_data 相同的格式 ----------
+    def prices(self, tickers: List[str], start: str, end: str) -> pd.DataFrame:
+        """columns = MultiIndex[field, ticker]，日期区间 [start, end)"""
+        lo = self.dates.searchsorted(pd.Timestamp(start))
+        hi = self.dates.searchsorted(pd.Timestamp(end))
+        tickers = list(tickers)
+        block = np.stack([self._path(tk)[lo:hi] for tk in tickers], axis=2)  # 日期 × 字段 × ticker
+        values = block.reshape(hi - lo, len(FIELDS) * len(tickers))
+        cols = pd.MultiIndex.from_product([FIELDS, tickers], names=["field", "ticker"])
+        return pd.DataFrame(values, index=self.dates[lo:hi], columns=cols)
+
+    # ---------- 基本面：模仿 yf.Ticker 的属性 ----------
+    def statement(self, ticker: str, kind: str, n_periods: int = 4) -> pd.DataFrame:
+        rng = self._rng(f"{ticker}:{kind}")
+        rows = {
+            "income": ["Total Revenue", "Gross Profit", "Operating Income", "Net Income", "EBITDA", "Basic EPS"],
+            "balance": ["Total Assets", "Total Liabilities Net Minority Interest", "Stockholders Equity",
+                        "Cash And Cash Equivalents", "Total Debt", "Working Capital"],
+            "cashflow": ["Operating Cash Flow", "Capital Expenditure", "Free Cash Flow", "Repurchase Of Capital Stock",
+                         "Cash Dividends Paid", "Changes In Cash"],
+        }[kind]
+        periods = pd.DatetimeIndex([pd.Timestamp(f"{2024 - i}-12-31") for i in range(n_periods)])
+        data = rng.lognormal(21, 1.0, (len(rows), n_periods))
+        return pd.DataFrame(data, index=rows, columns=periods)
+
+    def info(self, ticker: str) -> dict:
+        rng = self._rng(f"{ticker}:info")
+        return {
+            "trailingPE": float(rng.uniform(5, 60)), "forwardPE": float(rng.uniform(5, 50)),
+            "priceToBook": float(rng.uniform(0.5, 15)), "dividendYield": float(rng.uniform(0, 0.05)),
+            "marketCap": float(rng.lognormal(24, 1.5)), "beta": float(rng.uniform(0.3, 2.0)),
+        }
+
+    def ticker(self, ticker: str):
+        return SimpleNamespace(
+            financials=self.statement(ticker, "income"),
+            balance_sheet=self.statement(ticker, "balance"),
+            cashflow=self.statement(ticker, "cashflow"),
+            info=self.info(ticker),
+        )
+
+    # ---------- 宏观：模仿 fredapi.Fred.get_series ----------
+    def get_series(self, series_id: str, observation_start: Optional[str] = None,
+                   observation_end: Optional[str] = None) -> pd.Series:
+        freq = "QS" if series_id == "GDP" else "MS"
+        idx = pd.date_range(EPOCH, self.dates[-1], freq=freq)
+        rng = self._rng(f"fred:{series_id}")
+        s = pd.Series(100 * np.exp(np.cumsum(rng.normal(0.002, 0.01, len(idx)))), index=idx)
+        return s.loc[observation_start:observation_end]
+
+
+def install(market: SyntheticMarket, root: Optional[str] = None) -> str:
+    """
+    把数据层的默认后端换成合成数据：价格缓存、yf.Ticker、FRED 客户端、宏观库都指向 market，
+    本地缓存放在临时目录（或 root）；限速器放开、因子缓存关闭，保证测到的是本仓库代码的耗时。返回缓存目录。
+    """
+    from agent_core.data import fundamental_data, macro_data, price_data
+    from agent_core.data.macro_store import MacroStore
+    from agent_core.data.price_cache import PriceCache
+    from agent_core.data.rate_limit import RateLimiter, set_limiter
+    from agent_core.factors.factor_cache import set_factor_cache
+
+    root = root or tempfile.mkdtemp(prefix="quant_bench_")
+    price_data.set_price_cache(PriceCache(f"{root}/prices", market.prices))
+    fundamental_data.set_fundamental_store(None)
+    fundamental_data.yf = SimpleNamespace(Ticker=market.ticker)
+    macro_data.set_fred(market)
+    macro_data.set_macro_store(MacroStore(f"{root}/macro"))
+    for provider in ("yahoo", "fred"):
+        set_limiter(provider, RateLimiter(provider, rate=1e6))
+    set_factor_cache(None)
+    return root
@@ -1,88 +1,93 @@
-from openai_agent.functions import *
-from openai import OpenAI
+from openai_agent.functions import function_schemas
+from openai_agent.conversation import Conversation, ToolRunner, run_turn, to_tools
 import os, json, uuid, datetime as dt
 
-from agent_core.data.price_data import *
-from agent_core.data.fundamental_data import *
-from agent_core.data.macro_data import *
-from agent_core.plot.data_plot import *
+from agent_core.config import load_env
+from agent_core.data.price_data import get_res_price_data
+from agent_core.data.fundamental_data import get_fundamental_data
+from agent_core.data.macro_data import get_macro_dataset
+from agent_core.plot.data_plot import plot_res_line_chart
+from agent_core.data.dataset_registry import get_dataset_registry
+from agent_core.encoding import encode, page
+
+# 表格结果登记在本地，只把预算内的摘要 + handle 发给模型；需要原始行时模型调用 page_dataset
+def encode_result(res, kind: str) -> str:
+    return json.dumps(encode(res, handle=get_dataset_registry().put(res, kind=kind)), ensure_ascii=False)
 
 memory = {"strategy": {k: None for k in
            ("indicator","buy_rule","sell_rule","ticker","start","end")}}
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI 客户端在第一次调用时才创建，提示符可以先出来
+_client = None
 
-def gpt(msgs: list) -> str:
-    return client.chat.completions.create(
-        model="gpt-4o",
-        messages=msgs,
-        functions=function_schemas,
-        function_call="auto"
-    ).choices[0].message
+def get_client():
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        load_env()
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
-msgs=[{
-    "role":"system",
-    "content":
+SYSTEM_PROMPT = (
     "You are a quant trading assistant good at factor investment. "
     "You can use your knowledge and ai agent to deal with tasks in factor investment, such as test a factor and try to find factors."
     "You know that we regard the factor as a stochatic processe."
-    }]
-print("===AI AGENT===: Hi！I'm an agent good at factor investment. How can I help you？Maybe I can show you what is factor investment?（exit for end chat）\n")
-
-while True:
-    user_input=input("User: "); 
-    if user_input.lower() in {"exit","quit"}: break
-    msgs.append({"role":"user","content":user_input})
-
-    assistant=gpt(msgs); msgs.append(assistant)
-
-    while assistant.function_call:
-        function_name=assistant.function_call.name
-        args=json.loads(assistant.function_call.arguments or "{}")
-
-        if function_name=="update_strategy_params":
-            memory["strategy"].update({k:v for k,v in args.items() if v})
-            miss=[k for k,v in memory["strategy"].items() if v is None]
-            msgs.append({"role":"function","name":function_name,
-                        "content":"params ok" if not miss else f"still need {miss}"})
-
-        # =====Data Module=====    
-        elif function_name == "get_res_price_data":
-            res = get_res_price_data(**args)
-            msgs.append({"role": "function", "name": function_name, "content": res.to_json()})
-
-        elif function_name == "get_cleaned_price_data":
-            res = get_res_price_data(**args)
-            cleaned_data = clean_df(res)
-            msgs.append({"role": "function", "name": function_name, "content": cleaned_data.to_json()})
-
-        elif function_name == "get_fundamental_data":
-            res = get_fundamental_data(**args)
-            msgs.append({"role": "function", "name": function_name, "content": res.to_json()})
-
-        # elif function_name == "get_macro_data":
-        #     res = get_macro_data(**args)
-        #     msgs.append({"role": "function", "name": function_name, "content": res.to_json()})
-
-        # =====Plot Module=====
-        elif function_name == "plot_line_chart":
-            res = plot_res_line_chart(**args)
-            msgs.append({"role": "function", "name": function_name, "content": json.dumps(res)})
-
-        # elif function_name == "plot_correlation_chart":
-        #     res = plot_correlation_chart(**args)
-        #     msgs.append({"role": "function", "name": function_name, "content": json.dumps(res)})
-
-        # elif function_name=="run_backtest":
-        #     res=run_backtest(memory["strategy"])
-        #     if "error" in res:
-        #         msgs.append({"role":"function","name":function_name,"content":res["error"]})
-        #     else:
-        #         # ① 把摘要给 GPT 生成自然语言
-        #         msgs.append({"role":"function","name":function_name,"content":res["summary"]})
-        #         print(f"图表已保存为 {res['image']}")   # ② 本地提示图路径
-
-        assistant=gpt(msgs); msgs.append(assistant)
-
-    print("===AI AGENT===: ", assistant.content,"\n")
-
+)
+
+# ============================ #
+#   工具实现：name → handler(**args) -> str
+# ============================ #
+def update_strategy_params(**args) -> str:
+    memory["strategy"].update({k: v for k, v in args.items() if v})
+    miss = [k for k, v in memory["strategy"].items() if v is None]
+    return "params ok" if not miss else f"still need {miss}"
+
+# =====Data Module=====
+def _price_data(**args) -> str:
+    return encode_result(get_res_price_data(**args), "prices")
+
+def _fundamental_data(**args) -> str:
+    return encode_result(get_fundamental_data(**args), "fundamentals")
+
+def _macro_data(indicators, start: str = "2000-01-01", end: str = None) -> str:
+    return encode_result(get_macro_dataset(indicators, start, end), "macro")
+
+def _page_dataset(handle: str, **args) -> str:
+    return json.dumps(page(get_dataset_registry().get(handle), handle=handle, **args), ensure_ascii=False)
+
+# =====Plot Module=====
+def _plot_line_chart(**args) -> str:
+    # 后台渲染，路径先返回给模型
+    return json.dumps(plot_res_line_chart(**args, wait=False))
+
+HANDLERS = {
+    "update_strategy_params": update_strategy_params,
+    "get_res_price_data": _price_data,
+    "get_fundamental_data": _fundamental_data,
+    "macro_data": _macro_data,
+    "page_dataset": _page_dataset,
+    "plot_line_chart": _plot_line_chart,
+    "plot_res_line_chart": _plot_line_chart,
+}
+
+
+def main(client=None):
+    client = client or get_client()
+    conversation = Conversation(SYSTEM_PROMPT)
+    runner = ToolRunner(HANDLERS)
+    tools = to_tools(function_schemas)
+    print("===AI AGENT===: Hi！I'm an agent good at factor investment. How can I help you？Maybe I can show you what is factor investment?（exit for end chat）\n")
+
+    while True:
+        user_input = input("User: ")
+        if user_input.lower() in {"exit", "quit"}:
+            break
+        reply, metrics = run_turn(client, conversation, user_input, runner, tools)
+        print("===AI AGENT===: ", reply, "\n")
+        print(f"[turn] prompt≈{metrics['prompt_tokens']} tokens (max {metrics['max_prompt_tokens']}), "
+              f"{metrics['model_calls']} model calls, {metrics['tool_calls']} tool calls "
+              f"({metrics['tool_s']}s), {metrics['wall_s']}s total\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# openai_agent/conversation.py
+"""
+chat.py 的对话管理：
+
+  - Conversation：消息历史保持在 token 预算内（QUANT_AGENT_CONTEXT_BUDGET，默认 12000）。
+    超预算时先把较早轮次的工具输出压缩成引用（保留数据集 handle，可再用 page_dataset 取回），
+    仍超预算再整轮淘汰最早的对话；system 消息和最近 keep_turns 轮始终保留
+  - ToolRunner：一次 assistant 回复里的多个 tool_calls 在线程池中并发执行
+  - run_turn：一轮用户输入 → （模型 → 并发工具）* → 最终回复，返回每轮的 prompt 大小、耗时等指标
+  - StubChatClient：本地模拟 chat.completions 接口，不联网测试以上流程
+"""
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_core.encoding import estimate_tokens
+
+
+def default_context_budget() -> int:
+    return int(os.getenv("QUANT_AGENT_CONTEXT_BUDGET") or 12000)
+
+
+def to_tools(function_schemas: List[dict]) -> List[dict]:
+    """旧的 functions 定义 → tools 参数"""
+    return [{"type": "function", "function": schema} for schema in function_schemas]
+
+
+def message_to_dict(message) -> dict:
+    """SDK 返回的 assistant 消息（或 StubChatClient 的消息）→ 可以放回 messages 的 dict"""
+    out = {"role": "assistant", "content": getattr(message, "content", None)}
+    tool_calls = getattr(message, "tool_calls", None) or []
+    if tool_calls:
+        out["tool_calls"] = [
+            {"id": tc.id, "type": "function", "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+            for tc in tool_calls
+        ]
+    return out
+
+
+# ============================ #
+#   对话历史
+# ============================ #
+class Conversation:
+    def __init__(self, system: str, budget: Optional[int] = None, keep_turns: int = 2):
+        self.budget = default_context_budget() if budget is None else budget
+        self.keep_turns = keep_turns
+        self.system = {"role": "system", "content": system}
+        # 每一轮是一串消息：user → assistant(tool_calls) → tool ... → assistant
+        self.turns: List[List[dict]] = []
+        self.stats = {"compacted": 0, "evicted_turns": 0}
+
+    def add_user(self, content: str) -> None:
+        self.turns.append([{"role": "user", "content": content}])
+
+    def add(self, message: dict) -> None:
+        self.turns[-1].append(message)
+
+    def add_tool_result(self, tool_call_id: str, name: str, content: str) -> None:
+        self.turns[-1].append({"role": "tool", "tool_call_id": tool_call_id, "name": name, "content": content})
+
+    @property
+    def messages(self) -> List[dict]:
+        return [self.system] + [m for turn in self.turns for m in turn]
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.messages)
+
+    @staticmethod
+    def _compact(message: dict) -> bool:
+        """把一条工具输出换成引用；返回是否有变化"""
+        content = message["content"]
+        if content.startswith('{"compacted"'):
+            return False
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        ref: Dict[str, Any] = {"compacted": True}
+        if isinstance(data, dict) and data.get("handle"):
+            ref["handle"] = data["handle"]
+            if "shape" in data:
+                ref["shape"] = data["shape"]
+            ref["note"] = "earlier result; read it again with page_dataset"
+        else:
+            ref["preview"] = content[:200]
+        message["content"] = json.dumps(ref, ensure_ascii=False)
+        return True
+
+    def fit(self) -> int:
+        """压缩 / 淘汰旧消息直到不超过预算，返回当前 token 数"""
+        tokens = self.tokens()
+        old = self.turns[:-self.keep_turns] if self.keep_turns else self.turns
+        for turn in old:
+            if tokens <= self.budget:
+                return tokens
+            for message in turn:
+                if message["role"] == "tool" and self._compact(message):
+                    self.stats["compacted"] += 1
+            tokens = self.tokens()
+        while tokens > self.budget and len(self.turns) > max(self.keep_turns, 1):
+            self.turns.pop(0)
+            self.stats["evicted_turns"] += 1
+            tokens = self.tokens()
+        # 只剩最近几轮仍超预算：压缩其中除当前轮以外的工具输出
+        if tokens > self.budget:
+            for turn in self.turns[:-1]:
+                for message in turn:
+                    if message["role"] == "tool" and self._compact(message):
+                        self.stats["compacted"] += 1
+            tokens = self.tokens()
+        return tokens
+
+
+# ============================ #
+#   并发执行工具
+# ============================ #
+class ToolRunner:
+    """name → handler(**args) -> str；同一条 assistant 消息里的多个 tool_calls 并发执行，结果按原顺序返回"""
+
+    def __init__(self, handlers: Dict[str, Callable[..., str]], max_workers: int = 8):
+        self.handlers = handlers
+        self.max_workers = max_workers
+
+    def _call(self, name: str, arguments: str) -> str:
+        handler = self.handlers.get(name)
+        if handler is None:
+            return json.dumps({"error": f"unknown function {name}"})
+        try:
+            args = json.loads(arguments or "{}")
+            return handler(**args)
+        except Exception as e:
+            return json.dumps({"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+
+    def run(self, tool_calls) -> List[str]:
+        calls = [(tc.function.name, tc.function.arguments) for tc in tool_calls]
+        if len(calls) <= 1:
+            return [self._call(*c) for c in calls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as pool:
+            return list(pool.map(lambda c: self._call(*c), calls))
+
+
+def run_turn(client, conversation: Conversation, user_input: str, runner: ToolRunner, tools: List[dict],
+             model: str = "gpt-4o", max_rounds: int = 8):
+    """
+    执行一轮对话，返回 (最终回复, 指标)。
+    指标：prompt_tokens（最后一次请求的估计值）/ max_prompt_tokens / model_calls / tool_calls / tool_s / wall_s
+    """
+    t0 = time.perf_counter()
+    metrics = {"prompt_tokens": 0, "max_prompt_tokens": 0, "model_calls": 0, "tool_calls": 0, "tool_s": 0.0}
+    conversation.add_user(user_input)
+    message = None
+    for _ in range(max_rounds):
+        tokens = conversation.fit()
+        metrics["prompt_tokens"] = tokens
+        metrics["max_prompt_tokens"] = max(metrics["max_prompt_tokens"], tokens)
+        metrics["model_calls"] += 1
+        message = client.chat.completions.create(
+            model=model, messages=conversation.messages, tools=tools, tool_choice="auto",
+        ).choices[0].message
+        conversation.add(message_to_dict(message))
+        tool_calls = getattr(message, "tool_calls", None) or []
+        if not tool_calls:
+            break
+        t1 = time.perf_counter()
+        results = runner.run(tool_calls)
+        metrics["tool_s"] += time.perf_counter() - t1
+        metrics["tool_calls"] += len(tool_calls)
+        for tc, content in zip(tool_calls, results):
+            conversation.add_tool_result(tc.id, tc.function.name, content)
+    metrics["tool_s"] = round(metrics["tool_s"], 3)
+    metrics["wall_s"] = round(time.perf_counter() - t0, 3)
+    metrics.update(conversation.stats)
+    return getattr(message, "content", None), metrics
+
+
+# ============================ #
+#   本地模拟的 chat.completions
+# ============================ #
+class StubChatClient:
+    """
+    client.chat.completions.create(...) 的本地替身。
+    responder(messages, tools) 返回 {"content": str} 或 {"tool_calls": [{"name": ..., "arguments": {...}}, ...]}；
+    每次请求的 messages 记在 self.requests 里，便于检查 prompt 大小。
+    """
+
+    def __init__(self, responder: Callable[[List[dict], List[dict]], dict]):
+        self.responder = responder
+        self.requests: List[List[dict]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[dict], tools: Optional[List[dict]] = None, **kwargs):
+        self.requests.append([dict(m) for m in messages])
+        reply = self.responder(messages, tools or [])
+        tool_calls = [
+            SimpleNamespace(id=f"call_{uuid.uuid4().hex[:8]}", type="function",
+                            function=SimpleNamespace(name=tc["name"], arguments=json.dumps(tc.get("arguments", {}))))
+            for tc in reply.get("tool_calls", [])
+        ]
+        message = SimpleNamespace(role="assistant", content=reply.get("content"), tool_calls=tool_calls or None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
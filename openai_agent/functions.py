@@ -49,6 +49,24 @@ function_schemas = [
             "required": ["indicator", "start", "end"]
         }
     },
+    {
+        "name": "page_dataset",
+        "description": "Read the full rows of a dataset whose result was summarized (truncated). Use the handle from that result and continue with next_offset.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "handle": {"type": "string", "description": "Dataset handle, e.g., 'prices_1a2b3c4d'"},
+                "offset": {"type": "integer", "description": "First row to return (default 0)"},
+                "limit": {"type": "integer", "description": "Number of rows; omit to fit the token budget"},
+                "columns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Optional columns, e.g., ['close'] or ['close/AAPL']"
+                }
+            },
+            "required": ["handle"]
+        }
+    },
     {
         "name": "plot_res_line_chart",
         "description": "Plot a stock price line chart using supplied OHLCV data.",
@@ -60,7 +78,7 @@ function_schemas = [
                 "end":    {"type": "string"},
                 "df": {
                     "type": "array",
-                    "description": "List of rows with 'date' and 'close' for plotting.",
+                    "description": "Optional list of rows with 'date' and 'close'; omit to fetch prices for ticker / start / end.",
                     "items": {
                         "type": "object",
                         "properties": {
@@ -71,7 +89,7 @@ function_schemas = [
                     }
                 }
             },
-            "required": ["ticker", "start", "end", "df"]
+            "required": ["ticker", "start", "end"]
         }
     },
     {
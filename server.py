@@ -2,89 +2,376 @@ from typing import Optional, Dict, Any
 from fastmcp import FastMCP
 import pandas as pd
 
-from agent_core.data.price_data import *
-from agent_core.data.fundamental_data import *
-from agent_core.data.macro_data import *
+from agent_core.config import load_env
+from agent_core.data.price_data import get_price_batcher, get_price_cache, get_res_price_data
+from agent_core.data.fundamental_data import (
+    get_balance_sheet, get_cashflow_statement, get_fundamental_data, get_income_statement, get_valuation_metrics,
+)
+from agent_core.data.macro_data import get_macro_dataset, get_macro_store
 
-from agent_core.factors.tech_factors import *
-from agent_core.factors.fundamental_factors import *
+from agent_core.backtest.param_sweep import run_param_sweep
+from agent_core.backtest.chunked_pipeline import run_chunked_backtest
 
-from agent_core.strategy.strategy_builder import *
-from agent_core.backtest.factor_backtest import *
-
-from agent_core.factors.factor_registry import *
+from agent_core.factors.factor_registry import assemble_factors, lookup_factors, resolve_requests, store_factors
+from agent_core.data.dataset_registry import get_dataset_registry
+from agent_core.data.singleflight import SingleFlight
+from agent_core.executors import run_cpu, run_io, with_timeout
+from agent_core.encoding import encode, page
+from agent_core import jobs, metrics
+from agent_core.executors import executor_stats
+from agent_core.data.singleflight import singleflight_stats
+from agent_core.data.rate_limit import limiter_stats
+from agent_core.factors.factor_cache import get_factor_cache
+from agent_core.backtest.array_backtest import to_close
+from agent_core.factors.factor_engine import signal_label
 
 
 mcp = FastMCP("quant-agent")
 
+# ===== Dataset Handles =====
+# 数据类工具把结果登记在服务端，只返回 handle + 摘要；因子 / 信号 / 回测工具用 handle 取数，不再重复下载
+_REGISTER_FLIGHT = SingleFlight("register_prices")
+
+def _register_prices(tickers: list, start: str, end: str) -> str:
+    registry = get_dataset_registry()
+    key = ("prices", tuple(tickers), start, end)
+
+    def register():
+        handle = registry.lookup(key)
+        if handle is None:
+            with metrics.stage("fetch"):
+                df = get_res_price_data(list(tickers), start, end)
+            handle = registry.put(df, kind="prices", key=key, meta={"start": start, "end": end})
+        return handle
+    # 并发的相同请求只登记一份数据集
+    return _REGISTER_FLIGHT.do(key, register)
+
+
+async def _load_prices(stock_universe: Optional[list], start_date: Optional[str], end_date: Optional[str],
+                       prices: Optional[str] = None):
+    """prices handle 优先；否则按 ticker + 日期区间下载（相同请求复用已登记的数据集）"""
+    if prices:
+        return get_dataset_registry().get(prices)
+    if not (stock_universe and start_date and end_date):
+        raise ValueError("Provide either a prices handle or stock_universe + start_date + end_date")
+    return get_dataset_registry().get(await run_io(_register_prices, stock_universe, start_date, end_date))
+
+
+async def _factor_panel(requests: list, price_df) -> pd.DataFrame:
+    """
+    因子缓存只在主进程查询和写入（键含 panel_fingerprint）：命中的直接复用，
+    未命中的请求连同收盘价矩阵一起送进进程池计算，算完再写回缓存
+    """
+    resolved = resolve_requests(requests)
+    found, missing, fingerprint = lookup_factors(resolved, price_df)
+    if missing:
+        with metrics.stage("factor"):
+            panel = await run_cpu(jobs.factors_job, missing, to_close(price_df))
+        found.update(store_factors(missing, panel, fingerprint))
+    return assemble_factors(resolved, found)
+
+
+async def _factor(factor_name: str, price_df) -> pd.DataFrame:
+    """单个因子（多输出因子取选股用的那条线），同 get_factor"""
+    panel = await _factor_panel([factor_name], price_df)
+    return panel[signal_label(resolve_requests([factor_name])[0])]
+
+
+@mcp.tool()
+@with_timeout
+async def list_datasets() -> list:
+    """列出当前会话中登记的数据集（handle、类型、大小）"""
+    return get_dataset_registry().list()
+
+
+@mcp.tool()
+@with_timeout
+async def describe_dataset(handle: str) -> dict:
+    """查看数据集的形状、字段 / ticker、日期范围和最近一期的截面统计"""
+    return get_dataset_registry().describe(handle)
+
+
+@mcp.tool()
+@with_timeout
+async def page_dataset(handle: str, offset: int = 0, limit: Optional[int] = None,
+                       columns: Optional[list[str]] = None) -> dict:
+    """
+    分页读取数据集的完整行：结果被摘要截断（truncated）时用它取原始数据。
+    columns 可选，如 ["close"] 或 ["close/AAPL"]；limit 为空时按 token 预算自动决定行数，继续读取用返回的 next_offset。
+    """
+    return page(get_dataset_registry().get(handle), offset, limit, columns, handle=handle)
+
+
+def _encode(obj, kind: str, meta: Optional[dict] = None) -> dict:
+    """在 token 预算内编码结果；放不下时登记为数据集，附带可分页的 handle"""
+    encoded = encode(obj)
+    if encoded.get("truncated"):
+        encoded = encode(obj, handle=get_dataset_registry().put(obj, kind=kind, meta=meta))
+    return encoded
+
+
 # ===== Data Module =====
 @mcp.tool()
-def download_prices(tickers: list[str], start: str, end: str):
-    """下载价格数据（支持多支资产）"""
-    df = get_res_price_data(tickers, start, end)
-    return df.tail().to_dict()
+@with_timeout
+async def download_prices(tickers: list[str], start: str, end: str):
+    """下载价格数据（支持多支资产），返回数据集 handle、摘要和最新收盘价；handle 可传给因子 / 回测工具的 prices 参数"""
+    handle = await run_io(_register_prices, tickers, start, end)
+    df = get_dataset_registry().get(handle)
+    return {**get_dataset_registry().describe(handle), "last_close": _encode(df["close"].iloc[-1].rename("close"), "last_close")}
 
 
 @mcp.tool()
-def income_statement(ticker: str, period: str = "latest") -> dict:
-    """Get income statement for a stock ticker. Period must be 'latest' or a string like '2023-12-31'."""
-    df = get_income_statement(ticker, period)
-    return df.to_dict()
+@with_timeout
+async def income_statement(ticker: str, period: str = "latest", as_of: Optional[str] = None) -> dict:
+    """Get income statement for a stock ticker. Period must be 'latest' or a string like '2023-12-31'.
+    as_of (e.g. '2024-03-31') answers from local snapshots only: what was known on that date."""
+    df = await run_io(get_income_statement, ticker, period, as_of=as_of)
+    return _encode(df, "income")
 
 
 @mcp.tool()
-def balance_sheet(ticker: str, period: str = "latest"):
-    """Get the balance sheet for a stock ticker and a specific period."""
-    df = get_balance_sheet(ticker, period)
-    return df.tail().to_dict()
+@with_timeout
+async def balance_sheet(ticker: str, period: str = "latest", as_of: Optional[str] = None):
+    """Get the balance sheet for a stock ticker and a specific period (optionally as known on date as_of)."""
+    df = await run_io(get_balance_sheet, ticker, period, as_of=as_of)
+    return _encode(df, "balance")
 
 @mcp.tool()
-def cashflow_statement(ticker: str, period: str = "latest"):
-    """Get the cashflow statement for a stock ticker and a specific period."""
-    df = get_cashflow_statement(ticker, period)
-    return df.tail().to_dict()
+@with_timeout
+async def cashflow_statement(ticker: str, period: str = "latest", as_of: Optional[str] = None):
+    """Get the cashflow statement for a stock ticker and a specific period (optionally as known on date as_of)."""
+    df = await run_io(get_cashflow_statement, ticker, period, as_of=as_of)
+    return _encode(df, "cashflow")
 
 @mcp.tool()
-def valuation_metrics(ticker: str):
-    """Get valuation metrics (e.g., PE ratio, market cap) for a stock."""
-    df = get_valuation_metrics(ticker)
-    return df.tail().to_dict()
+@with_timeout
+async def valuation_metrics(ticker: str, as_of: Optional[str] = None):
+    """Get valuation metrics (e.g., PE ratio, market cap) for a stock (optionally as known on date as_of)."""
+    df = await run_io(get_valuation_metrics, ticker, as_of=as_of)
+    return _encode(df, "valuation")
 
 @mcp.tool()
-def fundamental_data(
+@with_timeout
+async def fundamental_data(
     tickers: list[str],
     period: str = "latest",
-    include: list[str] = ["income", "balance", "cashflow", "valuation"]
+    include: list[str] = ["income", "balance", "cashflow", "valuation"],
+    max_workers: int = 8,
+    as_of: Optional[str] = None,
 ):
-    """Get fundamental data (income, balance, cashflow, valuation) for one or more tickers."""
-    df = get_fundamental_data(tickers, period, include)
-    return df.tail().to_dict()
+    """Get fundamental data (income, balance, cashflow, valuation) for one or more tickers, fetched concurrently.
+    as_of (e.g. '2024-03-31') answers from local snapshots only: what was known on that date."""
+    df = await run_io(get_fundamental_data, tickers, period, include, max_workers=max_workers, as_of=as_of)
+    handle = get_dataset_registry().put(df, kind="fundamentals", meta={"period": period, "as_of": as_of})
+    return encode(df, handle=handle)
 
 @mcp.tool()
-def macro_data(indicators: list[str], start: str = "2000-01-01", end: str = None):
+@with_timeout
+async def macro_data(indicators: list[str], start: str = "2000-01-01", end: str = None, freq: Optional[str] = None):
     """
-    获取指定宏观经济指标数据（如GDP、CPI等）。
+    获取指定宏观经济指标数据（如GDP、CPI等），各序列前向填充对齐；freq（如 "B" / "ME"）可指定统一频率。
     """
-    df = get_macro_dataset(indicators, start, end)
-    return df.tail().to_dict()
+    df = await run_io(get_macro_dataset, indicators, start, end, freq=freq)
+    handle = get_dataset_registry().put(df, kind="macro", meta={"start": start, "end": end, "freq": freq})
+    return encode(df, handle=handle)
+
+# ===== Factor Module =====
+@mcp.tool()
+@with_timeout
+async def compute_factor(
+    factor_name: str,
+    stock_universe: Optional[list[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    prices: Optional[str] = None,
+) -> dict:
+    """
+    计算单个因子（date × ticker），登记为数据集并返回 handle 与摘要；handle 可传给 build_weights / analyze_factor_ic。
+    prices 为 download_prices 返回的 handle（给出时不需要 stock_universe / 日期）。
+    """
+    price_df = await _load_prices(stock_universe, start_date, end_date, prices)
+    factor_df = await _factor(factor_name, price_df)
+    handle = get_dataset_registry().put(factor_df, kind="factor", meta={"factor": factor_name})
+    return get_dataset_registry().describe(handle)
+
+@mcp.tool()
+@with_timeout
+async def compute_factors_batch(
+    factors: list,
+    stock_universe: Optional[list[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    prices: Optional[str] = None,
+) -> dict:
+    """
+    一次计算多个因子（共享收益率 / EWM 等中间结果），返回最新一期各股票的因子值和整个因子面板的 handle。
+    factors 例如 ["momentum", {"name": "rsi", "period": 6}, {"name": "macd", "fast": 5, "slow": 20, "signal": 9}]
+    """
+    price_df = await _load_prices(stock_universe, start_date, end_date, prices)
+    panel = await _factor_panel(factors, price_df)
+    handle = get_dataset_registry().put(panel, kind="factors")
+    return {"handle": handle, "latest": _encode(panel.iloc[-1].unstack("factor"), "factor_latest")}
+
+@mcp.tool()
+@with_timeout
+async def analyze_factor_ic(
+    factor_name: str,
+    stock_universe: Optional[list[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    horizons: list[int] = [1, 5, 10, 20],
+    n_groups: int = 5,
+    prices: Optional[str] = None,
+    factor: Optional[str] = None,
+) -> dict:
+    """
+    因子有效性分析：不同持有期的 IC 衰减（IC 均值、ICIR、t 值）以及按因子分组的平均次日收益。
+    prices / factor 可传入已登记数据集的 handle（给出 factor 时不再重新计算因子）。
+    """
+    price_df = await _load_prices(stock_universe, start_date, end_date, prices)
+    factor_df = get_dataset_registry().get(factor) if factor else await _factor(factor_name, price_df)
+    result = await run_cpu(jobs.factor_ic_job, factor_name, price_df, horizons, n_groups, factor_df)
+    metrics.merge(result.pop("timings", None))
+    return result
+
+# ===== Strategy Module =====
+@mcp.tool()
+@with_timeout
+async def build_weights(factor: str, top_n: int = 10, ascending: bool = False) -> dict:
+    """
+    由因子数据集（compute_factor 返回的 handle）生成等权持仓：每期选因子值最大（ascending=True 时最小）的 top_n 只，
+    返回权重数据集的 handle 与摘要，可传给 backtest_weights。
+    """
+    with metrics.stage("signal"):
+        weight_df = await run_cpu(jobs.weights_job, get_dataset_registry().get(factor), top_n, ascending)
+    handle = get_dataset_registry().put(weight_df, kind="weights", meta={"factor": factor, "top_n": top_n})
+    return get_dataset_registry().describe(handle)
 
 # ===== Backtest Module =====
 @mcp.tool()
-def run_backtest_with_factor(factor_name: str, stock_universe: list, start_date: str, end_date: str) -> dict:
+@with_timeout
+async def backtest_weights(prices: str, weights: str, rebalance: str = "daily", cost_bps: float = 0.0) -> dict:
+    """用已登记的价格数据集和权重数据集（均为 handle）回测，返回汇总指标和净值曲线的 handle"""
+    with metrics.stage("backtest"):
+        result = await run_cpu(jobs.backtest_job, get_dataset_registry().get(prices),
+                               get_dataset_registry().get(weights), rebalance, cost_bps)
+    handle = get_dataset_registry().put(result["equity"], kind="equity")
+    return {"stats": result["stats"], "equity": handle}
+
+@mcp.tool()
+@with_timeout
+async def run_backtest_with_factor(
+    factor_name: str,
+    stock_universe: Optional[list] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    top_n: int = 10,
+    rebalance: str = "daily",
+    cost_bps: float = 0.0,
+    streaming: bool = False,
+    memory_budget_mb: int = 512,
+    prices: Optional[str] = None,
+) -> dict:
+    """
+    用指定的因子，在指定股票池和时间范围上进行回测。
+    rebalance: 'daily' / 'weekly' / 'monthly'；cost_bps: 比例交易成本（基点）
+    streaming: 大股票池时按 ticker 分块下载、计算因子并落盘，再按日期块排名回测，
+               峰值内存受 memory_budget_mb 约束，结果中附带 memory 报告
+    prices: download_prices 返回的 handle，给出时直接使用已下载的价格
+    """
+    if streaming:
+        source = get_dataset_registry().get(prices) if prices else \
+            (lambda names: get_res_price_data(list(names), start=start_date, end=end_date)["close"])
+        # 分块流程自己控制内存并逐块读取数据，放在线程池里执行
+        result = await run_io(
+            run_chunked_backtest, source, factor_name, tickers=stock_universe, start=start_date, end=end_date, top_n=top_n,
+            rebalance=rebalance, cost_bps=cost_bps, memory_budget_mb=memory_budget_mb,
+        )
+        return {"stats": result["stats"], "equity": _encode(result["equity"], "equity"), "memory": result["memory"]}
+
+    price_df = await _load_prices(stock_universe, start_date, end_date, prices)
+
+    # 因子名会做 strip + lower + 映射；因子先查主进程缓存，信号 → 回测 在进程池中计算
+    factor_df = await _factor(factor_name, price_df)
+    result = await run_cpu(jobs.factor_backtest_job, factor_name, price_df, top_n, rebalance, cost_bps, factor_df)
+    metrics.merge(result.pop("timings", None))
+
+    return {"stats": result["stats"], "equity": _encode(result["equity"], "equity")}
+
+
+@mcp.tool()
+@with_timeout
+async def run_factor_sweep(
+    factor_grid: dict,
+    stock_universe: Optional[list[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    top_n: list[int] = [10],
+    universes: Optional[dict] = None,
+    rebalance: str = "daily",
+    cost_bps: float = 0.0,
+    max_results: int = 20,
+    prices: Optional[str] = None,
+) -> list:
     """
-    用指定的因子，在指定股票池和时间范围上进行回测
+    因子参数网格扫描：价格只下载一次，在多进程中并行跑 因子 → 信号 → 回测 的所有组合，
+    返回按 Sharpe 排序的结果（含最大回撤、换手）。
+    factor_grid 例如 {"momentum": {"window": [10, 20, 60]}, "volatility": {"window": [20, 60]}}
+    universes 可选，{名称: ticker 列表}，均需包含在 stock_universe 中
+    prices: download_prices 返回的 handle，给出时不需要 stock_universe / 日期
     """
-    price_df = get_res_price_data(stock_universe, start=start_date, end=end_date)
+    price_df = await _load_prices(stock_universe, start_date, end_date, prices)
+    # run_param_sweep 自己管理进程池，这里只需不阻塞事件循环
+    table = await run_io(run_param_sweep, price_df, factor_grid, top_n=top_n, universes=universes,
+                         rebalance=rebalance, cost_bps=cost_bps)
+    return table.head(max_results).reset_index().to_dict(orient="records")
+
+
+# ===== Instrumentation =====
+def _hit_rate(stats: dict, hits=("hits",), misses=("misses",)) -> dict:
+    h = sum(stats.get(k, 0) for k in hits)
+    m = sum(stats.get(k, 0) for k in misses)
+    return {**stats, "hit_rate": round(h / (h + m), 4) if h + m else None}
 
-    factor_df = get_factor(factor_name, price_df)  # ← 会做 strip + lower + 映射
+def collect_stats() -> dict:
+    """各层统计汇总：工具 / 阶段 / 上游耗时，执行池，请求合并，限速，缓存命中率"""
+    factor_cache = get_factor_cache()
+    macro_store = get_macro_store()
+    price_cache = get_price_cache()
+    return {
+        "timings": metrics.snapshot(),
+        "executors": executor_stats(),
+        "singleflight": singleflight_stats(),
+        "rate_limits": limiter_stats(),
+        "batching": dict(get_price_batcher().stats),
+        "caches": {
+            "prices": _hit_rate(price_cache.stats),
+            "factors": _hit_rate(factor_cache.stats, hits=("hits", "disk_hits")) if factor_cache else {},
+            "macro": {**macro_store.stats,
+                      "hit_rate": round(macro_store.stats["hits"] / macro_store.stats["requests"], 4)
+                      if macro_store.stats["requests"] else None} if macro_store else {},
+            "datasets": dict(get_dataset_registry().stats),
+        },
+    }
 
-    signal_df = generate_top_n_signal(factor_df, top_n=10)
-    weight_df = equal_weight(signal_df)
-    equity = backtest(price_df, weight_df)
+metrics.set_stats_provider(collect_stats)
 
-    return equity.to_dict()
 
+@mcp.tool()
+@with_timeout
+async def server_stats(reset: bool = False) -> dict:
+    """
+    服务端埋点：每个工具 / 阶段（fetch、clean、factor、signal、backtest、encode）/ 上游（yahoo、fred）的耗时分位数与
+    payload 大小，执行池状态，请求合并与限速统计，各缓存命中率。同时刷新 Prometheus 文本文件（路径见 prometheus_file）。
+    reset=True 时清空耗时统计。
+    """
+    stats = collect_stats()
+    path = metrics.write_prometheus(stats=stats)
+    if reset:
+        metrics.reset()
+    return {**stats, "prometheus_file": path}
 
 
 if __name__ == "__main__":
+    load_env()
     mcp.run("stdio")
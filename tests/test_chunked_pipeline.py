@@ -0,0 +1,17 @@
+import pytest
+
+from agent_core.backtest.array_backtest import fast_backtest
+from agent_core.backtest.chunked_pipeline import run_chunked_backtest
+from agent_core.factors.factor_registry import get_factor
+from agent_core.strategy.strategy_builder import equal_weight, select_top_n
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.mark.parametrize("factor", ["momentum", "macd"])
+def test_chunked_backtest_matches_in_memory_backtest(factor):
+    prices = SyntheticMarket(seed=1).prices(tickers(30), "2022-01-01", "2024-01-01")
+    chunked = run_chunked_backtest(prices, factor, top_n=5, rebalance="weekly", cost_bps=5, memory_budget_mb=64)
+    weights = equal_weight(select_top_n(get_factor(factor, prices, use_cache=False), 5))
+    dense = fast_backtest(prices, weights, rebalance="weekly", cost_bps=5)
+    assert chunked["stats"] == pytest.approx(dense["stats"], rel=1e-6, nan_ok=True)
+    assert chunked["memory"]["peak_mb"] > 0
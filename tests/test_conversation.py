@@ -0,0 +1,90 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from openai_agent.conversation import Conversation, StubChatClient, ToolRunner, run_turn
+
+
+def tool_call(name, **arguments):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def fetch(ticker: str) -> str:
+    # 模拟一个较大的工具结果，带数据集 handle
+    return json.dumps({"handle": f"prices_{ticker}", "shape": [500, 5], "data": "x" * 1600})
+
+
+def responder(messages, tools):
+    # 用户提问 → 并发调用两个工具；拿到工具结果 → 最终回复
+    if messages[-1]["role"] == "user":
+        return {"tool_calls": [{"name": "fetch", "arguments": {"ticker": "AAA"}},
+                               {"name": "fetch", "arguments": {"ticker": "BBB"}}]}
+    return {"content": "done"}
+
+
+def assert_tool_pairs_intact(messages):
+    """每条 assistant(tool_calls) 后面紧跟它的全部 tool 结果，且没有孤立的 tool 消息"""
+    pending = set()
+    for message in messages:
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in pending
+            pending.discard(message["tool_call_id"])
+            continue
+        assert not pending
+        if message.get("tool_calls"):
+            pending = {tc["id"] for tc in message["tool_calls"]}
+    assert not pending
+
+
+def test_budget_trims_old_turns_but_keeps_tool_pairs():
+    client = StubChatClient(responder)
+    conversation = Conversation("system prompt", budget=3000, keep_turns=2)
+    runner = ToolRunner({"fetch": fetch})
+    for i in range(12):
+        reply, metrics = run_turn(client, conversation, f"question {i}", runner, tools=[])
+        assert reply == "done"
+        assert metrics["max_prompt_tokens"] <= 3000
+
+    assert conversation.stats["evicted_turns"] > 0 and conversation.stats["compacted"] > 0
+    for request in client.requests:
+        assert request[0] == {"role": "system", "content": "system prompt"}
+        assert request[1]["role"] == "user"
+        assert_tool_pairs_intact(request)
+
+    # 最近 keep_turns 轮保持完整；更早轮次的工具输出压缩成带 handle 的引用
+    assert [turn[0]["content"] for turn in conversation.turns][-2:] == ["question 10", "question 11"]
+    assert json.loads(conversation.turns[-1][2]["content"])["data"] == "x" * 1600
+    compacted = [json.loads(m["content"]) for turn in conversation.turns[:-2] for m in turn if m["role"] == "tool"]
+    assert compacted and all(c["compacted"] and c["handle"].startswith("prices_") for c in compacted)
+
+
+def test_small_history_is_left_alone():
+    conversation = Conversation("sys", budget=1000)
+    conversation.add_user("hi")
+    conversation.add({"role": "assistant", "content": "hello"})
+    before = conversation.messages
+    assert conversation.fit() == conversation.tokens() <= 1000
+    assert conversation.messages == before
+    assert conversation.stats == {"compacted": 0, "evicted_turns": 0}
+
+
+def test_tool_calls_run_concurrently_in_order():
+    # 两个调用互相等待：串行执行会在 barrier 超时
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow(value):
+        barrier.wait()
+        return f"got {value}"
+
+    runner = ToolRunner({"slow": slow})
+    assert runner.run([tool_call("slow", value=1), tool_call("slow", value=2)]) == ["got 1", "got 2"]
+
+
+def test_tool_errors_become_results():
+    def broken():
+        raise ValueError("bad input")
+
+    runner = ToolRunner({"broken": broken})
+    results = runner.run([tool_call("broken"), tool_call("missing")])
+    assert json.loads(results[0]) == {"error": "ValueError: bad input"}
+    assert json.loads(results[1]) == {"error": "unknown function missing"}
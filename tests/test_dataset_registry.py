@@ -0,0 +1,84 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import server
+from agent_core.data.dataset_registry import DatasetRegistry, get_dataset_registry, set_dataset_registry
+from agent_core.factors.factor_cache import get_factor_cache, set_factor_cache
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def registry():
+    previous = get_dataset_registry()
+    registry = DatasetRegistry()
+    set_dataset_registry(registry)
+    yield registry
+    set_dataset_registry(previous)
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    # 记录真正的下载次数；CPU 任务在当前进程里直接执行，因子缓存关闭
+    calls = []
+    market = SyntheticMarket(seed=3)
+
+    def fetch(names, start, end):
+        calls.append((tuple(names), start, end))
+        return market.prices(names, start, end)
+
+    async def run_cpu(fn, *args):
+        return fn(*args)
+
+    previous = get_factor_cache()
+    set_factor_cache(None)
+    monkeypatch.setattr(server, "get_res_price_data", fetch)
+    monkeypatch.setattr(server, "run_cpu", run_cpu)
+    yield calls
+    set_factor_cache(previous)
+
+
+def test_tools_chain_through_handles_without_refetching(registry, fetches):
+    async def main():
+        prices = await server.download_prices(tickers(8), "2023-01-01", "2024-01-01")
+        factor = await server.compute_factor("momentum", prices=prices["handle"])
+        weights = await server.build_weights(factor["handle"], top_n=3)
+        result = await server.backtest_weights(prices["handle"], weights["handle"])
+        return prices, factor, weights, result
+
+    prices, factor, weights, result = asyncio.run(main())
+    assert len(fetches) == 1
+    assert prices["kind"] == "prices" and factor["kind"] == "factor" and weights["kind"] == "weights"
+    assert isinstance(registry.get(result["equity"]), pd.Series)
+
+
+def test_same_request_reuses_the_registered_dataset(registry, fetches):
+    async def main():
+        first = await server.download_prices(tickers(4), "2023-01-01", "2023-06-01")
+        factor = await server.compute_factor("rsi", tickers(4), "2023-01-01", "2023-06-01")
+        return first, factor
+
+    first, _ = asyncio.run(main())
+    assert len(fetches) == 1
+    assert registry.stats["reuses"] == 1
+    assert [item["kind"] for item in registry.list()] == ["prices", "factor"]
+    assert registry.list()[0]["handle"] == first["handle"]
+
+
+def test_lru_evicts_by_bytes():
+    frame = pd.DataFrame(1.0, index=range(100), columns=list("abcd"))
+    size = int(frame.memory_usage(index=True).sum())
+    registry = DatasetRegistry(max_bytes=2 * size)
+    a = registry.put(frame, key="a")
+    b = registry.put(frame)
+    registry.get(a)                      # a 变为最近使用，先淘汰 b
+    c = registry.put(frame)
+    assert a in registry and c in registry and b not in registry
+    assert registry.stats["evictions"] == 1
+    with pytest.raises(KeyError, match="evicted"):
+        registry.get(b)
+
+    registry.put(frame)                  # 淘汰 a 时一并忘掉它的 key
+    registry.put(frame)
+    assert registry.lookup("a") is None
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.encoding import encode, estimate_tokens, lttb, page
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def frame():
+    return SyntheticMarket(seed=6).prices(tickers(10), "2022-01-01", "2024-01-01")
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    y = np.sin(np.linspace(0, 6 * np.pi, 2000))
+    y[700] = 5.0
+    idx = lttb(y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert (np.diff(idx) > 0).all()
+    assert 700 in idx
+
+
+def test_lttb_skips_nan():
+    y = np.arange(100, dtype="float64")
+    y[:5] = y[-5:] = np.nan
+    idx = lttb(y, 10)
+    assert idx[0] == 5 and idx[-1] == 94
+    assert not np.isnan(y[idx]).any()
+    assert list(lttb(y, 200)) == list(range(5, 95))
+
+
+def test_small_results_are_returned_whole():
+    df = pd.DataFrame({"a": [1.0, 2.0]}, index=pd.to_datetime(["2024-01-02", "2024-01-03"]))
+    assert encode(df, budget=500) == {"shape": [2, 1],
+                                      "data": {"columns": ["a"], "index": ["2024-01-02", "2024-01-03"],
+                                               "data": [[1.0], [2.0]]}}
+
+
+@pytest.mark.parametrize("budget", [300, 1000, 4000])
+def test_large_results_fit_the_budget(frame, budget):
+    out = encode(frame, budget=budget, handle="prices_x")
+    assert out["truncated"] and out["shape"] == list(frame.shape)
+    assert out["page"]["handle"] == "prices_x"
+    assert estimate_tokens(out) <= budget
+
+
+def test_paging_returns_every_row(frame):
+    rows, offset, pages = [], 0, 0
+    while offset is not None:
+        part = page(frame, offset, budget=1500, columns=["close"])
+        assert estimate_tokens(part) <= 1500
+        assert part["data"]["columns"] == [f"close/{t}" for t in tickers(10)]
+        rows += part["data"]["index"]
+        offset, pages = part["next_offset"], pages + 1
+    assert pages > 1
+    assert rows == [str(d.date()) for d in frame.index]
@@ -0,0 +1,23 @@
+import asyncio
+import threading
+
+from agent_core import executors
+
+
+def test_counters_are_exact_under_concurrent_event_loops():
+    before = executors.executor_stats()
+
+    def loop_thread():
+        async def main():
+            await asyncio.gather(*(executors.run_io(sum, [i, 1]) for i in range(50)))
+        asyncio.run(main())
+
+    threads = [threading.Thread(target=loop_thread) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    after = executors.executor_stats()
+    assert after["completed"] - before["completed"] == 400
+    assert after["io_inflight"] == before["io_inflight"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.backtest.factor_backtest import _close_panel, backtest_equal_weight
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+def backtest_equal_weight_loop(factor_panel: pd.Series, price_panel: pd.DataFrame, top_pct: float = 0.2) -> pd.Series:
+    """向量化之前的逐日循环实现，作为参考结果"""
+    factor_panel = factor_panel.dropna()
+    close = _close_panel(price_panel)
+    nav = []
+    nav_dates = []
+    dates = sorted(factor_panel.index.get_level_values(0).unique())
+
+    for i in range(len(dates) - 1):
+        date = dates[i]
+        next_date = dates[i + 1]
+
+        daily_scores = factor_panel.loc[date]
+        top = daily_scores.nlargest(int(len(daily_scores) * top_pct))
+        tickers = top.index.tolist()
+
+        try:
+            p0 = close.loc[date, tickers]
+            p1 = close.loc[next_date, tickers]
+        except KeyError:
+            continue
+
+        ret = (p1 - p0) / p0
+        nav.append((1 + ret.mean()) if nav == [] else nav[-1] * (1 + ret.mean()))
+        nav_dates.append(next_date)
+
+    return pd.Series(nav, index=nav_dates, dtype="float64")
+
+
+@pytest.fixture
+def prices():
+    return SyntheticMarket(seed=11).prices(tickers(30), "2024-01-01", "2024-06-01")
+
+
+def factor_series(factor_df: pd.DataFrame) -> pd.Series:
+    return factor_df.stack(future_stack=True).rename_axis(["date", "ticker"])
+
+
+def assert_same(factor: pd.Series, prices: pd.DataFrame, top_pct: float = 0.2) -> None:
+    expected = backtest_equal_weight_loop(factor, prices, top_pct)
+    result = backtest_equal_weight(factor, prices, top_pct)
+    assert len(expected) > 0
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_freq=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize("top_pct", [0.1, 0.2, 0.5])
+def test_matches_loop(prices, top_pct):
+    assert_same(factor_series(prices["close"].pct_change(5)), prices, top_pct)
+
+
+def test_tied_scores_pick_the_same_tickers(prices):
+    # 得分只保留一位小数，大量并列
+    momentum = prices["close"].pct_change(5).round(1)
+    assert (momentum.iloc[10].value_counts() > 1).any()
+    assert_same(factor_series(momentum), prices)
+
+
+def test_missing_prices_are_skipped(prices):
+    close = prices["close"].copy()
+    rng = np.random.default_rng(0)
+    close = close.mask(rng.random(close.shape) < 0.1)
+    prices = prices.copy()
+    prices["close"] = close
+    assert_same(factor_series(prices["close"].pct_change(5, fill_method=None)), prices)
+
+
+def test_dates_with_too_few_names(prices):
+    # 最后两期只有 3 只股票有因子值：int(3 × 0.2) = 0 只持仓
+    momentum = prices["close"].pct_change(5)
+    momentum.iloc[-3:, 3:] = np.nan
+    factor = factor_series(momentum)
+    assert_same(factor, prices)
+    assert backtest_equal_weight(factor, prices).iloc[:-2].notna().all()
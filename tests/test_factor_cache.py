@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import server
+from agent_core import jobs
+from agent_core.factors.factor_cache import FactorCache, get_factor_cache, set_factor_cache
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def cache():
+    previous = get_factor_cache()
+    cache = FactorCache()
+    set_factor_cache(cache)
+    yield cache
+    set_factor_cache(previous)
+
+
+@pytest.fixture
+def prices():
+    return SyntheticMarket(seed=7).prices(tickers(5), "2023-01-01", "2024-01-01")
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    # 记录真正送进 worker 计算的请求（在当前进程里直接执行）
+    calls = []
+
+    async def run_cpu(fn, missing, close):
+        calls.append(missing)
+        return fn(missing, close)
+
+    monkeypatch.setattr(server, "run_cpu", run_cpu)
+    return calls
+
+
+def test_factor_cache_is_filled_in_the_main_process(cache, prices, computed):
+    first = asyncio.run(server._factor("momentum", prices))
+    again = asyncio.run(server._factor("动量", prices))
+    assert len(computed) == 1
+    assert again.equals(first)
+    assert cache.stats["hits"] == 1
+
+
+def test_batch_only_computes_missing_factors(cache, prices, computed):
+    asyncio.run(server._factor("macd", prices))
+    panel = asyncio.run(server._factor_panel(["macd", {"name": "rsi", "period": 6}], prices))
+    assert [[r["name"] for r in missing] for missing in computed] == [["macd"], ["rsi"]]
+    assert set(panel.columns.get_level_values("factor")) == {"macd_12_26_9_DIF", "macd_12_26_9_DEA",
+                                                             "macd_12_26_9_MACD", "rsi_6"}
+
+
+def test_jobs_do_not_touch_the_cache(cache, prices):
+    jobs.factor_backtest_job("momentum", prices, top_n=2)
+    assert cache.stats["hits"] == cache.stats["misses"] == 0
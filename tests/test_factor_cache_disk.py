@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from agent_core.factors.factor_cache import FactorCache
+
+
+@pytest.fixture
+def value():
+    return pd.DataFrame({"AAA": [1.0, 2.0], "BBB": [3.0, 4.0]})
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path, value):
+    FactorCache(disk_dir=tmp_path).put("k", value)
+    assert [p.name for p in tmp_path.iterdir()] == ["k.pkl"]
+    cache = FactorCache(disk_dir=tmp_path)
+    assert cache.get("k").equals(value)
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_truncated_file_is_a_miss(tmp_path, value):
+    FactorCache(disk_dir=tmp_path).put("k", value)
+    data = (tmp_path / "k.pkl").read_bytes()
+    (tmp_path / "k.pkl").write_bytes(data[: len(data) // 2])
+
+    cache = FactorCache(disk_dir=tmp_path)
+    assert cache.get("k") is None
+    assert cache.stats["misses"] == 1
+    assert not (tmp_path / "k.pkl").exists()
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path, value, monkeypatch):
+    cache = FactorCache(disk_dir=tmp_path)
+    cache.put("k", value)
+
+    def crash(obj, path):
+        open(path, "wb").write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd, "to_pickle", crash)
+    with pytest.raises(OSError):
+        cache.put("k", value * 2)
+    assert [p.name for p in tmp_path.iterdir()] == ["k.pkl"]
+    assert FactorCache(disk_dir=tmp_path).get("k").equals(value)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from agent_core.data import fundamental_data
+from agent_core.data.fundamental_store import FundamentalStore
+from benchmarks.synthetic import SyntheticMarket
+
+
+class CountingYahoo:
+    def __init__(self, market):
+        self.market = market
+        self.handles = []
+
+    def Ticker(self, ticker):
+        self.handles.append(ticker)
+        return self.market.ticker(ticker)
+
+
+class Offline:
+    def Ticker(self, ticker):
+        raise AssertionError("as_of queries must not touch yfinance")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FundamentalStore(tmp_path)
+    monkeypatch.setattr(fundamental_data, "_STORE", store)
+    monkeypatch.setattr(fundamental_data, "_USE_STORE", True)
+    return store
+
+
+def test_as_of_and_fresh_snapshots_never_create_a_ticker(store, monkeypatch):
+    yahoo = CountingYahoo(SyntheticMarket(seed=2))
+    monkeypatch.setattr(fundamental_data, "yf", yahoo)
+    live = fundamental_data.get_fundamental_data(["AAA", "BBB"])
+    assert sorted(yahoo.handles) == sorted(["AAA", "BBB"] * 4)
+
+    # TTL 内的快照命中不再创建句柄
+    fundamental_data.get_fundamental_data(["AAA", "BBB"])
+    assert len(yahoo.handles) == 8
+
+    monkeypatch.setattr(fundamental_data, "yf", Offline())
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    offline = fundamental_data.get_fundamental_data(["AAA", "BBB"], as_of=today)
+    pd.testing.assert_frame_equal(offline, live)
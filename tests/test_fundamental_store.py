@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from agent_core.data.fundamental_store import FundamentalStore
+
+
+def test_save_replaces_a_temp_file(tmp_path):
+    store = FundamentalStore(tmp_path)
+    ts = store.save("AAA", "income", pd.DataFrame({"x": [1.0]}), as_of=pd.Timestamp("2025-03-04 10:00"))
+    files = [p.name for p in (tmp_path / "AAA" / "income").iterdir()]
+    assert files == [f"{ts.strftime('%Y%m%dT%H%M%S%f')}.pkl"]
+    assert store.as_of("AAA", "income", "2025-03-04")["x"].iloc[0] == 1.0
+
+
+def test_failed_save_leaves_no_snapshot(tmp_path, monkeypatch):
+    store = FundamentalStore(tmp_path)
+
+    def crash(obj, path):
+        open(path, "wb").write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd, "to_pickle", crash)
+    with pytest.raises(OSError):
+        store.save("AAA", "income", {"x": 1})
+    assert store.snapshots("AAA", "income") == []
+    assert not list((tmp_path / "AAA" / "income").iterdir())
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+# 在全新的进程里 import，避免受本进程已加载模块的影响
+_CHECK = """
+import sys
+import dotenv
+calls = []
+dotenv.load_dotenv = lambda *a, **k: calls.append(a) or True
+import server, chat
+from agent_core import config
+assert not calls and not config._ENV_LOADED, "load_dotenv ran at import time"
+print([m for m in ("yfinance", "fredapi", "matplotlib", "openai") if m in sys.modules])
+"""
+
+
+def test_import_does_not_load_env_or_heavy_dependencies():
+    proc = subprocess.run([sys.executable, "-c", _CHECK], capture_output=True, text=True,
+                          cwd=Path(__file__).resolve().parents[1])
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip() == "[]"
+
+
+def test_fred_client_loads_env_on_first_use(monkeypatch):
+    from agent_core import config
+    from agent_core.data import macro_data
+
+    calls = []
+    monkeypatch.setattr(config, "_ENV_LOADED", False)
+    monkeypatch.setattr(macro_data, "load_env", lambda: calls.append(1))
+    monkeypatch.setattr(macro_data, "_FRED", None)
+    monkeypatch.setenv("FRED_API_KEY", "test")
+    client = macro_data.get_fred()
+    assert calls == [1]
+    assert type(client).__name__ == "Fred"
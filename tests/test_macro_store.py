@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from agent_core.data import macro_data
+from agent_core.data.macro_store import MacroStore
+
+
+class Source:
+    """月度序列，available 之后的观测尚未公布；记录每次请求的区间"""
+
+    def __init__(self, available="2024-06-01"):
+        self.available = pd.Timestamp(available)
+        self.calls = []
+
+    def series(self, series_id):
+        index = pd.date_range("2000-01-01", self.available, freq="MS")
+        return pd.Series(range(len(index)), index=index, dtype="float64", name=series_id)
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        return self.series("X").loc[start:end]
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        self.calls.append((series_id, observation_start, observation_end))
+        return self.series(series_id).loc[observation_start:observation_end]
+
+
+def test_only_the_missing_tail_is_fetched(tmp_path):
+    source = Source()
+    store = MacroStore(tmp_path, refresh=pd.Timedelta(0))
+    first = store.get("X", "2020-01-01", None, source)
+    assert source.calls == [("2020-01-01", None)]
+    assert first.index[0] == pd.Timestamp("2020-01-01") and first.index[-1] == pd.Timestamp("2024-06-01")
+
+    source.available = pd.Timestamp("2024-09-01")
+    data = store.get("X", "2020-01-01", None, source)
+    assert source.calls[-1] == ("2024-06-02", None)
+    assert data.index[-1] == pd.Timestamp("2024-09-01")
+    pd.testing.assert_series_equal(data, source.series("X").loc["2020-01-01":], check_names=False,
+                                   check_freq=False, check_index_type=False)
+
+
+def test_earlier_start_fetches_only_the_head(tmp_path):
+    source = Source()
+    store = MacroStore(tmp_path)
+    store.get("X", "2020-01-01", None, source)
+    data = store.get("X", "2018-01-01", "2019-12-31", source)
+    assert source.calls == [("2020-01-01", None), ("2018-01-01", "2019-12-31")]
+    assert len(data) == 24
+
+
+def test_fresh_cache_does_not_go_online(tmp_path):
+    source = Source()
+    MacroStore(tmp_path).get("X", "2020-01-01", None, source)
+    # 重新打开：覆盖范围和检查时间从 _meta.json 读取
+    store = MacroStore(tmp_path)
+    store.get("X", "2021-01-01", None, source)
+    store.get("X", "2020-01-01", "2022-01-01", source)
+    assert len(source.calls) == 1
+    assert store.stats == {"requests": 2, "hits": 2, "upstream_calls": 0}
+
+
+@pytest.fixture
+def fred(tmp_path):
+    source = Source()
+    previous = macro_data._STORE, macro_data._USE_STORE, macro_data._FRED
+    macro_data.set_fred(source)
+    macro_data.set_macro_store(MacroStore(tmp_path))
+    yield source
+    macro_data._STORE, macro_data._USE_STORE, macro_data._FRED = previous
+
+
+def test_dataset_fetches_each_series_once_and_aligns(fred):
+    df = macro_data.get_macro_dataset(["CPI", "UNRATE", "CPI"], "2023-01-01", "2023-12-31", freq="ME")
+    assert sorted(sid for sid, *_ in fred.calls) == ["CPIAUCSL", "UNRATE"]
+    assert list(df.columns) == ["CPIAUCSL", "UNRATE"]
+    assert len(df) == 12 and not df.isna().any().any()
+
+    macro_data.get_macro_dataset(["CPI", "UNRATE"], "2023-06-01", "2023-12-31")
+    assert len(fred.calls) == 2
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.data.panel_store import PanelStore
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def frame():
+    return SyntheticMarket(seed=5).prices(tickers(6), "2024-01-01", "2024-05-01").astype("float32")
+
+
+def close_of(frame, names=None, start=None, end=None):
+    close = frame["close"].loc[start:end]
+    return close if names is None else close[names]
+
+
+def test_append_and_reopen(tmp_path, frame):
+    PanelStore(tmp_path).append(frame)
+    store = PanelStore(tmp_path)
+    assert store.shape == (5, len(frame), 6)
+    np.testing.assert_array_equal(store["close"].to_numpy(), frame["close"].to_numpy())
+    assert isinstance(store.array("close").base, np.memmap)
+
+
+def test_append_new_dates_and_tickers(tmp_path, frame):
+    # 先写前半段的 3 只，再写后半段的全部 6 只：缺失格子保持 NaN
+    store = PanelStore(tmp_path, ticker_capacity=2)
+    head, tail = frame.iloc[:40], frame.iloc[40:]
+    store.append(head.loc[:, (slice(None), tickers(6)[:3])])
+    store.append(tail)
+
+    close = PanelStore(tmp_path)["close"]
+    assert list(close.columns) == tickers(6)
+    np.testing.assert_array_equal(close.iloc[40:].to_numpy(), tail["close"].to_numpy())
+    np.testing.assert_array_equal(close.iloc[:40, :3].to_numpy(), head["close"].iloc[:, :3].to_numpy())
+    assert close.iloc[:40, 3:].isna().all().all()
+
+
+def test_older_dates_are_rejected(tmp_path, frame):
+    store = PanelStore(tmp_path).append(frame.iloc[20:])
+    with pytest.raises(ValueError):
+        store.append(frame.iloc[:10])
+
+
+def test_select_reads_only_the_slice(tmp_path, frame):
+    store = PanelStore(tmp_path).append(frame)
+    names = ["S0004", "S0001"]
+    panel = store.select(names, start="2024-02-01", end="2024-03-01", fields=["close"])
+    expected = close_of(frame, names, "2024-02-01", "2024-03-01")
+    assert panel.fields == ["close"]
+    np.testing.assert_array_equal(panel.values[0], expected.to_numpy())
+    with pytest.raises(KeyError, match="ZZZ"):
+        store.select(["ZZZ"])
+
+
+def test_iter_ticker_chunks_covers_all_tickers(tmp_path, frame):
+    store = PanelStore(tmp_path).append(frame)
+    chunks = list(store.iter_ticker_chunks(4, fields=["close"]))
+    assert [len(c.tickers) for c in chunks] == [4, 2]
+    joined = pd.concat([c["close"] for c in chunks], axis=1)
+    np.testing.assert_array_equal(joined.to_numpy(), frame["close"].to_numpy())
@@ -0,0 +1,28 @@
+import pytest
+
+from agent_core.backtest.param_sweep import RESULT_COLUMNS, TASK_COLUMNS, run_param_sweep
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def close():
+    return SyntheticMarket(seed=3).prices(tickers(8), "2023-01-01", "2024-01-01")["close"]
+
+
+@pytest.mark.parametrize("grid", [{}, {"momentum": {"window": []}}])
+def test_empty_grid_returns_empty_table(close, grid):
+    table = run_param_sweep(close, grid, max_workers=1)
+    assert table.empty
+    assert list(table.columns) == TASK_COLUMNS + RESULT_COLUMNS
+    assert table.index.name == "rank"
+
+
+def test_factor_aliases_are_resolved(close):
+    table = run_param_sweep(close, {"动量": {"window": [10]}, "momentum factor": {"window": 20}}, max_workers=1)
+    assert sorted(table["factor"]) == ["momentum", "momentum"]
+    assert sorted(table["params"]) == ["window=10", "window=20"]
+
+
+def test_unknown_factor_is_rejected_before_running(close):
+    with pytest.raises(ValueError, match="未知因子"):
+        run_param_sweep(close, {"no_such_factor": {}}, max_workers=1)
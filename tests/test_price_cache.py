@@ -0,0 +1,97 @@
+import pandas as pd
+
+from agent_core.data.price_cache import FIELDS, PriceCache, settled_end, trading_sessions
+
+
+class FakeProvider:
+    """记录每次请求的假行情源：区间内每个交易日一根 bar"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        idx = trading_sessions(start, end)
+        cols = pd.MultiIndex.from_product([FIELDS, tickers], names=["field", "ticker"])
+        return pd.DataFrame(100.0, index=idx, columns=cols)
+
+
+def make_cache(tmp_path, now, fetcher=None):
+    fetcher = fetcher or FakeProvider()
+    return PriceCache(tmp_path, fetcher, now=lambda: pd.Timestamp(now, tz="America/New_York")), fetcher
+
+
+def test_trading_sessions_skip_exchange_holidays():
+    sessions = trading_sessions("2024-12-23", "2025-01-03")
+    assert pd.Timestamp("2024-12-25") not in sessions
+    assert pd.Timestamp("2025-01-01") not in sessions
+    assert len(trading_sessions("2024-12-25", "2024-12-26")) == 0
+    assert len(trading_sessions("2024-03-29", "2024-03-30")) == 0   # Good Friday
+
+
+def test_settled_end_waits_for_the_close():
+    assert settled_end(pd.Timestamp("2025-03-04 10:00", tz="America/New_York")) == pd.Timestamp("2025-03-04")
+    assert settled_end(pd.Timestamp("2025-03-04 17:00", tz="America/New_York")) == pd.Timestamp("2025-03-05")
+
+
+def test_holiday_only_gap_is_covered_without_fetching(tmp_path):
+    cache, provider = make_cache(tmp_path, "2025-03-04 10:00")
+    df = cache.get("AAA", "2024-12-25", "2024-12-26")
+    assert df.empty
+    assert provider.calls == []
+    cache.get("AAA", "2024-12-25", "2024-12-26")
+    assert provider.calls == []
+    assert cache.coverage("AAA") == [(pd.Timestamp("2024-12-25"), pd.Timestamp("2024-12-26"))]
+
+
+def test_gap_around_holiday_is_fetched_once(tmp_path):
+    cache, provider = make_cache(tmp_path, "2025-03-04 10:00")
+    cache.get("AAA", "2024-12-20", "2024-12-30")
+    cache.get("AAA", "2024-12-20", "2024-12-30")
+    assert len(provider.calls) == 1
+
+
+def test_open_ended_request_on_weekend_hits_cache(tmp_path):
+    # 周日：最近一根定稿的 bar 是周五
+    cache, provider = make_cache(tmp_path, "2025-03-09 12:00")
+    df = cache.get("AAA", "2025-03-03")
+    assert df.index[-1] == pd.Timestamp("2025-03-07")
+    cache.get("AAA", "2025-03-03")
+    assert len(provider.calls) == 1
+
+
+def test_today_is_fetched_once_after_the_close(tmp_path):
+    provider = FakeProvider()
+    cache, _ = make_cache(tmp_path, "2025-03-04 10:00", provider)
+    cache.get("AAA", "2025-03-03")
+    cache.get("AAA", "2025-03-03")
+    assert len(provider.calls) == 1
+    assert cache.coverage("AAA")[-1][1] == pd.Timestamp("2025-03-04")
+
+    cache.now = lambda: pd.Timestamp("2025-03-04 17:00", tz="America/New_York")
+    df = cache.get("AAA", "2025-03-03")
+    cache.get("AAA", "2025-03-03")
+    assert len(provider.calls) == 2
+    assert provider.calls[-1][1:] == ("2025-03-04", "2025-03-05")
+    assert df.index[-1] == pd.Timestamp("2025-03-04")
+
+
+def test_empty_result_on_trading_days_is_retried(tmp_path):
+    calls = []
+
+    def empty(tickers, start, end):
+        calls.append(start)
+        return pd.DataFrame()
+
+    cache, _ = make_cache(tmp_path, "2025-03-04 10:00", empty)
+    cache.get("AAA", "2025-02-03", "2025-02-10")
+    cache.get("AAA", "2025-02-03", "2025-02-10")
+    assert len(calls) == 2
+    assert cache.coverage("AAA") == []
+
+
+def test_same_gaps_are_fetched_together(tmp_path):
+    cache, provider = make_cache(tmp_path, "2025-03-04 10:00")
+    df = cache.get(["AAA", "BBB"], "2025-02-03", "2025-02-10")
+    assert len(provider.calls) == 1
+    assert set(df.columns.get_level_values("ticker")) == {"AAA", "BBB"}
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.data.price_panel import PricePanel
+from agent_core.factors.tech_factors import calc_momentum
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def frame():
+    return SyntheticMarket(seed=4).prices(tickers(6), "2024-01-01", "2024-04-01")
+
+
+def test_round_trip(frame):
+    panel = PricePanel.from_frame(frame)
+    assert panel.shape == (5, len(frame), 6)
+    pd.testing.assert_frame_equal(panel.to_frame(), frame, check_names=False)
+
+
+def test_field_frames_are_zero_copy_views(frame):
+    panel = PricePanel.from_frame(frame)
+    close = panel["close"]
+    assert np.shares_memory(close.to_numpy(), panel.values)
+    assert np.shares_memory(panel.array("close", ["S0001", "S0002"]), panel.values)
+    assert np.shares_memory(panel.select(start="2024-02-01").values, panel.values)
+    pd.testing.assert_frame_equal(close, frame["close"], check_names=False)
+
+
+def test_factor_functions_accept_a_panel(frame):
+    panel = PricePanel.from_frame(frame)
+    pd.testing.assert_frame_equal(calc_momentum(panel), calc_momentum(frame), check_names=False)
+
+
+def test_float32_storage_halves_memory(frame):
+    panel = PricePanel.from_frame(frame)
+    small = PricePanel.from_frame(frame, dtype="float32")
+    assert small.nbytes * 2 == panel.nbytes
+    np.testing.assert_allclose(small["close"].to_numpy(), panel["close"].to_numpy(), rtol=1e-6)
+
+
+def test_unknown_tickers_raise(frame):
+    with pytest.raises(KeyError, match="ZZZ"):
+        PricePanel.from_frame(frame).frame("close", ["S0001", "ZZZ"])
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from agent_core import executors, metrics
+
+
+@pytest.fixture(autouse=True)
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setenv("QUANT_AGENT_PROFILE_SLOW", "0")
+    monkeypatch.setenv("QUANT_AGENT_CACHE_DIR", str(tmp_path))
+
+
+def spin_alpha(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def spin_beta(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def profiled(name, func):
+    with metrics.tool_call(name) as call:
+        call["result"] = await executors.run_io(func, 0.3)
+    return Path(call["profile"]).read_text()
+
+
+def test_concurrent_calls_only_count_their_own_threads():
+    async def main():
+        return await asyncio.gather(profiled("alpha", spin_alpha), profiled("beta", spin_beta))
+
+    alpha, beta = asyncio.run(main())
+    assert "spin_alpha" in alpha and "spin_beta" not in alpha
+    assert "spin_beta" in beta and "spin_alpha" not in beta
+
+
+def test_one_sampler_thread_for_all_calls():
+    async def main():
+        return await asyncio.gather(*(profiled(f"call{i}", spin_alpha) for i in range(4)))
+
+    seen = []
+    stop = threading.Event()
+
+    def watch():
+        while not stop.is_set():
+            seen.append(sum(t.name == "quant-sampler" for t in threading.enumerate()))
+            time.sleep(0.01)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    try:
+        asyncio.run(main())
+    finally:
+        stop.set()
+        watcher.join()
+    assert max(seen) == 1
+    assert not any(t.name == "quant-sampler" for t in threading.enumerate())
@@ -0,0 +1,126 @@
+import pandas as pd
+import pytest
+
+from agent_core.data import price_data
+from agent_core.data.rate_limit import (
+    ManualClock, RateLimiter, SimulatedProvider, get_limiter, is_empty_result, set_limiter,
+)
+
+
+@pytest.fixture
+def clock():
+    return ManualClock()
+
+
+@pytest.fixture
+def yahoo(clock):
+    previous = get_limiter("yahoo")
+    limiter = RateLimiter("yahoo", rate=2.0, burst=5, clock=clock)
+    set_limiter("yahoo", limiter)
+    yield limiter
+    set_limiter("yahoo", previous)
+
+
+def test_throttle_errors_back_off_and_cut_the_rate(clock):
+    provider = SimulatedProvider(limit=2, window=2.0, mode="error", clock=clock)
+    limiter = RateLimiter("sim", rate=10.0, burst=10, clock=clock, jitter=0.0)
+    for _ in range(2):
+        limiter.call(provider.download, ["AAA"], "2025-02-03", "2025-02-10")
+    # 第三次被限流，退避到窗口过期后请求成功
+    df = limiter.call(provider.download, ["AAA"], "2025-02-03", "2025-02-10")
+    assert not df.empty
+    assert provider.stats["throttled"] >= 1
+    assert limiter.stats["throttled"] == provider.stats["throttled"]
+    assert limiter.rate < 10.0
+    assert clock.now() >= 1.0
+
+
+def test_throttle_errors_raise_after_retries(clock):
+    provider = SimulatedProvider(limit=0, window=1e9, mode="error", clock=clock)
+    limiter = RateLimiter("sim", rate=10.0, clock=clock, max_retries=2)
+    with pytest.raises(RuntimeError, match="429"):
+        limiter.call(provider.download, ["AAA"], "2025-02-03", "2025-02-10")
+    assert limiter.stats["attempts"] == 3
+    assert limiter.stats["failures"] == 1
+
+
+def test_empty_results_do_not_cut_the_rate(clock):
+    limiter = RateLimiter("sim", rate=10.0, clock=clock, jitter=0.0)
+    result = limiter.call(lambda: {}, is_empty=is_empty_result)
+    assert result == {}
+    assert limiter.stats["empty"] == 4
+    assert limiter.stats["throttled"] == 0
+    assert limiter.rate == 10.0
+
+
+def test_empty_price_download_returns_immediately(clock, yahoo, monkeypatch):
+    # 节假日 / 周末 / 开盘前的空表：不重试、不退避、不降速
+    calls = []
+    monkeypatch.setattr(price_data, "_yf_download", lambda *args: calls.append(args) or pd.DataFrame())
+    for _ in range(3):
+        assert price_data._limited_download(["AAA"], "2024-12-25", "2024-12-26").empty
+    assert len(calls) == 3
+    assert clock.now() == 0.0
+    assert yahoo.rate == 2.0
+    assert yahoo.stats["retries"] == 0
+
+
+def test_price_download_retries_real_throttling(clock, yahoo, monkeypatch):
+    provider = SimulatedProvider(limit=1, window=2.0, mode="error", clock=clock)
+    monkeypatch.setattr(price_data, "_yf_download", provider.download)
+    price_data._limited_download(["AAA"], "2025-02-03", "2025-02-10")
+    df = price_data._limited_download(["AAA"], "2025-02-03", "2025-02-10")
+    assert not df.empty
+    assert yahoo.stats["throttled"] >= 1
+    assert yahoo.rate < 2.0
+
+
+class YFRateLimitError(Exception):
+    pass
+
+
+class FakeYahoo:
+    """yf.download 吞掉异常只返回空列；throttled 中的 ticker 单独请求时抛出限流异常"""
+
+    def __init__(self, throttled=(), empty=()):
+        self.throttled, self.empty = set(throttled), set(empty)
+        self.probes = []
+
+    def download(self, tickers, start, end, **kwargs):
+        ok = [t for t in tickers if t not in self.throttled | self.empty]
+        idx = pd.bdate_range(start, end, inclusive="left")
+        cols = pd.MultiIndex.from_product([ok, ["Open", "High", "Low", "Close", "Volume"]])
+        return pd.DataFrame(1.0, index=idx, columns=cols) if ok else pd.DataFrame()
+
+    def Ticker(self, ticker):
+        def history(**kwargs):
+            self.probes.append(ticker)
+            if ticker in self.throttled:
+                raise YFRateLimitError("Too Many Requests. Rate limited. Try after a while.")
+            return pd.DataFrame()
+        return type("Ticker", (), {"history": staticmethod(history)})
+
+
+def test_throttled_tickers_in_a_batch_raise(monkeypatch):
+    monkeypatch.setattr(price_data, "yf", FakeYahoo(throttled={"BBB"}))
+    with pytest.raises(RuntimeError, match="rate limited"):
+        price_data._yf_download(["AAA", "BBB"], "2025-02-03", "2025-02-10")
+
+
+def test_missing_data_without_throttling_is_returned(monkeypatch):
+    yahoo = FakeYahoo(empty={"BBB"})
+    monkeypatch.setattr(price_data, "yf", yahoo)
+    df = price_data._yf_download(["AAA", "BBB"], "2025-02-03", "2025-02-10")
+    assert list(df["close"].columns) == ["AAA"]
+    assert yahoo.probes == ["BBB"]
+
+
+def test_complete_batch_is_not_affected_by_other_calls(monkeypatch):
+    # 另一批被限流不影响本批：只检查本次调用自己的结果，完整的结果不会额外请求
+    yahoo = FakeYahoo(throttled={"ZZZ"})
+    monkeypatch.setattr(price_data, "yf", yahoo)
+    with pytest.raises(RuntimeError):
+        price_data._yf_download(["ZZZ"], "2025-02-03", "2025-02-10")
+    df = price_data._yf_download(["AAA", "BBB"], "2025-02-03", "2025-02-10")
+    assert sorted(df["close"].columns) == ["AAA", "BBB"]
+    assert yahoo.probes == ["ZZZ"]
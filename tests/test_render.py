@@ -0,0 +1,44 @@
+import json
+import logging
+
+import pytest
+
+import chat
+from agent_core.plot import render
+from agent_core.plot.render import RenderService, set_render_service
+from openai_agent.functions import function_schemas
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = RenderService(tmp_path)
+    set_render_service(service)
+    yield service
+    service.shutdown()
+    set_render_service(None)
+
+
+def test_chat_line_chart_accepts_json_rows(service):
+    rows = [{"date": f"2025-01-0{d}", "close": 100.0 + d} for d in range(2, 8)]
+    out = json.loads(chat.HANDLERS["plot_res_line_chart"](ticker="AAA", start="2025-01-02", end="2025-01-08", df=rows))
+    service.shutdown()
+    assert out["image"].endswith(".png")
+    assert service.stats["renders"] == 1 and service.stats["errors"] == 0
+
+
+def test_line_chart_schema_does_not_require_df():
+    spec = next(f for f in function_schemas if f["name"] == "plot_res_line_chart")
+    assert "df" not in spec["parameters"]["required"]
+
+
+def test_background_render_errors_are_reported(service, monkeypatch, caplog):
+    def broken(path, panels, **params):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(render, "draw", broken)
+    with caplog.at_level(logging.ERROR, logger=render.__name__):
+        out = render.chart([{"series": [("x", [1, 2], [1, 2])]}], wait=False)
+        service.shutdown()
+    assert service.stats["errors"] == 1
+    assert "boom" in service.errors[out["image"]]
+    assert "chart render failed" in caplog.text
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from agent_core.data import price_data
+from agent_core.data.singleflight import SingleFlight
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class Upstream:
+    """阻塞到 release() 的上游请求，记录被调用次数"""
+
+    def __init__(self, result="value"):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.gate.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_concurrent_identical_calls_run_once():
+    flight, upstream = SingleFlight("test_threads"), Upstream()
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "k", upstream)]
+        upstream.started.wait(5)
+        futures += [pool.submit(flight.do, "k", upstream) for _ in range(3)]
+        wait_for(lambda: flight.stats["calls"] == 4)
+        upstream.gate.set()
+        results = [f.result() for f in futures]
+    assert results == ["value"] * 4
+    assert upstream.calls == 1
+    assert flight.stats == {"calls": 4, "executions": 1, "coalesced": 3, "subsumed": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight, upstream = SingleFlight("test_errors"), Upstream(RuntimeError("boom"))
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, "k", upstream)]
+        upstream.started.wait(5)
+        futures.append(pool.submit(flight.do, "k", upstream))
+        wait_for(lambda: flight.stats["calls"] == 2)
+        upstream.gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError, match="boom"):
+                f.result()
+    # 失败后不留在进行中表里，下一次调用重新执行
+    assert flight.do("k", lambda: "again") == "again"
+
+
+def test_async_callers_share_one_call():
+    flight, upstream = SingleFlight("test_async"), Upstream()
+
+    async def main():
+        tasks = [asyncio.ensure_future(flight.do_async("k", upstream)) for _ in range(3)]
+        await asyncio.to_thread(upstream.started.wait, 5)
+        upstream.gate.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == ["value"] * 3
+    assert upstream.calls == 1
+
+
+def test_subsumed_price_request_waits_for_the_wider_one(monkeypatch):
+    market = SyntheticMarket(seed=9)
+    upstream = Upstream()
+
+    def get(names, start, end):
+        upstream()
+        return market.prices(names, start, end)
+
+    monkeypatch.setattr(price_data, "get_price_cache", lambda: SimpleNamespace(get=get))
+    flight = price_data._PRICE_FLIGHT
+    before = dict(flight.stats)
+
+    with ThreadPoolExecutor(2) as pool:
+        wide = pool.submit(price_data.get_res_price_data, tickers(4), "2023-01-01", "2023-12-31")
+        upstream.started.wait(5)
+        narrow = pool.submit(price_data.get_res_price_data, tickers(4)[1:3], "2023-03-01", "2023-06-01")
+        wait_for(lambda: flight.stats["calls"] == before["calls"] + 2)
+        upstream.gate.set()
+        wide, narrow = wide.result(), narrow.result()
+
+    assert upstream.calls == 1
+    assert flight.stats["subsumed"] == before["subsumed"] + 1
+    assert list(narrow.columns.unique("ticker")) == tickers(4)[1:3]
+    assert narrow.index[0] >= wide.index[0] and narrow.index[-1] < wide.index[-1]
+    assert narrow.equals(wide.loc["2023-03-01":"2023-05-31", narrow.columns])
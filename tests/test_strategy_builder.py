@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.backtest.array_backtest import fast_backtest
+from agent_core.factors.tech_factors import calc_momentum
+from agent_core.strategy import strategy_builder
+from agent_core.strategy.strategy_builder import (
+    SparseWeights, equal_weight, generate_top_n_signal, select_top_n, top_k_mask,
+)
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+def rank_mask(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """参照实现：整行排序，并列按列顺序（rank method="first"）"""
+    ranks = pd.DataFrame(values).rank(axis=1, method="first", ascending=not largest)
+    return (ranks <= k).to_numpy()
+
+
+@pytest.fixture
+def prices():
+    return SyntheticMarket(seed=8).prices(tickers(30), "2022-01-01", "2024-01-01")
+
+
+@pytest.mark.parametrize("largest", [True, False])
+@pytest.mark.parametrize("k", [1, 5, 12, 40])
+def test_top_k_mask_matches_rank_selection(monkeypatch, largest, k):
+    # 取整制造大量并列，加入 NaN 和整行 NaN；小分块覆盖跨块的情形
+    monkeypatch.setattr(strategy_builder, "_BLOCK_CELLS", 64)
+    rng = np.random.default_rng(k)
+    values = rng.normal(size=(50, 20)).round(1)
+    values[rng.random(values.shape) < 0.2] = np.nan
+    values[7] = np.nan
+    mask = top_k_mask(values, k, largest=largest)
+    np.testing.assert_array_equal(mask, rank_mask(values, k, largest))
+    np.testing.assert_array_equal(mask.sum(axis=1), np.minimum(k, (~np.isnan(values)).sum(axis=1)))
+
+
+def test_signal_helpers_use_the_same_selection(prices):
+    factor = calc_momentum(prices)
+    signal = generate_top_n_signal(factor, 5)
+    sparse = select_top_n(factor, 5)
+    pd.testing.assert_frame_equal(sparse.to_dense(), signal.astype("float64"))
+
+
+def test_sparse_dense_round_trip(prices):
+    dense = equal_weight(generate_top_n_signal(calc_momentum(prices), 4))
+    sparse = SparseWeights.from_dense(dense)
+    assert sparse.nnz == int((dense != 0).to_numpy().sum())
+    pd.testing.assert_frame_equal(sparse.to_dense(), dense)
+    pd.testing.assert_frame_equal(equal_weight(select_top_n(calc_momentum(prices), 4)).to_dense(), dense)
+
+
+@pytest.mark.parametrize("rebalance", ["daily", "weekly", "monthly"])
+def test_fast_backtest_sparse_equals_dense(prices, rebalance):
+    factor = calc_momentum(prices)
+    sparse = equal_weight(select_top_n(factor, 6, ascending=True))
+    dense = sparse.to_dense()
+    kwargs = dict(rebalance=rebalance, cost_bps=10, fixed_cost=5.0)
+    a, b = fast_backtest(prices, sparse, **kwargs), fast_backtest(prices, dense, **kwargs)
+    for key in ("equity", "returns", "turnover", "holdings", "costs"):
+        pd.testing.assert_series_equal(a[key], b[key], check_exact=False, rtol=1e-12)
+    assert a["stats"] == pytest.approx(b["stats"], rel=1e-9, nan_ok=True)
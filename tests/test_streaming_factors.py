@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_core.factors.streaming_factors import (
+    StreamingFactor, StreamingMACD, StreamingMomentum, StreamingRSI, StreamingVolatility,
+)
+from agent_core.factors.tech_factors import calc_macd, calc_momentum, calc_rsi, calc_volatility
+from benchmarks.synthetic import SyntheticMarket, tickers
+
+
+@pytest.fixture
+def close():
+    close = SyntheticMarket(seed=5).prices(tickers(6), "2023-01-01", "2024-01-01")["close"]
+    # 零星缺失价格 + 一只中途才开始交易的股票
+    close = close.mask(np.random.default_rng(1).random(close.shape) < 0.02)
+    close.iloc[:40, -1] = np.nan
+    return close
+
+
+def batch(kind: str, close: pd.DataFrame, **params) -> pd.DataFrame:
+    if kind == "momentum":
+        return calc_momentum({"close": close}, **params)
+    if kind == "volatility":
+        return calc_volatility({"close": close}, **params)
+    if kind == "rsi":
+        return calc_rsi(close, **params)
+    lines = {tk: calc_macd(close[tk], **params) for tk in close.columns}
+    return pd.concat(lines, axis=1, names=["ticker", "line"]).swaplevel(axis=1).sort_index(axis=1)
+
+
+CASES = [
+    (StreamingMomentum, "momentum", {"window": 5}),
+    (StreamingVolatility, "volatility", {"window": 10}),
+    (StreamingRSI, "rsi", {"period": 6}),
+    (StreamingMACD, "macd", {"fast": 5, "slow": 13, "signal": 4}),
+]
+
+
+def assert_matches(result: pd.DataFrame, expected: pd.DataFrame) -> None:
+    expected = expected.reindex_like(result)
+    assert expected.notna().to_numpy().mean() > 0.5
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        StreamingFactor(["AAA"])
+
+
+@pytest.mark.parametrize("cls,kind,params", CASES)
+def test_bar_by_bar_matches_batch(close, cls, kind, params):
+    factor = cls(list(close.columns), **params)
+    rows = [factor.update(close.loc[date]) for date in close.index]
+    if kind == "macd":
+        result = pd.concat({d: r.stack() for d, r in zip(close.index, rows)}, axis=0).unstack([1, 2])
+        result.columns = result.columns.swaplevel().rename(["line", "ticker"])
+        result = result.sort_index(axis=1)
+    else:
+        result = pd.DataFrame(rows, index=close.index)
+    assert_matches(result, batch(kind, close, **params))
+
+
+@pytest.mark.parametrize("cls,kind,params", CASES)
+def test_batches_and_resume_match_batch(close, cls, kind, params, tmp_path):
+    expected = batch(kind, close, **params)
+    head, tail = close.iloc[:100], close.iloc[100:]
+
+    factor = cls(list(close.columns), **params)
+    first = factor.update_batch(head)
+    path = tmp_path / f"{kind}.npz"
+    factor.save(str(path))
+    resumed = StreamingFactor.load(str(path))
+    second = resumed.update_batch(tail)
+
+    assert isinstance(resumed, cls) and resumed.n_bars == len(close)
+    assert_matches(pd.concat([first, second]), expected)
+    # 不中断的同一个实例给出同样的结果
+    assert_matches(factor.update_batch(tail), second)